@@ -18,6 +18,9 @@ CONF_PATH = '.'
 __CONFIG = configparser.ConfigParser()
 __CONFIG.read(os.path.abspath(os.path.join(CONF_PATH, CONF_FILE_NAME)))
 __UI_BUILDER_DB = 'ui_builder_db'
+__UI_BUILDER_DB_BACKEND = 'ui_builder_db_backend'
+__DB_FSYNC_POLICY = 'db_fsync_policy'
+__DB_FLUSH_INTERVAL = 'db_flush_interval'
 
 #misc------------------------------
 """ Public """
@@ -28,12 +31,61 @@ MODULE_FILE_POST_FIX = '.py'
 __PACKAGE_INSTALLER = 'PackageInstaller'
 __PKG_DROP_IN_LOC = 'package_drop_in_loc'
 __PKG_INSTALL_LOC = 'package_install_loc'
+__PKG_CACHE_LOC = 'package_cache_loc'
 __PKG_FILE_EXT = 'package_file_extension'
 __PKG_OVERWRITE_MODE = 'pkg_overwrite_mode'
+__PKG_EXTRACT_WORKERS = 'package_extract_workers'
+__PKG_DIFFERENTIAL_UPGRADE = 'pkg_differential_upgrade'
 __PACKAGE_MANAGER = 'PackageManager'
+__INSTALL_DOWNLOAD_CONCURRENCY = 'install_download_concurrency'
+__INSTALL_EXTRACT_WORKERS = 'install_extract_workers'
+__INSTALL_REGISTER_BATCH_SIZE = 'install_register_batch_size'
+__ARCHIVE_CACHE_MAX_BYTES = 'archive_cache_max_bytes'
+__ARCHIVE_CACHE_MAX_ENTRIES = 'archive_cache_max_entries'
+__ARCHIVE_CACHE_MAX_AGE = 'archive_cache_max_age'
+__ARCHIVE_CACHE_EVICTION_INTERVAL = 'archive_cache_eviction_interval'
+__DIRECTORY_POLL_INTERVAL = 'directory_poll_interval'
+__PACKAGE_INFO_CACHE_SIZE = 'package_info_cache_size'
+__INDEX_SOURCE_TIMEOUT = 'index_source_timeout'
+__INDEX_REFRESH_TIMEOUT = 'index_refresh_timeout'
 """ Public """
+PACKAGE_INSTALLER = __PACKAGE_INSTALLER
+PACKAGE_MANAGER = __PACKAGE_MANAGER
+PKG_DROP_IN_LOC = __PKG_DROP_IN_LOC
+PKG_INSTALL_LOC = __PKG_INSTALL_LOC
+PKG_CACHE_LOC = __PKG_CACHE_LOC
+PKG_OVERWRITE_MODE = __PKG_OVERWRITE_MODE
 UI_BUILDER_DB_PATH = __CONFIG.get(__PACKAGE_INSTALLER, __UI_BUILDER_DB)
+#tinydb (json file) or sqlite
+DB_BACKEND_TINYDB = 'tinydb'
+DB_BACKEND_SQLITE = 'sqlite'
+UI_BUILDER_DB_BACKEND = __CONFIG.get(__PACKAGE_INSTALLER, __UI_BUILDER_DB_BACKEND, fallback=DB_BACKEND_TINYDB)
+#when changes of the metadata db reach the disk: always, interval or os
+DB_FSYNC_ALWAYS = 'always'
+DB_FSYNC_INTERVAL = 'interval'
+DB_FSYNC_OS = 'os'
+DB_FSYNC_POLICY = __CONFIG.get(__PACKAGE_INSTALLER, __DB_FSYNC_POLICY, fallback=DB_FSYNC_INTERVAL)
+DB_FLUSH_INTERVAL = __CONFIG.getfloat(__PACKAGE_INSTALLER, __DB_FLUSH_INTERVAL, fallback=1.0)
 PACKAGE_FILE_EXTENSION = __CONFIG.get(__PACKAGE_INSTALLER, __PKG_FILE_EXT)
+#threads extracting the members of one package
+PACKAGE_EXTRACT_WORKERS = __CONFIG.getint(__PACKAGE_INSTALLER, __PKG_EXTRACT_WORKERS, fallback=min(4, os.cpu_count() or 1))
+#re-installs in overwrite mode only rewrite members changed since the last install
+PKG_DIFFERENTIAL_UPGRADE = __CONFIG.getboolean(__PACKAGE_INSTALLER, __PKG_DIFFERENTIAL_UPGRADE, fallback=True)
+INSTALL_DOWNLOAD_CONCURRENCY = __CONFIG.getint(__PACKAGE_MANAGER, __INSTALL_DOWNLOAD_CONCURRENCY, fallback=4)
+INSTALL_EXTRACT_WORKERS = __CONFIG.getint(__PACKAGE_MANAGER, __INSTALL_EXTRACT_WORKERS, fallback=os.cpu_count() or 1)
+INSTALL_REGISTER_BATCH_SIZE = __CONFIG.getint(__PACKAGE_MANAGER, __INSTALL_REGISTER_BATCH_SIZE, fallback=16)
+#archive cache limits, 0 disables a limit; age is the number of seconds since last access
+ARCHIVE_CACHE_MAX_BYTES = __CONFIG.getint(__PACKAGE_MANAGER, __ARCHIVE_CACHE_MAX_BYTES, fallback=2 * 1024 ** 3)
+ARCHIVE_CACHE_MAX_ENTRIES = __CONFIG.getint(__PACKAGE_MANAGER, __ARCHIVE_CACHE_MAX_ENTRIES, fallback=0)
+ARCHIVE_CACHE_MAX_AGE = __CONFIG.getfloat(__PACKAGE_MANAGER, __ARCHIVE_CACHE_MAX_AGE, fallback=30 * 24 * 3600.0)
+ARCHIVE_CACHE_EVICTION_INTERVAL = __CONFIG.getfloat(__PACKAGE_MANAGER, __ARCHIVE_CACHE_EVICTION_INTERVAL, fallback=600.0)
+#used by the directory watchers when inotify is not available
+DIRECTORY_POLL_INTERVAL = __CONFIG.getfloat(__PACKAGE_MANAGER, __DIRECTORY_POLL_INTERVAL, fallback=2.0)
+#fully loaded packages (details and components) kept in memory
+PACKAGE_INFO_CACHE_SIZE = __CONFIG.getint(__PACKAGE_MANAGER, __PACKAGE_INFO_CACHE_SIZE, fallback=32)
+#seconds for the validity check plus index fetch of one source and for a whole index refresh, 0 for no limit
+INDEX_SOURCE_TIMEOUT = __CONFIG.getfloat(__PACKAGE_MANAGER, __INDEX_SOURCE_TIMEOUT, fallback=30.0)
+INDEX_REFRESH_TIMEOUT = __CONFIG.getfloat(__PACKAGE_MANAGER, __INDEX_REFRESH_TIMEOUT, fallback=120.0)
 
 #download-------------------------------------------
 """ Private """
@@ -41,11 +93,33 @@ __DOWNLOAD_CONFIG_SECTION = 'DownloadManager'
 __DOWNLOAD_SOURCE_HANDLERS = 'download_source_handlers'
 __DOWNLOADER_PLUGINS_CONF = 'downloader_plugins'
 __SAVE_DOWNLOADS_TO = 'save_downloads_to'
+__DOWNLOAD_CHUNK_SIZE = 'download_chunk_size'
 """ Public """
 DOWNLOADER_PLUGINS_PATH = __CONFIG.get(__DOWNLOAD_CONFIG_SECTION, __DOWNLOADER_PLUGINS_CONF)
 SAVE_DOWNLOADS_TO_PATH = __CONFIG.get(__DOWNLOAD_CONFIG_SECTION, __SAVE_DOWNLOADS_TO)
+DOWNLOAD_CHUNK_SIZE = __CONFIG.getint(__DOWNLOAD_CONFIG_SECTION, __DOWNLOAD_CHUNK_SIZE, fallback=64 * 1024)
 DOWNLOAD_PLUGIN_FILTER = 'DownloadPlugins'
 
+#web sessions--------------------------------------
+""" Private """
+__WEB_SESSION_SECTION = 'WebSession'
+__CONNECTION_LIMIT = 'connection_limit'
+__CONNECTION_LIMIT_PER_HOST = 'connection_limit_per_host'
+__KEEPALIVE_TIMEOUT = 'keepalive_timeout'
+__DNS_CACHE_TTL = 'dns_cache_ttl'
+__CONNECT_TIMEOUT = 'connect_timeout'
+__READ_TIMEOUT = 'read_timeout'
+__TOTAL_TIMEOUT = 'total_timeout'
+""" Public """
+WEB_CONNECTION_LIMIT = __CONFIG.getint(__WEB_SESSION_SECTION, __CONNECTION_LIMIT, fallback=100)
+WEB_CONNECTION_LIMIT_PER_HOST = __CONFIG.getint(__WEB_SESSION_SECTION, __CONNECTION_LIMIT_PER_HOST, fallback=8)
+WEB_KEEPALIVE_TIMEOUT = __CONFIG.getfloat(__WEB_SESSION_SECTION, __KEEPALIVE_TIMEOUT, fallback=30.0)
+WEB_DNS_CACHE_TTL = __CONFIG.getint(__WEB_SESSION_SECTION, __DNS_CACHE_TTL, fallback=300)
+WEB_CONNECT_TIMEOUT = __CONFIG.getfloat(__WEB_SESSION_SECTION, __CONNECT_TIMEOUT, fallback=10.0)
+WEB_READ_TIMEOUT = __CONFIG.getfloat(__WEB_SESSION_SECTION, __READ_TIMEOUT, fallback=60.0)
+#total timeout is disabled by default as large packages can take long to download
+WEB_TOTAL_TIMEOUT = __CONFIG.getfloat(__WEB_SESSION_SECTION, __TOTAL_TIMEOUT, fallback=0.0)
+
 #components----------------------------------------
 """ Private """
 __COMPONENT_MANAGER = 'ComponentManager'
@@ -82,7 +156,25 @@ PARSED_OPTIONS = 'parsed_options'
 PARSED_KW_OPTIONS = 'parsed_kw_options'
 
 #tasks---------------------------------------------
+""" Private """
+__TASKS_SECTION = 'Tasks'
+__FUNCTION_EXECUTOR = 'function_executor'
+__FUNCTION_EXECUTOR_WORKERS = 'function_executor_workers'
+__COROUTINE_CONCURRENCY = 'coroutine_concurrency'
+__COROUTINE_CONCURRENCY_PER_KEY = 'coroutine_concurrency_per_key'
+__THREAD_POOL_SIZE = 'thread_pool_size'
 """ Public """
+#sync functions of HybridThread run in a pool of threads or processes
+FUNCTION_EXECUTOR_THREAD = 'thread'
+FUNCTION_EXECUTOR_PROCESS = 'process'
+FUNCTION_EXECUTOR = __CONFIG.get(__TASKS_SECTION, __FUNCTION_EXECUTOR, fallback=FUNCTION_EXECUTOR_THREAD)
+FUNCTION_EXECUTOR_WORKERS = __CONFIG.getint(__TASKS_SECTION, __FUNCTION_EXECUTOR_WORKERS, fallback=os.cpu_count() or 1)
+#coroutines of a HybridThread running at the same time, in total and per key; 0 disables a limit
+COROUTINE_CONCURRENCY = __CONFIG.getint(__TASKS_SECTION, __COROUTINE_CONCURRENCY, fallback=16)
+COROUTINE_CONCURRENCY_PER_KEY = __CONFIG.getint(__TASKS_SECTION, __COROUTINE_CONCURRENCY_PER_KEY, fallback=0)
+#long-lived event loop threads shared by the services through the ThreadManager
+THREAD_POOL_SIZE = __CONFIG.getint(__TASKS_SECTION, __THREAD_POOL_SIZE, fallback=os.cpu_count() or 1)
+
 class ThreadStatus(enum.Enum):
     """ThreadStatus related constants
     """
@@ -3,9 +3,31 @@
 import uuid
 
 
+def _record_slots(cls):
+    # slots of the class and its bases, in definition order
+    slots = []
+    for klass in reversed(cls.__mro__):
+        for slot in klass.__dict__.get('__slots__', ()):
+            if slot not in slots:
+                slots.append(slot)
+    return slots
+
+
+def _field_classes(cls):
+    # field class name to class, for all subclasses of cls
+    classes = {cls.__name__: cls}
+    for subclass in cls.__subclasses__():
+        classes.update(_field_classes(subclass))
+    return classes
+
+
 class Field:
+    # fields are created in large numbers, slots keep them small
+    __slots__ = ('_key', '_field_name', '_field_value', '_security_key', 'field_type', '_required')
+
     def __init__(self, name):
-        self._key = uuid.uuid4()
+        # key is generated on first access
+        self._key = None
         self._field_name = name
         self._field_value = ''
         self._security_key = ''
@@ -14,6 +36,8 @@ class Field:
 
     @property
     def key(self):
+        if self._key is None:
+            self._key = uuid.uuid4()
         return self._key
 
     @key.setter
@@ -70,7 +94,30 @@ class Field:
     def __repr__(self):
         return repr(self.field_value)
 
+    def to_record(self):
+        # plain dict which can be stored as json, key is saved only if generated
+        record = {'field_class': type(self).__name__}
+        for slot in _record_slots(type(self)):
+            value = getattr(self, slot, None)
+            if isinstance(value, uuid.UUID):
+                value = str(value)
+            record[slot.lstrip('_')] = value
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        # instance of the class saved in the record, constructor is not called
+        field_class = _field_classes(cls).get(record.get('field_class'), cls)
+        field = field_class.__new__(field_class)
+        for slot in _record_slots(field_class):
+            setattr(field, slot, record.get(slot.lstrip('_')))
+        if isinstance(field._key, str):
+            field._key = uuid.UUID(field._key)
+        return field
+
 class CharField(Field):
+    __slots__ = ('_max_length',)
+
     def __init__(self, name, max_length=100, required=True, default=''):
         Field.__init__(self, name)
         self._max_length = max_length
@@ -103,6 +150,7 @@ class CharField(Field):
             self.field_value = value
 
 class TextField(CharField):
+    __slots__ = ('_rows', '_columns')
     MAX_ROWS = 100
     MAX_COLUMNS = 100
 
@@ -139,6 +187,8 @@ class TextField(CharField):
             self._columns = value
 
 class IntegerField(Field):
+    __slots__ = ()
+
     def __init__(self, name, required=True, default=0):
         Field.__init__(self, name)
         self.field_type = 'int'
@@ -171,6 +221,8 @@ class IntegerField(Field):
         return 0
 
 class BooleanField(Field):
+    __slots__ = ()
+
     def __init__(self, name, required=True, default=False):
         Field.__init__(self, name)
         self.field_type = 'bool'
@@ -191,6 +243,8 @@ class BooleanField(Field):
             raise ValueError('Invalid value passed')
 
 class FloatField(IntegerField):
+    __slots__ = ()
+
     def __init__(self, name, required=True, default=0.0):
         IntegerField.__init__(self, name, required, default)
         self.field_type = 'float'
@@ -210,6 +264,8 @@ class FloatField(IntegerField):
             raise ValueError('Invalid value provided')
 
 class SingleSelectionList(Field):
+    __slots__ = ('_list', '_selected_index', '_selected_value')
+
     def __init__(self, name, required=True, default=[]):
         Field.__init__(self, name)
         self.required = True
@@ -253,6 +309,8 @@ class SingleSelectionList(Field):
         self.select(value)
 
 class MultiSelectionList(Field):
+    __slots__ = ('_list', '_selected_indices', '_selected_values', '_counter')
+
     def __init__(self, name, required=True, default=[]):
         Field.__init__(self, name)
         self.required = required
@@ -6,11 +6,60 @@
 .. moduleauthor:: Ajeet Singh <singh.ajeet@gmail.com>
 """
 import os
+import json
+import errno
 from goldfinch import validFileName
 import pathlib
 import zipfile
 import io
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+#bytes copied per call of copy_file_range/sendfile
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+#members smaller than this are extracted in batches by the parallel extraction
+EXTRACT_SMALL_MEMBER_SIZE = 256 * 1024
+#max uncompressed bytes of small members per batch
+EXTRACT_BATCH_SIZE = 4 * 1024 * 1024
+#packages with fewer members are always extracted sequentially
+EXTRACT_PARALLEL_MIN_MEMBERS = 32
+#file kept in the extracted package folder with the CRC32 and size of every member
+MANIFEST_FILE_NAME = '.package_manifest.json'
+
+
+def copy_file_content(source_path, target_path):
+    """Copies the content of a file without reading it into memory. The copy is done \
+            in kernel with :func:`os.copy_file_range` (or :func:`os.sendfile`) where \
+            available and is streamed in chunks otherwise
+
+    Args:
+        source_path (str): File to be copied
+        target_path (str): File to be created or truncated
+    """
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        _size = os.fstat(src.fileno()).st_size
+        _copied = 0
+        for _copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+            if _copy is None:
+                continue
+            try:
+                while _copied < _size:
+                    if _copy is os.sendfile:
+                        _count = _copy(dst.fileno(), src.fileno(), _copied, COPY_CHUNK_SIZE)
+                    else:
+                        _count = _copy(src.fileno(), dst.fileno(), COPY_CHUNK_SIZE, _copied, _copied)
+                    if _count == 0:
+                        break
+                    _copied += _count
+                return
+            except OSError as msg:
+                if msg.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, \
+                                     errno.ENOTSUP, errno.EBADF):
+                    raise
+        src.seek(_copied)
+        dst.seek(_copied)
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
 
 class File(object):
 
@@ -38,7 +87,7 @@ class File(object):
             if src_file.exists():
                 self.name = src_file.name
                 self.base_path = src_file.parent.absolute()
-                self.content = src_file.read_bytes()
+                self.content = None
                 self._exists = True
                 self._size = src_file.stat().st_size
                 self.path = src_file.absolute()
@@ -99,8 +148,10 @@ class File(object):
     size = property(**size())
 
     def content():
-        doc = "Content of the file in byte format"
+        doc = "Content of the file in byte format, read from disk on every access unless set explicitly. Use :meth:`open` to stream it instead"
         def fget(self):
+            if self._content is None and self.exists:
+                return self.path.read_bytes()
             return self._content
         def fset(self, value):
             self._content = value
@@ -116,62 +167,80 @@ class File(object):
         return locals()
     exists = property(**exists())
 
-    def copy(self, destination, force=False, create_path=False):
-        """Copy file to new location passed as param. If file already exists and force param is True, it will overwrite the destination file else will return with no operation.
+    def open(self):
+        """Opens the file for reading in binary mode, content is streamed from disk
 
-        Args:
-            destination (str): The target location where file needs to be copied
-            force (bool): If set to True, it will overwrite the file in destination
-            create_path (bool): create the destination path if not exists
         Returns:
-            file_path (pathlib.Path): Returns an instance of :class:`Path` if file copied else None
+            file (io.BufferedReader): Binary file object, to be closed by the caller
+        """
+        if self._content is not None:
+            return io.BytesIO(self._content)
+        return open(str(self.path), 'rb')
+
+    def __get_destination_file(self, destination, force, create_path):
+        """Resolves the destination file of :meth:`copy` and :meth:`move`, None if \
+                destination exists and force is not set
         """
         if destination is not None and destination.find('~') >= 0:
             dest_path = pathlib.Path(destination).expanduser()
         elif destination is not None:
             dest_path = pathlib.Path(destination).absolute()
         else:
-            raise Exception('Invalid path provided - {0}'.format(dest_path))
+            raise Exception('Invalid path provided - {0}'.format(destination))
 
         if dest_path.exists():
             if dest_path.is_dir():
                 dest_file = dest_path.joinpath(self.name)
-                if dest_file.exists() and force == True:
-                    dest_file.unlink()
-                    dest_file.write_bytes(self.content)
-                    return dest_file
-                elif dest_file.exists() and force == False:
-                    return None
-                else:
-                    dest_file.write_bytes(self.content)
-                    return dest_file
             else:
-                dest_file = pathlib.Path(dest_path)
-                if force == True:
-                    dest_file.unlink()
-                    dest_file.write_bytes(self.content)
-                    return dest_file
-                else:
-                    return None
-        elif create_path == True:
-            dest_path = dest_path.mkdir(parents=True)
-            dest_file = dest_path.joinpath(self.name)
-            dest_file.write_bytes(self.content)
+                dest_file = dest_path
+            if dest_file.exists() and force == False:
+                return None
             return dest_file
+        elif create_path == True:
+            dest_path.mkdir(parents=True)
+            return dest_path.joinpath(self.name)
         else:
             raise Exception('Invalid destination path')
 
+    def copy(self, destination, force=False, create_path=False):
+        """Copy file to new location passed as param. If file already exists and force param is True, it will overwrite the destination file else will return with no operation.
+
+        Args:
+            destination (str): The target location where file needs to be copied
+            force (bool): If set to True, it will overwrite the file in destination
+            create_path (bool): create the destination path if not exists
+        Returns:
+            file_path (pathlib.Path): Returns an instance of :class:`Path` if file copied else None
+        """
+        dest_file = self.__get_destination_file(destination, force, create_path)
+        if dest_file is None:
+            return None
+        if self._content is not None:
+            dest_file.write_bytes(self._content)
+        else:
+            copy_file_content(str(self.path), str(dest_file))
+        return dest_file
+
     def move(self, destination, force=False, create_path=False):
-        """Moves the current file to the destination. Please see :meth:`copy` for more information on arguments
+        """Moves the current file to the destination. Please see :meth:`copy` for more information on arguments. \
+                On the same file system the file is renamed, otherwise it is copied and removed
         """
-        new_file = self.copy(destination, force, create_path)
-        if new_file is not None:
-            if new_file.exists():
-                old_file = pathlib.Path(self.base_path).joinpath(self.name)
-                self.base_path = new_file.parent.absolute()
-                old_file.unlink()
-                return new_file
-        return None
+        dest_file = self.__get_destination_file(destination, force, create_path)
+        if dest_file is None:
+            return None
+        old_file = pathlib.Path(self.base_path).joinpath(self.name)
+        try:
+            os.replace(str(old_file), str(dest_file))
+        except OSError as msg:
+            if msg.errno != errno.EXDEV:
+                raise
+            new_file = self.copy(str(dest_file), force=True)
+            if new_file is None or not new_file.exists():
+                return None
+            old_file.unlink()
+        self.base_path = dest_file.parent.absolute()
+        self.path = dest_file.absolute()
+        return dest_file
 
 class PackageFile(File):
 
@@ -180,22 +249,18 @@ class PackageFile(File):
             * copy
             * move
             * extract_to
+            * upgrade_to
     """
 
     def __init__(self, file_name, create_if_not_exists=False, base_path=None):
         """TODO: to be defined1. """
         super(PackageFile, self).__init__(file_name, create_if_not_exists, base_path)
         if self.exists:
-            if not zipfile.is_zipfile(self.path._str):
+            if not zipfile.is_zipfile(str(self.path)):
                 raise Exception('Not a valid zip file')
 
-    def extract_to(self, target_path, name_as_sub_folder=True, overwrite=False):
-        """Extract the contents of package to the specified path
-
-        Args:
-            target_path (str): path to the lication where package needs to be extracted
-            name_as_sub_folder (bool): creates a sub folder under target_path with the same name as package file name before extracting contents. Default value is True
-            overwrite (bool): Overwrites the contents if already exists in target location
+    def __get_extract_path(self, target_path, name_as_sub_folder):
+        """Resolves the folder the package is extracted into, see :meth:`extract_to`
         """
         if target_path is not None and target_path.find('~') >= 0:
             dest_path = pathlib.Path(target_path).expanduser()
@@ -203,22 +268,209 @@ class PackageFile(File):
             dest_path = pathlib.Path(target_path).absolute()
         else:
             raise Exception('Can''t accept blank for destination path')
-        if dest_path.exists():
-            if name_as_sub_folder==True:
-                dest_path = dest_path.joinpath(self.base_name).absolute()
-                if not dest_path.exists():
-                    dest_path.mkdir(parents=True)
-            else:
-                if overwrite == True:
-                    for f in dest_path.iterdir():
-                        if f.is_dir():
-                            shutil.rmtree(f)
-                        else:
-                            f.unlink()
-            if len(self.content) > 0:
-                file_bytes = io.BytesIO(self.content)
-                zippedfile = zipfile.ZipFile(file_bytes)
-                zippedfile.extractall(dest_path)
-            return dest_path
-        else:
+        if not dest_path.exists():
             raise Exception('Invalid destination path specified')
+        if name_as_sub_folder==True:
+            dest_path = dest_path.joinpath(self.base_name).absolute()
+            if not dest_path.exists():
+                dest_path.mkdir(parents=True)
+        return dest_path
+
+    def extract_to(self, target_path, name_as_sub_folder=True, overwrite=False, workers=1):
+        """Extract the contents of package to the specified path
+
+        Args:
+            target_path (str): path to the lication where package needs to be extracted
+            name_as_sub_folder (bool): creates a sub folder under target_path with the same name as package file name before extracting contents. Default value is True
+            overwrite (bool): Overwrites the contents if already exists in target location
+            workers (int): Number of threads extracting members in parallel. Default value is 1 (sequential)
+        """
+        dest_path = self.__get_extract_path(target_path, name_as_sub_folder)
+        if name_as_sub_folder != True and overwrite == True:
+            for f in dest_path.iterdir():
+                if f.is_dir():
+                    shutil.rmtree(f)
+                else:
+                    f.unlink()
+        if self.size > 0:
+            #zip members are read through the file handle, the package is never loaded as a whole
+            with self.open() as file_handle, zipfile.ZipFile(file_handle) as zippedfile:
+                members = zippedfile.infolist()
+                self.__extract_members(zippedfile, members, dest_path, workers)
+                PackageFile.__save_manifest(dest_path, members)
+        return dest_path
+
+    def upgrade_to(self, target_path, name_as_sub_folder=True, workers=1):
+        """Upgrades a previous extraction of the package in place. The central directory \
+                (CRC32 and size of the members) is compared with the manifest saved by \
+                the last extraction; only new or changed members are extracted and \
+                only members removed from the package are deleted. Without a \
+                manifest all members are extracted, same as :meth:`extract_to`
+
+        Args:
+            target_path (str): path to the location where package was extracted
+            name_as_sub_folder (bool): same as in :meth:`extract_to`
+            workers (int): Number of threads extracting members in parallel
+
+        Returns:
+            result (tuple): (dest_path, changed, removed) where changed and removed are the \
+                    lists of member names extracted and deleted
+        """
+        dest_path = self.__get_extract_path(target_path, name_as_sub_folder)
+        old_manifest = PackageFile.__load_manifest(dest_path)
+        if self.size <= 0:
+            return (dest_path, [], [])
+        with self.open() as file_handle, zipfile.ZipFile(file_handle) as zippedfile:
+            members = zippedfile.infolist()
+            new_manifest = PackageFile.__get_manifest(members)
+            changed_members = []
+            for member in members:
+                if member.is_dir():
+                    continue
+                if old_manifest is None or old_manifest.get(member.filename) != new_manifest[member.filename]:
+                    changed_members.append(member)
+                    continue
+                #a file changed or removed on disk since the last extraction is restored
+                try:
+                    if os.stat(PackageFile._get_member_path(member.filename, dest_path)).st_size \
+                            != member.file_size:
+                        changed_members.append(member)
+                except OSError:
+                    changed_members.append(member)
+            removed = [] if old_manifest is None else \
+                    [name for name in old_manifest if name not in new_manifest]
+            for name in removed:
+                PackageFile.__remove_member(name, dest_path)
+            self.__extract_members(zippedfile, changed_members, dest_path, workers)
+            PackageFile.__save_manifest(dest_path, members)
+        return (dest_path, [member.filename for member in changed_members], removed)
+
+    def __extract_members(self, zippedfile, members, dest_path, workers):
+        """Extracts the members sequentially or with a pool of workers
+        """
+        if workers <= 1 or self._content is not None or len(members) < EXTRACT_PARALLEL_MIN_MEMBERS:
+            zippedfile.extractall(dest_path, members)
+        else:
+            self.__extract_parallel(members, dest_path, workers)
+
+    @staticmethod
+    def __get_manifest(members):
+        """Returns member name to [CRC32, size] mapping of the file members
+        """
+        return {member.filename: [member.CRC, member.file_size] for member in members \
+                if not member.is_dir()}
+
+    @staticmethod
+    def __save_manifest(dest_path, members):
+        """Saves the manifest of an extraction atomically in the extracted folder
+        """
+        manifest_path = os.path.join(str(dest_path), MANIFEST_FILE_NAME)
+        with open(manifest_path + '.tmp', 'w') as fd:
+            json.dump(PackageFile.__get_manifest(members), fd)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    @staticmethod
+    def __load_manifest(dest_path):
+        """Loads the manifest of the last extraction, None if missing or unreadable
+        """
+        try:
+            with open(os.path.join(str(dest_path), MANIFEST_FILE_NAME), 'r') as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def __remove_member(name, dest_path):
+        """Deletes the file of a removed member and the folders left empty by it
+        """
+        member_path = PackageFile._get_member_path(name, dest_path)
+        try:
+            os.remove(member_path)
+        except OSError:
+            return
+        parent = os.path.dirname(member_path)
+        while parent != str(dest_path) and parent.startswith(str(dest_path)):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    @staticmethod
+    def _get_member_batches(members):
+        """Splits file members into batches for the workers, large members are \
+                extracted one per batch and small members are grouped, largest \
+                batches first
+        """
+        batches = []
+        batch = []
+        batch_size = 0
+        for member in sorted(members, key=lambda member: member.file_size, reverse=True):
+            if member.file_size >= EXTRACT_SMALL_MEMBER_SIZE:
+                batches.append([member])
+                continue
+            batch.append(member)
+            batch_size += member.file_size
+            if batch_size >= EXTRACT_BATCH_SIZE:
+                batches.append(batch)
+                batch = []
+                batch_size = 0
+        if len(batch) > 0:
+            batches.append(batch)
+        return batches
+
+    def __extract_batch(self, batch, dest_path, worker_state, opened_files):
+        """Extracts a batch of members using a file handle owned by the calling worker
+        """
+        zippedfile = getattr(worker_state, 'zippedfile', None)
+        if zippedfile is None:
+            zippedfile = worker_state.zippedfile = zipfile.ZipFile(str(self.path))
+            opened_files.append(zippedfile)
+        for member in batch:
+            zippedfile.extract(member, dest_path)
+        return len(batch)
+
+    def __extract_parallel(self, members, dest_path, workers):
+        """Extracts members with a pool of threads, decompression (zlib) and file writes \
+                release the GIL so threads scale with the number of cores. Members are \
+                extracted by :meth:`zipfile.ZipFile.extract`, so path sanitization is \
+                the same as for :meth:`zipfile.ZipFile.extractall`
+        """
+        file_members = []
+        #directories are created upfront, workers must not race on creating parents
+        with zipfile.ZipFile(str(self.path)) as zippedfile:
+            for member in members:
+                if member.is_dir():
+                    zippedfile.extract(member, dest_path)
+                else:
+                    file_members.append(member)
+        for parent in sorted(set(os.path.dirname(PackageFile._get_member_path(member.filename, dest_path)) \
+                                 for member in file_members)):
+            os.makedirs(parent, exist_ok=True)
+        worker_state = threading.local()
+        opened_files = []
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for _ in executor.map(lambda batch: self.__extract_batch(batch, dest_path, \
+                                                                         worker_state, opened_files), \
+                                      PackageFile._get_member_batches(file_members)):
+                    pass
+        finally:
+            for zippedfile in opened_files:
+                zippedfile.close()
+
+    @staticmethod
+    def _get_member_path(member_name, dest_path):
+        """Returns the path a member is extracted to, sanitized the same way as \
+                :meth:`zipfile.ZipFile.extract` does
+        """
+        arcname = member_name.replace('/', os.path.sep)
+        if os.path.altsep:
+            arcname = arcname.replace(os.path.altsep, os.path.sep)
+        arcname = os.path.splitdrive(arcname)[1]
+        invalid_path_parts = ('', os.path.curdir, os.path.pardir)
+        arcname = os.path.sep.join(x for x in arcname.split(os.path.sep) \
+                                   if x not in invalid_path_parts)
+        if os.path.sep == '\\':
+            arcname = zipfile.ZipFile._sanitize_windows_name(arcname, os.path.sep)
+        return os.path.join(str(dest_path), arcname)
@@ -0,0 +1,290 @@
+"""
+.. module:: watcher
+   :platform: Unix, Windows
+   :synopsis: In-memory directory listings kept fresh by inotify or polling
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+import os
+import stat
+import struct
+import select
+import logging
+import zipfile
+import threading
+import ctypes
+import ctypes.util
+from ui_builder.core import init_log
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+#inotify constants (see inotify(7)) -----
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO \
+        | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')
+EVENT_BUFFER_SIZE = 64 * 1024
+
+
+def stat_key(file_stat):
+    """Returns the identity of a file version, (device, inode, size, mtime), from \
+            the result of :func:`os.stat`
+    """
+    return (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+
+class ZipValidityCache(object):
+    """Remembers whether files are valid (non empty) zip archives. Results are keyed \
+            on (device, inode, size, mtime) so a file is opened only once per \
+            version and a replaced or modified file is checked again
+    """
+
+    def __init__(self):
+        """Creates an empty cache
+        """
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def is_valid(self, file_path, file_stat=None):
+        """Checks whether the file is a valid zip archive
+
+        Args:
+            file_path (str): Path of the file
+            file_stat (os.stat_result): Result of :func:`os.stat` if already known (optional)
+
+        Returns:
+            status (bool): True if file exists and is a valid zip archive
+        """
+        try:
+            if file_stat is None:
+                file_stat = os.stat(file_path)
+        except OSError:
+            return False
+        if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size <= 0:
+            return False
+        _key = stat_key(file_stat)
+        with self._lock:
+            _result = self._results.get(_key)
+        if _result is None:
+            _result = zipfile.is_zipfile(file_path)
+            with self._lock:
+                self._results[_key] = _result
+        return _result
+
+    def discard(self, file_stat):
+        """Forgets the result for a file version
+        """
+        with self._lock:
+            self._results.pop(stat_key(file_stat), None)
+
+
+class _Inotify(object):
+    """Minimal ctypes binding of the Linux inotify API for one directory
+    """
+
+    def __init__(self, directory):
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if _libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            _errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(_errno, 'inotify_add_watch failed for {0}'.format(directory))
+
+    def read_events(self, timeout):
+        """Waits up to timeout seconds and returns a list of (mask, name) tuples
+        """
+        _readable = select.select([self.fd], [], [], timeout)[0]
+        if len(_readable) <= 0:
+            return []
+        try:
+            _buffer = os.read(self.fd, EVENT_BUFFER_SIZE)
+        except BlockingIOError:
+            return []
+        _events = []
+        _offset = 0
+        while _offset + EVENT_HEADER.size <= len(_buffer):
+            _wd, _mask, _cookie, _length = EVENT_HEADER.unpack_from(_buffer, _offset)
+            _offset += EVENT_HEADER.size
+            _name = _buffer[_offset:_offset + _length].rstrip(b'\0')
+            _offset += _length
+            _events.append((_mask, os.fsdecode(_name)))
+        return _events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryIndex(object):
+    """In-memory listing of the files in a directory keyed by case-folded file \
+            name. The listing is kept fresh by an inotify watcher thread, or by \
+            polling the directory mtime where inotify is not available.
+
+    Lookups never scan the directory: a hit is confirmed with a single \
+            :func:`os.stat` of the file and a miss is double checked the same \
+            way, so events not yet processed by the watcher can't return stale \
+            results
+    """
+
+    def __init__(self, directory, validity_cache=None, poll_interval=2.0, use_inotify=True):
+        """Scans the directory once and starts watching it
+
+        Args:
+            directory (str): Directory to be indexed
+            validity_cache (ZipValidityCache): Cache of zip checks, shared between \
+                    indexes (optional)
+            poll_interval (float): Seconds between checks of the polling fallback
+            use_inotify (bool): Set to False to always use polling
+        """
+        self.directory = os.path.abspath(directory)
+        self.validity_cache = validity_cache if validity_cache is not None else ZipValidityCache()
+        self.poll_interval = poll_interval
+        self._files = {}
+        self._lock = threading.Lock()
+        self._directory_mtime = None
+        self.__stop_watching = threading.Event()
+        self.__inotify = None
+        if use_inotify:
+            try:
+                self.__inotify = _Inotify(self.directory)
+            except (OSError, AttributeError) as msg:
+                logger.info('Inotify not available for [%s], falling back to polling...%s', \
+                            self.directory, msg)
+        self.rescan()
+        self.__watcher_thread = threading.Thread(target=self.__watch, daemon=True, \
+                name='DirectoryWatcher-{0}'.format(os.path.basename(self.directory)))
+        self.__watcher_thread.start()
+
+    @property
+    def is_using_inotify(self):
+        """True if the listing is refreshed by inotify events
+        """
+        return self.__inotify is not None
+
+    def rescan(self):
+        """Rebuilds the listing from a full scan of the directory
+        """
+        _files = {}
+        try:
+            self._directory_mtime = os.stat(self.directory).st_mtime_ns
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        _files[entry.name.casefold()] = entry.name
+        except FileNotFoundError:
+            logger.warn('Directory to be indexed does not exist...%s', self.directory)
+        with self._lock:
+            self._files = _files
+
+    def refresh(self, file_name):
+        """Updates the listing for a single file
+
+        Args:
+            file_name (str): Name of the file in the directory
+
+        Returns:
+            file_stat (os.stat_result): Stat of the file or None if it is not a file
+        """
+        try:
+            _stat = os.stat(os.path.join(self.directory, file_name))
+        except OSError:
+            _stat = None
+        with self._lock:
+            if _stat is not None and stat.S_ISREG(_stat.st_mode):
+                self._files[file_name.casefold()] = file_name
+            else:
+                _stat = None
+                if self._files.get(file_name.casefold()) == file_name:
+                    del self._files[file_name.casefold()]
+        return _stat
+
+    def find(self, file_name):
+        """Looks up a file by name ignoring case
+
+        Args:
+            file_name (str): Name of the file
+
+        Returns:
+            result (tuple): (path, stat) of the file or None if not found
+        """
+        with self._lock:
+            _actual_name = self._files.get(file_name.casefold())
+        _stat = self.refresh(_actual_name if _actual_name is not None else file_name)
+        if _stat is None:
+            return None
+        return (os.path.join(self.directory, _actual_name or file_name), _stat)
+
+    def find_valid_zip(self, file_name):
+        """Same as :meth:`find` but returns the path only if the file is a valid zip
+        """
+        _result = self.find(file_name)
+        if _result is not None and self.validity_cache.is_valid(*_result):
+            return _result[0]
+        return None
+
+    def list_files(self):
+        """Returns the paths of all files in the directory
+        """
+        with self._lock:
+            return [os.path.join(self.directory, file_name) for file_name in self._files.values()]
+
+    def list_valid_zips(self):
+        """Returns the paths of all files in the directory which are valid zip archives
+        """
+        return [file_path for file_path in self.list_files() \
+                if self.validity_cache.is_valid(file_path)]
+
+    def stop(self):
+        """Stops watching the directory
+        """
+        self.__stop_watching.set()
+        self.__watcher_thread.join()
+        if self.__inotify is not None:
+            self.__inotify.close()
+            self.__inotify = None
+
+    def __watch(self):
+        """Body of the watcher thread
+        """
+        while not self.__stop_watching.is_set():
+            try:
+                if self.__inotify is not None:
+                    self.__process_events(self.__inotify.read_events(self.poll_interval))
+                else:
+                    self.__stop_watching.wait(self.poll_interval)
+                    if os.stat(self.directory).st_mtime_ns != self._directory_mtime:
+                        self.rescan()
+            except Exception as msg:
+                logger.error('Watching directory [%s] failed...%s', self.directory, msg)
+                self.__stop_watching.wait(self.poll_interval)
+
+    def __process_events(self, events):
+        """Applies inotify events to the listing
+        """
+        for _mask, _name in events:
+            if _mask & IN_Q_OVERFLOW:
+                logger.debug('Inotify queue overflow for [%s], rescanning', self.directory)
+                self.rescan()
+            elif _mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                logger.warn('Watched directory removed or moved, falling back to polling...%s', \
+                            self.directory)
+                self.__inotify.close()
+                self.__inotify = None
+                self.rescan()
+                return
+            elif len(_name) > 0:
+                self.refresh(_name)
@@ -4,70 +4,94 @@
    :synopsis: Manages UUID/GUID for whole application
 
 .. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+
+Ids are kept in a two-way registry (name to id and id to name) which is loaded \
+        from the `app_ids` table once, lookups never go to the database and only \
+        newly allocated ids are written to it
 """
 import uuid
-import tinydb
-import configparser
-import os
+import threading
 from ui_builder.core import constants
+from ui_builder.core.provider.storage import get_storage, index_key
 
 _id_table = None
+_ids_by_name = None
+_names_by_id = None
+_lock = threading.RLock()
 
 def _init_tb():
-    """TODO: to be defined1. """
-    _config = configparser.ConfigParser()
-    _config.read(os.path.join(os.path.abspath(constants.CONF_PATH), 'ui_builder.cfg'))
-    _db = tinydb.TinyDB(constants.UI_BUILDER_DB_PATH)
-    _id_table = _db.table('app_ids')
+    """Opens the ids table and loads the registry from it """
+    global _id_table, _ids_by_name, _names_by_id
+    _id_table = get_storage().table('app_ids')
+    _ids_by_name = {}
+    _names_by_id = {}
+    for _entry in _id_table.all():
+        _ids_by_name[_entry['obj_name']] = _entry['id']
+        _names_by_id[index_key(_entry['id'])] = _entry['obj_name']
 
 def _check_db():
-    """TODO: Docstring for _check_db.
-    :returns: TODO
-
+    """Loads the registry on first use
     """
-    if _id_table is None:
-        _init_tb()
+    if _ids_by_name is None:
+        with _lock:
+            if _ids_by_name is None:
+                _init_tb()
         if _id_table is None:
             raise Exception('Can''t find the ID''s table. Kindly check configured metadata database')
 
 def all_id():
-    """TODO: Docstring for get.
-
-    :arg1: TODO
-    :returns: TODO
-
+    """Returns all entries (obj_name and id) of the ids table
     """
     _check_db()
     return _id_table.all()
 
 def get_id(obj_name):
-    """TODO: Docstring for get_id.
-    :returns: TODO
+    """Returns the id of the object, a new id is allocated if the object has none
+
+    Args:
+        obj_name (str): Name of the object
 
+    Returns:
+        id (uuid): Id of the object
+    """
+    return get_ids([obj_name])[obj_name]
+
+def get_ids(obj_names):
+    """Same as :func:`get_id` for many objects, all new ids are saved to the \
+            database in a single write
+
+    Args:
+        obj_names (iterable): Names of the objects
+
+    Returns:
+        ids (dict): Object name to id mapping
     """
     _check_db()
-    _id = _id_table.get(tinydb.Query()['obj_name'] == obj_name)
-    if _id is not None:
-        return _id['id']
-    else:
-        _id = uuid.uuid4()
-        _id_table.insert({'obj_name':obj_name, 'id':_id})
-        return _id
+    _ids = {}
+    with _lock:
+        _new_ids = {}
+        for obj_name in obj_names:
+            _id = _ids_by_name.get(obj_name, _new_ids.get(obj_name))
+            if _id is None:
+                _id = _new_ids[obj_name] = uuid.uuid4()
+            _ids[obj_name] = _id
+        if len(_new_ids) > 0:
+            with get_storage().transaction():
+                for obj_name, _id in _new_ids.items():
+                    _id_table.insert({'obj_name':obj_name, 'id':_id})
+            for obj_name, _id in _new_ids.items():
+                _ids_by_name[obj_name] = _id
+                _names_by_id[index_key(_id)] = obj_name
+    return _ids
 
 def find_id(obj_name):
-    """TODO: Docstring for find_id.
-    :returns: TODO
-
+    """Returns the id of the object or None if it has none
     """
     _check_db()
-    _id = _id_table.get(tinydb.Query()['obj_name'] == obj_name)
-    return _id['id']
+    return _ids_by_name.get(obj_name)
 
 def find_name(obj_id):
-    """TODO: Docstring for find_name.
-    :returns: TODO
-
+    """Returns the name of the object having the id or None if not found
     """
     _check_db()
-    _obj_name = _id_table.get(tinydb.Query()['id'] == obj_id)
-    return _obj_name['obj_name']
+    return _names_by_id.get(index_key(obj_id))
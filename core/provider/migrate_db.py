@@ -0,0 +1,74 @@
+"""
+.. module:: migrate_db
+   :platform: Unix, Windows
+   :synopsis: One-shot migration of the metadata database from TinyDB to SQLite
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+
+Copies every table of the TinyDB (json) database into a SQLite database, document \
+        ids are kept. Switch `ui_builder_db` and `ui_builder_db_backend = sqlite` \
+        in `ui_builder.cfg` to the new database afterwards::
+
+    python -m ui_builder.core.provider.migrate_db <tinydb json file> <sqlite file>
+"""
+import os
+import sys
+import logging
+import argparse
+from tinydb import TinyDB
+from ui_builder.core import init_log
+from ui_builder.core.provider.sqlite_storage import SQLiteStorage
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+
+def migrate(tinydb_path, sqlite_path):
+    """Copies all tables from the TinyDB database into the SQLite database in a \
+            single transaction
+
+    Args:
+        tinydb_path (str): Path of the existing TinyDB json file
+        sqlite_path (str): Path of the SQLite database, must not contain the tables yet
+
+    Returns:
+        counts (dict): Table name to number of migrated documents
+    """
+    if not os.path.exists(tinydb_path):
+        raise IOError('TinyDB database not found...{0}'.format(tinydb_path))
+    source = TinyDB(tinydb_path)
+    target = SQLiteStorage(sqlite_path)
+    counts = {}
+    try:
+        with target.transaction():
+            for table_name in sorted(source.tables()):
+                table = target.table(table_name)
+                if len(table) > 0:
+                    raise Exception('Target table is not empty, migration aborted...{0}'.format(table_name))
+                documents = source.table(table_name).all()
+                for document in documents:
+                    table.insert(dict(document), doc_id=document.doc_id)
+                counts[table_name] = len(documents)
+                logger.info('Migrated table [%s] with %d document(s)', table_name, len(documents))
+    finally:
+        source.close()
+        target.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Migrates the metadata database from TinyDB to SQLite')
+    parser.add_argument('tinydb_path', help='existing TinyDB json file')
+    parser.add_argument('sqlite_path', help='SQLite database file to be created')
+    args = parser.parse_args(argv)
+    counts = migrate(args.tinydb_path, args.sqlite_path)
+    for table_name, count in counts.items():
+        print('{0}: {1} document(s)'.format(table_name, count))
+    print('Set "ui_builder_db = {0}" and "ui_builder_db_backend = sqlite" in ui_builder.cfg'\
+          .format(os.path.abspath(args.sqlite_path)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
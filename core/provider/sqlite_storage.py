@@ -0,0 +1,322 @@
+"""
+.. module:: sqlite_storage
+   :platform: Unix, Windows
+   :synopsis: SQLite backend of the metadata database
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+import re
+import json
+import sqlite3
+import logging
+import threading
+import contextlib
+from tinydb.table import Document
+from ui_builder.core import constants, init_log
+from ui_builder.core.provider.storage import TABLE_INDEXES, ReadWriteLock, index_key
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+#prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+#PRAGMA synchronous per fsync policy, with WAL NORMAL syncs at checkpoints only
+SYNCHRONOUS_MODES = {
+    constants.DB_FSYNC_ALWAYS: 'FULL',
+    constants.DB_FSYNC_INTERVAL: 'NORMAL',
+    constants.DB_FSYNC_OS: 'OFF',
+}
+
+
+def _quote_table(name):
+    """Returns the quoted table name, names are restricted to identifiers
+    """
+    if not _IDENTIFIER.match(name):
+        raise ValueError('Invalid table name...{0}'.format(name))
+    return '"{0}"'.format(name)
+
+
+def _field_expression(field):
+    """Returns the SQL expression extracting a (dotted) field from the document column. \
+            The path is a literal so the expression matches the one of the index
+    """
+    parts = field.split('.')
+    if not all(_IDENTIFIER.match(part) for part in parts):
+        raise ValueError('Invalid field name...{0}'.format(field))
+    return "json_extract(document, '$.{0}')".format(field)
+
+
+def _to_sql(value):
+    """Converts a lookup value to the value stored by json_extract
+    """
+    value = index_key(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class SQLiteTable(object):
+    """Table of the metadata database stored in SQLite. Documents are stored as JSON \
+            in a `document` column and every indexed field has an expression index, \
+            so lookups use the index instead of a table scan. Provides the same \
+            API as :class:`IndexedTable`
+    """
+
+    def __init__(self, storage, name, indexes=()):
+        """Creates the table and its indexes if they don't exist
+
+        Args:
+            storage (SQLiteStorage): Storage owning the table
+            name (str): Name of the table
+            indexes (iterable): Fields to be indexed
+        """
+        self._storage = storage
+        self._name = name
+        self._quoted_name = _quote_table(name)
+        with self._storage.write() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS {0} (doc_id INTEGER PRIMARY KEY '\
+                               'AUTOINCREMENT, document TEXT NOT NULL)'.format(self._quoted_name))
+        for field in indexes:
+            self.add_index(field)
+
+    @property
+    def name(self):
+        return self._name
+
+    def __len__(self):
+        with self._storage.read() as connection:
+            return connection.execute('SELECT COUNT(*) FROM {0}'.format(self._quoted_name)).fetchone()[0]
+
+    def add_index(self, field):
+        """Creates an expression index on the field
+        """
+        _index_name = _quote_table('ix_{0}_{1}'.format(self._name, field.replace('.', '_')))
+        with self._storage.write() as connection:
+            connection.execute('CREATE INDEX IF NOT EXISTS {0} ON {1} ({2})'\
+                               .format(_index_name, self._quoted_name, _field_expression(field)))
+
+    @staticmethod
+    def _to_document(row):
+        return Document(json.loads(row[1]), row[0])
+
+    def all(self):
+        """Returns all documents of the table
+        """
+        with self._storage.read() as connection:
+            return [SQLiteTable._to_document(row) for row in connection.execute(\
+                    'SELECT doc_id, document FROM {0} ORDER BY doc_id'.format(self._quoted_name))]
+
+    def find(self, field, value):
+        """Returns all documents having the value in the field
+        """
+        with self._storage.read() as connection:
+            return [SQLiteTable._to_document(row) for row in connection.execute(\
+                    'SELECT doc_id, document FROM {0} WHERE {1} = ? ORDER BY doc_id'\
+                    .format(self._quoted_name, _field_expression(field)), (_to_sql(value),))]
+
+    def find_one(self, field, value):
+        """Same as :meth:`find` but returns the first document or None
+        """
+        _documents = self.find(field, value)
+        return _documents[0] if len(_documents) > 0 else None
+
+    def count(self, field, value):
+        """Returns the number of documents having the value in the field
+        """
+        with self._storage.read() as connection:
+            return connection.execute('SELECT COUNT(*) FROM {0} WHERE {1} = ?'\
+                                      .format(self._quoted_name, _field_expression(field)), \
+                                      (_to_sql(value),)).fetchone()[0]
+
+    def contains(self, field, value):
+        """Returns True if any document has the value in the field
+        """
+        return self.count(field, value) > 0
+
+    def insert(self, document, doc_id=None):
+        """Inserts a document and returns its id
+
+        Args:
+            document (dict): Document to be inserted
+            doc_id (int): Id of the document, assigned by the database if not passed
+        """
+        with self._storage.write() as connection:
+            return connection.execute('INSERT INTO {0} (doc_id, document) VALUES (?, ?)'\
+                                      .format(self._quoted_name), \
+                                      (doc_id, json.dumps(document, default=str))).lastrowid
+
+    def update(self, fields, field, value):
+        """Updates the documents having the value in the field, see :meth:`IndexedTable.update`
+        """
+        with self._storage.write() as connection:
+            _rows = connection.execute('SELECT doc_id, document FROM {0} WHERE {1} = ?'\
+                                       .format(self._quoted_name, _field_expression(field)), \
+                                       (_to_sql(value),)).fetchall()
+            _updates = []
+            for doc_id, document in _rows:
+                document = json.loads(document)
+                if callable(fields):
+                    fields(document)
+                else:
+                    document.update(fields)
+                _updates.append((json.dumps(document, default=str), doc_id))
+            connection.executemany('UPDATE {0} SET document = ? WHERE doc_id = ?'\
+                                   .format(self._quoted_name), _updates)
+            return [doc_id for doc_id, _ in _rows]
+
+    def upsert(self, document, field, value):
+        """Updates the documents having the value in the field or inserts the document \
+                if there is none
+        """
+        with self._storage.write():
+            doc_ids = self.update(document, field, value)
+            if len(doc_ids) <= 0:
+                doc_ids = [self.insert(document)]
+            return doc_ids
+
+    def remove(self, field, value):
+        """Removes the documents having the value in the field
+        """
+        with self._storage.write() as connection:
+            _rows = connection.execute('SELECT doc_id FROM {0} WHERE {1} = ?'\
+                                       .format(self._quoted_name, _field_expression(field)), \
+                                       (_to_sql(value),)).fetchall()
+            connection.executemany('DELETE FROM {0} WHERE doc_id = ?'.format(self._quoted_name), _rows)
+            return [row[0] for row in _rows]
+
+
+class SQLiteStorage(object):
+    """Metadata database stored in SQLite using WAL journaling. Has the same API as \
+            :class:`Storage`; writes outside of :meth:`transaction` are committed \
+            one by one, writes inside it are committed together.
+
+    Every thread reads through its own connection, so readers run concurrently \
+            with each other and with the writer (WAL). All writes go through a \
+            single connection guarded by a :class:`ReadWriteLock`
+    """
+
+    def __init__(self, db_path, fsync_policy=None):
+        """Opens (or creates) the database
+
+        Args:
+            db_path (str): Path of the SQLite database file
+            fsync_policy (str): always, interval or os, see \
+                    :class:`~ui_builder.core.provider.storage.WriteBehindJSONStorage`. \
+                    Default is the configured `db_fsync_policy`
+        """
+        self.db_path = db_path
+        _policy = (fsync_policy if fsync_policy is not None else constants.DB_FSYNC_POLICY).lower()
+        if _policy not in SYNCHRONOUS_MODES:
+            raise ValueError('Unknown fsync policy...{0}'.format(_policy))
+        self._synchronous = SYNCHRONOUS_MODES[_policy]
+        self._connection = self.__connect()
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._lock = ReadWriteLock()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._transaction_depth = 0
+        self._tables = {}
+
+    def __connect(self):
+        #autocommit mode, transactions are started explicitly
+        _connection = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False, \
+                                      cached_statements=STATEMENT_CACHE_SIZE)
+        _connection.execute('PRAGMA synchronous={0}'.format(self._synchronous))
+        return _connection
+
+    def __get_reader(self):
+        """Returns the read connection of the calling thread
+        """
+        _connection = getattr(self._local, 'connection', None)
+        if _connection is None:
+            _connection = self._local.connection = self.__connect()
+            with self._readers_lock:
+                self._readers.append(_connection)
+        return _connection
+
+    @contextlib.contextmanager
+    def read(self):
+        """Context giving a connection for reading. The thread holding the write lock \
+                reads through the write connection so it sees its own changes
+        """
+        if self._lock.is_writer:
+            yield self._connection
+        else:
+            yield self.__get_reader()
+
+    @contextlib.contextmanager
+    def write(self):
+        """Context giving the connection for writing. Outside of :meth:`transaction` \
+                the statements run in a transaction of their own, inside they \
+                join the open one
+        """
+        with self._lock.writing():
+            if self._transaction_depth > 0:
+                yield self._connection
+            else:
+                with self.transaction():
+                    yield self._connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Runs all writes in the context as one transaction, rolled back if the \
+                context raises. Nested contexts are savepoints, a failing inner \
+                context only rolls back its own changes
+        """
+        with self._lock.writing():
+            _savepoint = 'sp_{0}'.format(self._transaction_depth)
+            if self._transaction_depth == 0:
+                self._connection.execute('BEGIN IMMEDIATE')
+            else:
+                self._connection.execute('SAVEPOINT {0}'.format(_savepoint))
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self._connection.execute('ROLLBACK')
+                else:
+                    self._connection.execute('ROLLBACK TO {0}'.format(_savepoint))
+                    self._connection.execute('RELEASE {0}'.format(_savepoint))
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._connection.execute('COMMIT')
+            else:
+                self._connection.execute('RELEASE {0}'.format(_savepoint))
+
+    def table(self, name, indexes=()):
+        """Returns the table having the name passed as argument, see :meth:`Storage.table`
+        """
+        with self._lock.writing():
+            _table = self._tables.get(name)
+            if _table is None:
+                _table = self._tables[name] = SQLiteTable(self, name, TABLE_INDEXES.get(name, ()))
+        for field in indexes:
+            _table.add_index(field)
+        return _table
+
+    def tables(self):
+        """Returns the names of all tables in the database
+        """
+        with self.read() as connection:
+            return {row[0] for row in connection.execute(\
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")}
+
+    def flush(self):
+        """Changes are committed to SQLite, nothing is pending
+        """
+
+    def close(self):
+        """Closes the database
+        """
+        with self._lock.writing():
+            with self._readers_lock:
+                for _connection in self._readers:
+                    _connection.close()
+                self._readers = []
+            self._connection.close()
@@ -0,0 +1,659 @@
+"""
+.. module:: storage
+   :platform: Unix, Windows
+   :synopsis: Indexed and cached access to the metadata database
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+import os
+import json
+import uuid
+import atexit
+import logging
+import threading
+import contextlib
+from tinydb import TinyDB
+from tinydb.table import Document
+from tinydb.storages import Storage as TinyDBStorage, touch
+from ui_builder.core import constants, init_log
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+#fields queried per table, each gets a hash index. Nested fields are dotted
+TABLE_INDEXES = {
+    'Packages': ('Details.id',),
+    'Package_Index': ('Id', 'Name'),
+    'Components': ('Details.id',),
+    'Components_Index': ('Id', 'Package_Id'),
+    'Source': ('name', 'Name'),
+    'PackageSource': ('Name',),
+    'PackageIndex': ('Name',),
+    'app_ids': ('obj_name', 'id'),
+    'system_managers': ('name',),
+}
+
+_MISSING = object()
+
+
+def index_key(value):
+    """Returns the value used as index key, ids are compared as strings since they are \
+            stored as strings in the database
+    """
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (list, dict, set)):
+        #unhashable values are not indexed
+        return _MISSING
+    return value
+
+
+def get_field(document, field):
+    """Returns the value of a (dotted) field of a document or a marker if missing
+    """
+    value = document
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return index_key(value)
+
+
+class ReadWriteLock(object):
+    """Lock allowing many concurrent readers or a single writer. Waiting writers \
+            block new readers so writers don't starve. Both modes are reentrant \
+            and the writing thread may also read; upgrading a read lock to a \
+            write lock is only possible if no other thread is reading
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        _me = threading.get_ident()
+        with self._condition:
+            if self._writer != _me and _me not in self._readers:
+                while self._writer is not None or self._waiting_writers > 0:
+                    self._condition.wait()
+            self._readers[_me] = self._readers.get(_me, 0) + 1
+
+    def release_read(self):
+        _me = threading.get_ident()
+        with self._condition:
+            self._readers[_me] -= 1
+            if self._readers[_me] <= 0:
+                del self._readers[_me]
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        _me = threading.get_ident()
+        with self._condition:
+            if self._writer == _me:
+                self._write_depth += 1
+                return
+            self._waiting_writers += 1
+            while self._writer is not None \
+                    or any(_reader != _me for _reader in self._readers):
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = _me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._condition:
+            self._write_depth -= 1
+            if self._write_depth <= 0:
+                self._writer = None
+                self._condition.notify_all()
+
+    @property
+    def is_writer(self):
+        """True if the calling thread holds the write lock
+        """
+        return self._writer == threading.get_ident()
+
+    @contextlib.contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class WriteBehindJSONStorage(TinyDBStorage):
+    """TinyDB storage keeping the parsed database in memory. The file is read once \
+            and writes only update the in-memory image, which is written to the \
+            file according to the fsync policy:
+
+        * always - written and fsync'ed on every commit
+        * interval - written and fsync'ed by a background thread at most every \
+                `flush_interval` seconds while there are changes
+        * os - same as interval but without fsync, durability is left to the OS
+
+    Files are replaced atomically (temp file + rename), so a crash never leaves a \
+            partially written database behind
+    """
+
+    def __init__(self, path, fsync_policy=None, flush_interval=None, lock=None, **kwargs):
+        """Loads the database file
+
+        Args:
+            path (str): Path of the json file
+            fsync_policy (str): always, interval or os (see above)
+            flush_interval (float): Seconds between background flushes
+            lock (ReadWriteLock): Lock guarding the in-memory image, background \
+                    flushes hold it for reading so they never see a half done write
+            **kwargs: Passed to :func:`json.dump`
+        """
+        super(WriteBehindJSONStorage, self).__init__()
+        self.path = path
+        self.fsync_policy = (fsync_policy if fsync_policy is not None else constants.DB_FSYNC_POLICY).lower()
+        if self.fsync_policy not in (constants.DB_FSYNC_ALWAYS, constants.DB_FSYNC_INTERVAL, \
+                                     constants.DB_FSYNC_OS):
+            raise ValueError('Unknown fsync policy...{0}'.format(self.fsync_policy))
+        self.flush_interval = flush_interval if flush_interval is not None else constants.DB_FLUSH_INTERVAL
+        self._lock = lock if lock is not None else ReadWriteLock()
+        self._kwargs = kwargs
+        self._data = None
+        self._is_dirty = False
+        self._deferred = 0
+        self._flush_lock = threading.Lock()
+        self._stop_flushing = threading.Event()
+        self._flush_thread = None
+        touch(path, create_dirs=False)
+        if os.path.getsize(path) > 0:
+            with open(path, 'r') as fd:
+                self._data = json.load(fd)
+        if self.fsync_policy != constants.DB_FSYNC_ALWAYS:
+            self._flush_thread = threading.Thread(target=self.__flush_periodically, daemon=True, \
+                                                  name='MetadataDBFlushThread')
+            self._flush_thread.start()
+
+    def read(self):
+        return self._data
+
+    def write(self, data):
+        self._data = data
+        self._is_dirty = True
+        if self.fsync_policy == constants.DB_FSYNC_ALWAYS and self._deferred <= 0:
+            self.flush()
+
+    def defer_flush(self):
+        """Holds back flushes of the always policy until :meth:`resume_flush`, used to \
+                write all changes of a transaction at once
+        """
+        self._deferred += 1
+
+    def resume_flush(self):
+        self._deferred -= 1
+        if self._deferred <= 0 and self._is_dirty and self.fsync_policy == constants.DB_FSYNC_ALWAYS:
+            self.flush()
+
+    def flush(self):
+        """Writes the in-memory image to the file if it has changed
+        """
+        with self._flush_lock:
+            if not self._is_dirty:
+                return
+            self._is_dirty = False
+            _temp_path = self.path + '.tmp'
+            try:
+                with open(_temp_path, 'w') as fd:
+                    json.dump(self._data, fd, **self._kwargs)
+                    if self.fsync_policy != constants.DB_FSYNC_OS:
+                        fd.flush()
+                        os.fsync(fd.fileno())
+                os.replace(_temp_path, self.path)
+            except Exception:
+                self._is_dirty = True
+                raise
+
+    def __flush_periodically(self):
+        while not self._stop_flushing.wait(self.flush_interval):
+            try:
+                with self._lock.reading():
+                    self.flush()
+            except Exception as msg:
+                logger.error('Unable to flush metadata database [%s]...%s', self.path, msg)
+
+    def stop_flushing(self):
+        """Stops the background flushes, must not be called while holding the lock
+        """
+        self._stop_flushing.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+
+    def close(self):
+        self.stop_flushing()
+        self.flush()
+
+
+class IndexedTable(object):
+    """Table of the metadata database with hash indexes on the queried fields and a \
+            read cache of the documents. The documents are loaded once, lookups \
+            by an indexed field are dictionary hits and writes update table, \
+            cache and indexes together.
+
+    Note:
+        Documents returned are shared with the cache, modify them only through \
+                :meth:`update` or :meth:`upsert`
+    """
+
+    def __init__(self, table, indexes=(), lock=None, before_write=None):
+        """Wraps the table passed as argument
+
+        Args:
+            table (tinydb.table.Table): Table to be wrapped
+            indexes (iterable): Fields to be indexed
+            lock (ReadWriteLock): Lock shared by the tables of a storage (optional)
+            before_write (callable): Called with the table and the documents about \
+                    to change (doc id to current document, None for new documents) \
+                    before they are written, used by :meth:`Storage.transaction` to \
+                    keep their previous state (optional)
+        """
+        self._table = table
+        self._before_write = before_write
+        self._index_fields = tuple(indexes)
+        self._documents = None
+        self._indexes = None
+        self._lock = lock if lock is not None else ReadWriteLock()
+
+    @property
+    def name(self):
+        return self._table.name
+
+    def __len__(self):
+        self.__get_documents()
+        with self._lock.reading():
+            return len(self.__get_documents())
+
+    def __get_documents(self):
+        """Loads the documents and builds the indexes on first access
+        """
+        if self._documents is None:
+            with self._lock.writing():
+                if self._documents is None:
+                    self._indexes = {field: {} for field in self._index_fields}
+                    _documents = {}
+                    for document in self._table.all():
+                        #detached from the in-memory image of the database
+                        document = Document(json.loads(json.dumps(document, default=str)), document.doc_id)
+                        _documents[document.doc_id] = document
+                        self.__index(document)
+                    self._documents = _documents
+                    logger.debug('Table [%s] cached with %d document(s)', self.name, len(_documents))
+        return self._documents
+
+    def add_index(self, field):
+        """Adds a hash index on the field, the index is built on next access
+        """
+        with self._lock.writing():
+            if field not in self._index_fields:
+                self._index_fields += (field,)
+                self.invalidate()
+
+    def invalidate(self):
+        """Drops the cache and indexes, they are rebuilt on next access
+        """
+        with self._lock.writing():
+            self._documents = None
+            self._indexes = None
+            self._table.clear_cache()
+
+    def __index(self, document):
+        for field, index in self._indexes.items():
+            key = get_field(document, field)
+            if key is not _MISSING:
+                index.setdefault(key, set()).add(document.doc_id)
+
+    def __unindex(self, document):
+        for field, index in self._indexes.items():
+            key = get_field(document, field)
+            if key is not _MISSING and key in index:
+                index[key].discard(document.doc_id)
+                if len(index[key]) <= 0:
+                    del index[key]
+
+    def __find_ids(self, field, value):
+        """Returns ids of documents having the value in the field
+        """
+        _documents = self.__get_documents()
+        key = index_key(value)
+        if field in self._indexes:
+            return sorted(self._indexes[field].get(key, ()))
+        logger.debug('Field [%s] of table [%s] is not indexed, scanning table', field, self.name)
+        return [doc_id for doc_id, document in _documents.items() if get_field(document, field) == key]
+
+    def __replace(self, doc_id, document):
+        """Replaces a document in cache and indexes, the same change is written to \
+                the table by the caller so the table is never read again
+        """
+        _old = self._documents.pop(doc_id, None)
+        if _old is not None:
+            self.__unindex(_old)
+        if document is not None:
+            #same round trip as writing to and reading from the database file
+            _new = Document(json.loads(json.dumps(document, default=str)), doc_id)
+            self._documents[doc_id] = _new
+            self.__index(_new)
+
+    def all(self):
+        """Returns all documents of the table
+        """
+        self.__get_documents()
+        with self._lock.reading():
+            return list(self.__get_documents().values())
+
+    def find(self, field, value):
+        """Returns all documents having the value in the field
+
+        Args:
+            field (str): Name of the field, nested fields are separated by dot
+            value (object): Value to look for
+
+        Returns:
+            documents (list): Matching documents
+        """
+        self.__get_documents()
+        with self._lock.reading():
+            return [self._documents[doc_id] for doc_id in self.__find_ids(field, value)]
+
+    def find_one(self, field, value):
+        """Same as :meth:`find` but returns the first document or None
+        """
+        _documents = self.find(field, value)
+        return _documents[0] if len(_documents) > 0 else None
+
+    def count(self, field, value):
+        """Returns the number of documents having the value in the field
+        """
+        self.__get_documents()
+        with self._lock.reading():
+            return len(self.__find_ids(field, value))
+
+    def contains(self, field, value):
+        """Returns True if any document has the value in the field
+        """
+        return self.count(field, value) > 0
+
+    def insert(self, document):
+        """Inserts a document and returns its id
+        """
+        with self._lock.writing():
+            self.__get_documents()
+            if self._before_write is not None:
+                #id of the new document is known once inserted, the table is seen unchanged
+                self._before_write(self, {})
+            doc_id = self._table.insert(document)
+            if self._before_write is not None:
+                self._before_write(self, {doc_id: None})
+            self.__replace(doc_id, document)
+            return doc_id
+
+    def update(self, fields, field, value):
+        """Updates the documents having the value in the field
+
+        Args:
+            fields (dict or callable): Fields to be set or a function modifying the \
+                    document in place
+            field (str): Field to match
+            value (object): Value to match
+
+        Returns:
+            doc_ids (list): Ids of updated documents
+        """
+        with self._lock.writing():
+            doc_ids = self.__find_ids(field, value)
+            if len(doc_ids) > 0:
+                if self._before_write is not None:
+                    self._before_write(self, {doc_id: self._documents[doc_id] for doc_id in doc_ids})
+                self._table.update(fields, doc_ids=doc_ids)
+                for doc_id in doc_ids:
+                    _document = json.loads(json.dumps(self._documents[doc_id]))
+                    if callable(fields):
+                        fields(_document)
+                    else:
+                        _document.update(fields)
+                    self.__replace(doc_id, _document)
+            return doc_ids
+
+    def upsert(self, document, field, value):
+        """Updates the documents having the value in the field or inserts the document \
+                if there is none
+
+        Returns:
+            doc_ids (list): Ids of updated or inserted documents
+        """
+        with self._lock.writing():
+            doc_ids = self.update(document, field, value)
+            if len(doc_ids) <= 0:
+                doc_ids = [self.insert(document)]
+            return doc_ids
+
+    def remove(self, field, value):
+        """Removes the documents having the value in the field
+
+        Returns:
+            doc_ids (list): Ids of removed documents
+        """
+        with self._lock.writing():
+            doc_ids = self.__find_ids(field, value)
+            if len(doc_ids) > 0:
+                if self._before_write is not None:
+                    self._before_write(self, {doc_id: self._documents[doc_id] for doc_id in doc_ids})
+                self._table.remove(doc_ids=doc_ids)
+                for doc_id in doc_ids:
+                    self.__replace(doc_id, None)
+            return doc_ids
+
+
+class Storage(object):
+    """Metadata database with indexed tables, see :class:`IndexedTable`. Tables are \
+            created once per storage, so indexes and caches live as long as the \
+            storage is open. The database file is parsed once and kept in memory \
+            (see :class:`WriteBehindJSONStorage`); all tables share one \
+            :class:`ReadWriteLock`, so threads read concurrently and writes are \
+            serialized.
+
+    Writes which belong together are grouped with :meth:`transaction` (unit of \
+            work), they are written to the file once and undone together if the \
+            transaction fails
+    """
+
+    def __init__(self, db_path=None, fsync_policy=None, flush_interval=None):
+        """Opens the metadata database
+
+        Args:
+            db_path (str): Path of the database file, default is the configured \
+                    `ui_builder_db`
+            fsync_policy (str): See :class:`WriteBehindJSONStorage`, default is the \
+                    configured `db_fsync_policy`
+            flush_interval (float): Default is the configured `db_flush_interval`
+        """
+        self.db_path = db_path if db_path is not None else constants.UI_BUILDER_DB_PATH
+        self._lock = ReadWriteLock()
+        #ids (uuid) are stored as strings
+        self._db = TinyDB(self.db_path, storage=WriteBehindJSONStorage, fsync_policy=fsync_policy, \
+                          flush_interval=flush_interval, lock=self._lock, default=str)
+        self._tables = {}
+        #undo log per open transaction: table name to (table existed, doc id to \
+        #document before the first change in the transaction, None if inserted)
+        self._savepoints = []
+
+    def table(self, name, indexes=()):
+        """Returns the table having the name passed as argument
+
+        Args:
+            name (str): Name of the table
+            indexes (iterable): Fields to be indexed in addition to the ones listed \
+                    in :data:`TABLE_INDEXES`
+
+        Returns:
+            table (IndexedTable): The table
+        """
+        with self._lock.writing():
+            _table = self._tables.get(name)
+            if _table is None:
+                _table = self._tables[name] = IndexedTable(self._db.table(name), \
+                                                           TABLE_INDEXES.get(name, ()), self._lock, \
+                                                           self.__save_documents)
+        for field in indexes:
+            _table.add_index(field)
+        return _table
+
+    def tables(self):
+        """Returns the names of all tables in the database
+        """
+        with self._lock.reading():
+            return self._db.tables()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Groups writes which belong together, e.g., the registration of a package. \
+                No other thread accesses this storage while the context is open, the \
+                changes are written to the file together at the end and rolled back \
+                if the context raises. Nested contexts act as savepoints, a failing \
+                inner context only rolls back its own changes
+        """
+        with self._lock.writing():
+            self._savepoints.append({})
+            self._db.storage.defer_flush()
+            try:
+                yield self
+            except BaseException:
+                self.__rollback(self._savepoints.pop())
+                raise
+            else:
+                _saved = self._savepoints.pop()
+                if len(self._savepoints) > 0:
+                    #documents first changed here still have to be restored by the outer transaction
+                    for name, (existed, documents) in _saved.items():
+                        _outer = self._savepoints[-1].setdefault(name, (existed, {}))
+                        for doc_id, document in documents.items():
+                            _outer[1].setdefault(doc_id, document)
+            finally:
+                self._db.storage.resume_flush()
+
+    def __save_documents(self, table, documents):
+        """Keeps the documents as they were before their first change in the current \
+                transaction. Cached documents are never modified in place, so they \
+                are kept as they are and nothing is copied
+        """
+        if len(self._savepoints) > 0:
+            if table.name not in self._savepoints[-1]:
+                _existed = table.name in (self._db.storage.read() or {})
+                self._savepoints[-1][table.name] = (_existed, {})
+            _saved = self._savepoints[-1][table.name][1]
+            for doc_id, document in documents.items():
+                _saved.setdefault(doc_id, document)
+
+    def __rollback(self, saved):
+        """Restores the saved documents and drops the caches of their tables
+        """
+        if len(saved) <= 0:
+            return
+        _data = self._db.storage.read() or {}
+        for name, (existed, documents) in saved.items():
+            if not existed:
+                _data.pop(name, None)
+            else:
+                _table_data = _data.setdefault(name, {})
+                for doc_id, document in documents.items():
+                    if document is None:
+                        _table_data.pop(str(doc_id), None)
+                    else:
+                        _table_data[str(doc_id)] = json.loads(json.dumps(document, default=str))
+            if name in self._tables:
+                self._tables[name].invalidate()
+        self._db.storage.write(_data)
+        logger.debug('Transaction rolled back for table(s) %s', sorted(saved))
+
+    def flush(self):
+        """Writes pending changes to the database file
+        """
+        with self._lock.reading():
+            self._db.storage.flush()
+
+    def close(self):
+        """Flushes pending changes and closes the database
+        """
+        self._db.storage.stop_flushing()
+        with self._lock.writing():
+            self._db.close()
+
+
+#storages shared by the process, see get_storage
+_SHARED_STORAGES = {}
+_SHARED_STORAGES_LOCK = threading.Lock()
+
+
+def open_storage(db_path=None, backend=None):
+    """Opens the metadata database with the configured backend
+
+    Args:
+        db_path (str): Path of the database, default is the configured `ui_builder_db`
+        backend (str): `tinydb` or `sqlite`, default is the configured `ui_builder_db_backend`
+
+    Returns:
+        storage (object): An instance of :class:`Storage` or :class:`SQLiteStorage`
+    """
+    db_path = db_path if db_path is not None else constants.UI_BUILDER_DB_PATH
+    backend = (backend if backend is not None else constants.UI_BUILDER_DB_BACKEND).lower()
+    if backend == constants.DB_BACKEND_SQLITE:
+        from ui_builder.core.provider.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(db_path)
+    elif backend == constants.DB_BACKEND_TINYDB:
+        return Storage(db_path)
+    raise ValueError('Unknown metadata database backend...{0}'.format(backend))
+
+
+def get_storage(db_path=None, backend=None):
+    """Returns the storage shared by the whole process for a database, it is opened \
+            on first use. Managers and threads use this instead of opening the \
+            database themselves, so the file is parsed once and all of them see \
+            the same cache
+
+    Args:
+        db_path (str): Path of the database, default is the configured `ui_builder_db`
+        backend (str): `tinydb` or `sqlite`, default is the configured `ui_builder_db_backend`
+
+    Returns:
+        storage (object): An instance of :class:`Storage` or :class:`SQLiteStorage`
+    """
+    db_path = os.path.abspath(db_path if db_path is not None else constants.UI_BUILDER_DB_PATH)
+    backend = (backend if backend is not None else constants.UI_BUILDER_DB_BACKEND).lower()
+    with _SHARED_STORAGES_LOCK:
+        _storage = _SHARED_STORAGES.get((backend, db_path))
+        if _storage is None:
+            _storage = _SHARED_STORAGES[(backend, db_path)] = open_storage(db_path, backend)
+        return _storage
+
+
+def close_storages():
+    """Closes all shared storages, pending changes are flushed. Registered to run at exit
+    """
+    with _SHARED_STORAGES_LOCK:
+        for (backend, db_path), _storage in list(_SHARED_STORAGES.items()):
+            try:
+                _storage.close()
+            except Exception as msg:
+                logger.error('Unable to close metadata database [%s]...%s', db_path, msg)
+        _SHARED_STORAGES.clear()
+
+
+atexit.register(close_storages)
@@ -5,10 +5,17 @@
 
 .. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
 """
+import time
+import atexit
 import threading
 import asyncio
 import logging
+import contextvars
 import warnings
+import functools
+import contextlib
+import collections
+import concurrent.futures
 from ui_builder.core import constants, init_log
 from ui_builder.core.provider import id_mgr
 from ui_builder.core.constants import ThreadStatus
@@ -17,6 +24,204 @@ from ui_builder.core.constants import ThreadStatus
 init_log.config_logs()
 logger = logging.getLogger(__name__)
 
+_default_executor = None
+_default_executor_lock = threading.Lock()
+#deadline (time.monotonic) of the coroutine running in the current context
+_current_deadline = contextvars.ContextVar('hybrid_thread_deadline', default=None)
+
+
+def get_deadline():
+    """Returns the deadline, in :func:`time.monotonic` seconds, of the :class:`HybridThread` \
+            coroutine running in the current context or None if it has none. Coroutines \
+            submitted from such a coroutine inherit its deadline
+    """
+    return _current_deadline.get()
+
+
+def remaining_time():
+    """Returns the seconds left until the deadline of the running coroutine or None if it \
+            has no deadline, e.g., to pass as timeout of a request made by the coroutine
+    """
+    _deadline = _current_deadline.get()
+    if _deadline is None:
+        return None
+    return max(0.0, _deadline - time.monotonic())
+
+
+def _get_deadline(timeout=None, deadline=None):
+    """Returns the earliest of the deadline, now + timeout and the inherited deadline
+    """
+    _deadlines = [_deadline for _deadline in (deadline, _current_deadline.get()) if _deadline is not None]
+    if timeout is not None:
+        _deadlines.append(time.monotonic() + timeout)
+    return min(_deadlines) if len(_deadlines) > 0 else None
+
+
+def get_default_executor():
+    """Returns the executor shared by all :class:`HybridThread` instances which are \
+            not given an executor of their own. It is created on first use from \
+            the `function_executor` (thread or process) and `function_executor_workers` \
+            settings of section `Tasks`
+
+    Returns:
+        executor (Executor): An instance of :class:`ThreadPoolExecutor` or \
+                :class:`ProcessPoolExecutor`
+    """
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _kind = constants.FUNCTION_EXECUTOR.lower()
+            if _kind == constants.FUNCTION_EXECUTOR_PROCESS:
+                _default_executor = concurrent.futures.ProcessPoolExecutor(\
+                        max_workers=constants.FUNCTION_EXECUTOR_WORKERS)
+            elif _kind == constants.FUNCTION_EXECUTOR_THREAD:
+                _default_executor = concurrent.futures.ThreadPoolExecutor(\
+                        max_workers=constants.FUNCTION_EXECUTOR_WORKERS, \
+                        thread_name_prefix='HybridThreadWorker')
+            else:
+                raise ValueError('Unknown function executor...{0}'.format(_kind))
+            logger.debug('Function executor created ({0}, {1} workers)'\
+                         .format(_kind, constants.FUNCTION_EXECUTOR_WORKERS))
+        return _default_executor
+
+
+class CoroutineScheduler(object):
+    """Grants run slots to the coroutines of an event loop. At most `max_concurrency` \
+            coroutines run at the same time (and at most `max_per_key` per key), the \
+            others wait. Waiting coroutines are started by priority (lower value \
+            first) and, within a priority, round robin over their keys, e.g., \
+            source names, so a key with many or slow coroutines can't starve others.
+
+    Note:
+        Must only be used from the event loop it is running on
+    """
+
+    def __init__(self, max_concurrency=0, max_per_key=0):
+        """Creates the scheduler
+
+        Args:
+            max_concurrency (int): Maximum number of running coroutines, 0 for no limit
+            max_per_key (int): Maximum number of running coroutines per key, 0 for no limit
+        """
+        self.max_concurrency = max_concurrency
+        self.max_per_key = max_per_key
+        self._running = 0
+        self._running_per_key = collections.Counter()
+        #priority -> key -> waiting futures; keys are rotated to the end once served
+        self._waiting = {}
+
+    def running():
+        doc = "Number of coroutines holding a slot. This is a readonly property"
+        def fget(self):
+            return self._running
+        return locals()
+    running = property(**running())
+
+    def waiting():
+        doc = "Number of coroutines waiting for a slot. This is a readonly property"
+        def fget(self):
+            return sum(len(_waiters) for _keys in self._waiting.values() for _waiters in _keys.values())
+        return locals()
+    waiting = property(**waiting())
+
+    def __has_free_slot(self, key):
+        if self.max_concurrency > 0 and self._running >= self.max_concurrency:
+            return False
+        return self.max_per_key <= 0 or self._running_per_key[key] < self.max_per_key
+
+    def __take_slot(self, key):
+        self._running += 1
+        self._running_per_key[key] += 1
+
+    async def acquire(self, priority=0, key=None):
+        """Waits until the coroutine may run
+
+        Args:
+            priority (int): Lower values are started first
+            key (object): Coroutines with the same key share the per key limit \
+                    and are served round robin against other keys
+        """
+        if self.waiting <= 0 and self.__has_free_slot(key):
+            self.__take_slot(key)
+            return
+        _waiter = asyncio.get_running_loop().create_future()
+        _keys = self._waiting.setdefault(priority, collections.OrderedDict())
+        _keys.setdefault(key, collections.deque()).append(_waiter)
+        #waiters are blocked by their key limit only, a free slot may serve this one
+        self.__wake_up()
+        try:
+            await _waiter
+        except asyncio.CancelledError:
+            if _waiter.done() and not _waiter.cancelled():
+                #slot was granted right before the cancellation
+                self.release(key)
+            else:
+                self.__discard_waiter(priority, key, _waiter)
+            #a wake up may have been spent on this waiter
+            self.__wake_up()
+            raise
+
+    def release(self, key=None):
+        """Frees the slot taken with :meth:`acquire` and starts waiting coroutines
+        """
+        self._running -= 1
+        self._running_per_key[key] -= 1
+        if self._running_per_key[key] <= 0:
+            del self._running_per_key[key]
+        self.__wake_up()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority=0, key=None):
+        """Context holding a run slot, see :meth:`acquire`
+        """
+        await self.acquire(priority, key)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    def __discard_waiter(self, priority, key, waiter):
+        _keys = self._waiting.get(priority)
+        if _keys is not None and key in _keys:
+            try:
+                _keys[key].remove(waiter)
+            except ValueError:
+                pass
+            if len(_keys[key]) <= 0:
+                del _keys[key]
+            if len(_keys) <= 0:
+                del self._waiting[priority]
+
+    def __wake_up(self):
+        """Grants free slots to the waiting coroutines in priority and round robin order
+        """
+        _is_granted = True
+        while _is_granted:
+            #one slot per key and pass, passes repeat while slots are granted
+            _is_granted = False
+            for priority in sorted(self._waiting):
+                _keys = self._waiting[priority]
+                for key in list(_keys):
+                    if self.max_concurrency > 0 and self._running >= self.max_concurrency:
+                        return
+                    if not self.__has_free_slot(key):
+                        continue
+                    _waiters = _keys[key]
+                    #cancelled waiters are skipped, the next one of the key is served
+                    while len(_waiters) > 0:
+                        _waiter = _waiters.popleft()
+                        if not _waiter.done():
+                            self.__take_slot(key)
+                            _waiter.set_result(None)
+                            _is_granted = True
+                            break
+                    if len(_waiters) > 0:
+                        _keys.move_to_end(key)
+                    else:
+                        del _keys[key]
+                if len(_keys) <= 0:
+                    del self._waiting[priority]
+
 
 class HybridThread(threading.Thread):
 
@@ -37,7 +242,14 @@ class HybridThread(threading.Thread):
     FUNCTIONS = 0
     COROUTINES = 1
 
-    def __init__(self, name=None, owner=None, notify_on_all_done=None, notify_on_coroutine_done=None, notify_on_function_done=None, args=(), kwargs={}):
+    """
+    .. attribute: Coroutine Priorities
+    """
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 5
+    PRIORITY_LOW = 10
+
+    def __init__(self, name=None, owner=None, notify_on_all_done=None, notify_on_coroutine_done=None, notify_on_function_done=None, executor=None, max_concurrency=None, max_concurrency_per_key=None, args=(), kwargs={}):
         """HybridThread constructor takes name, args and kwargs parameters.
         The args and kwargs will be used internally by this thread and will be
             passed to the :func:`run` function
@@ -48,6 +260,9 @@ class HybridThread(threading.Thread):
             notify_on_all_done (func): Calls back the :func:`notify_on_all_done` after all coroutines and functions are done. This callback will get 2 params - results of all coroutines or functions and type of callables called - coroutines or functions
             notify_on_coroutine_done (func): Calls back the :func:`notify_on_coroutine_done` after completion of each coroutine. Future instance will be passed to it as param
             notify_on_function_done (func): Same as :attr:`notify_on_coroutine_done` but it works for functions only
+            executor (Executor): Pool running the sync functions, default is the pool returned by :func:`get_default_executor`. Functions and their parameters must be picklable if it is a :class:`ProcessPoolExecutor`
+            max_concurrency (int): Maximum number of coroutines running at the same time, 0 for no limit. Default is `coroutine_concurrency` of section `Tasks`
+            max_concurrency_per_key (int): Same as max_concurrency but per key (see :meth:`add_scheduled_coroutine`). Default is `coroutine_concurrency_per_key` of section `Tasks`
             *args: Parameters to be passed over to :func:`run` function
             **kwargs: Same as args but accepts only keyword arguments
 
@@ -74,6 +289,13 @@ class HybridThread(threading.Thread):
         self.__function_completed_percentage_callback = None
         self.__coroutine_counter = 0
         self.__function_counter = 0
+        self.__shutdown_hooks = []
+        self.__load = 0
+        self.__load_lock = threading.Lock()
+        self._executor = executor
+        self._scheduler = CoroutineScheduler(\
+                max_concurrency if max_concurrency is not None else constants.COROUTINE_CONCURRENCY, \
+                max_concurrency_per_key if max_concurrency_per_key is not None else constants.COROUTINE_CONCURRENCY_PER_KEY)
         self._loop = asyncio.new_event_loop()
         self._is_thread_running = False
         logger.info('HybridThread {0} has been init..')
@@ -85,6 +307,22 @@ class HybridThread(threading.Thread):
         return locals()
     loop = property(**loop())
 
+    def executor():
+        doc = "The pool (:class:`Executor`) running the sync functions of this thread. This is a readonly property"
+        def fget(self):
+            if self._executor is None:
+                return get_default_executor()
+            return self._executor
+        return locals()
+    executor = property(**executor())
+
+    def scheduler():
+        doc = "The :class:`CoroutineScheduler` limiting the coroutines running at the same time. This is a readonly property"
+        def fget(self):
+            return self._scheduler
+        return locals()
+    scheduler = property(**scheduler())
+
     def functions():
         doc="List of sync functions that will execute in this thread"
         def fget(self):
@@ -113,6 +351,13 @@ class HybridThread(threading.Thread):
         return locals()
     coroutines_results = property(**coroutine_results())
 
+    def load():
+        doc = "Number of coroutines and functions scheduled on this thread and not done yet. This is a readonly property"
+        def fget(self):
+            return self.__load
+        return locals()
+    load = property(**load())
+
     def is_thread_running():
         doc = "The is_thread_running property."
         def fget(self):
@@ -168,6 +413,16 @@ class HybridThread(threading.Thread):
         """
         self.__owner = owner_name
 
+    def add_shutdown_hook(self, coroutine):
+        """Registers a coroutine function which will be awaited on the thread's event loop \
+                right before the loop stops, e.g., to close connections bound to the loop
+
+        Args:
+            coroutine (:obj:`func`): Coroutine function without parameters
+        """
+        if coroutine not in self.__shutdown_hooks:
+            self.__shutdown_hooks.append(coroutine)
+
     def add_coroutine(self, coroutine, *args, **kwargs):
         """Adds a coroutine to queue which will be scheduled and executed by thread's event loop
         Args:
@@ -190,18 +445,89 @@ class HybridThread(threading.Thread):
             >>> thread_instance.start_forever() #; thread_instance.join() #join() if required
             I am in coro
         """
+        self.add_scheduled_coroutine(coroutine, args, kwargs)
+
+    def add_scheduled_coroutine(self, coroutine, args=(), kwargs=None, priority=PRIORITY_NORMAL, key=None, timeout=None):
+        """Same as :meth:`add_coroutine` but with the scheduling details for the :attr:`scheduler`
+
+        Args:
+            coroutine (:obj:`func`): The coroutine to be added in the queue
+            args (tuple): Paramters that needs to be passed to the coroutine
+            kwargs (dict): Keyword parameters for passing it to coroutine
+            priority (int): Coroutines with lower value are started first, see :attr:`PRIORITY_HIGH`, \
+                    :attr:`PRIORITY_NORMAL` and :attr:`PRIORITY_LOW`
+            key (object): Fairness key, e.g., the source name. Coroutines waiting for a slot are \
+                    started round robin over the keys and the per key limit applies to each key
+            timeout (float): Seconds the coroutine may take, counted from the time it is scheduled \
+                    and including the wait for a slot. The coroutine is cancelled once exceeded \
+                    and :exc:`TimeoutError` is its result (optional)
+
+        Examples:
+            >>> thread_instance.add_scheduled_coroutine(check_source, (source,), key=source.name)
+        """
         self.__block_coroutine_addition.acquire()
-        if coroutine is not None:
-            _task_details = (coroutine, args, kwargs)
-            self._coroutines_q.append(_task_details)
-            logger.debug('New coroutine added to thread...{0}'.format(coroutine))
-        else:
-            logger.error('Invalid reference to the coroutine provided')
+        try:
+            if coroutine is not None:
+                _task_details = (coroutine, args, kwargs if kwargs is not None else {}, priority, key, timeout)
+                self._coroutines_q.append(_task_details)
+                logger.debug('New coroutine added to thread...{0}'.format(coroutine))
+            else:
+                logger.error('Invalid reference to the coroutine provided')
+                raise ValueError('Invalid reference to the coroutine provided')
+        finally:
+            self.__block_coroutine_addition.release()
+
+    def submit_coroutine(self, coroutine, args=(), kwargs=None, priority=PRIORITY_NORMAL, key=None, timeout=None, deadline=None):
+        """Schedules the coroutine right away, without adding it to the queue, and returns \
+                its future. The coroutine waits for a slot of the :attr:`scheduler` like \
+                queued ones but is not part of :meth:`wait_for_all_coroutines` and its \
+                callbacks; use :meth:`as_completed` or the future to get its result.
+            If the thread is not started yet, the coroutine runs once it is started
+
+        Args:
+            coroutine (:obj:`func`): The coroutine to be scheduled
+            args (tuple): Paramters that needs to be passed to the coroutine
+            kwargs (dict): Keyword parameters for passing it to coroutine
+            priority (int): See :meth:`add_scheduled_coroutine`
+            key (object): See :meth:`add_scheduled_coroutine`
+            timeout (float): See :meth:`add_scheduled_coroutine`
+            deadline (float): Time (:func:`time.monotonic`) by which the coroutine must be done, \
+                    e.g., shared by a batch of coroutines. If submitted from a coroutine having \
+                    a deadline, the earlier one applies (optional)
+
+        Returns:
+            future (Future): An instance of :mod:`concurrent.futures`.:class:`Future`, cancel \
+                    it to cancel the coroutine
+        """
+        if coroutine is None:
             raise ValueError('Invalid reference to the coroutine provided')
-        self.__block_coroutine_addition.release()
+        _task_details = (coroutine, args, kwargs if kwargs is not None else {}, priority, key, \
+                         _get_deadline(timeout, deadline))
+        return self.__track(asyncio.run_coroutine_threadsafe(self.__run_coroutine(_task_details), self.loop))
+
+    def as_completed(self, futures=None, timeout=None):
+        """Yields the futures as soon as each of them completes, so results can be \
+                processed while other coroutines are still running
+
+        Args:
+            futures (iterable): Futures returned by :meth:`submit_coroutine`, default \
+                    is the futures of the queued coroutines scheduled last
+            timeout (float): Seconds to wait for all futures, :exc:`TimeoutError` \
+                    is raised once exceeded (optional)
+
+        Examples:
+            >>> futures = [thread_instance.submit_coroutine(check, (source,)) for source in sources]
+            >>> for future in thread_instance.as_completed(futures):
+                    print(future.result())
+        """
+        if futures is None:
+            futures = list(self.__coro_futures)
+        return concurrent.futures.as_completed(futures, timeout)
 
     def add_function(self, function_def, *args, **kwargs):
-        """Adds a function to queue which will be scheduled and executed by thread's event loop
+        """Adds a function to queue which will be scheduled by thread's event loop and executed \
+                by the thread's :attr:`executor`, so blocking functions run in parallel \
+                without blocking the event loop or the caller
         Args:
             function_def (:obj:`func`): The function definition to be added in the queue
             *args: Paramters that needs to be passed to the function
@@ -226,7 +552,7 @@ class HybridThread(threading.Thread):
         if function_def is not None:
             _func_details = (function_def, args, kwargs)
             self._functions_q.append(_func_details)
-            logger.debug('Function added to thread...{0}'.format(function))
+            logger.debug('Function added to thread...{0}'.format(function_def))
         else:
             logger.debug('Not a valid function definition')
             raise ValueError('Not a valid function definition')
@@ -247,7 +573,7 @@ class HybridThread(threading.Thread):
     def start_forever(self):
         """Starts the thread, executes the coroutines and sync functions registered with this thread
         """
-        if self.isAlive:
+        if not self.__stop_thread.is_set():
             self.__is_internal_call = True
             self.start()
         else:
@@ -255,7 +581,9 @@ class HybridThread(threading.Thread):
 
     def __coroutine_done_cb(self, future):
         """Coroutine done callback will be called once for each coroutine in queue.
-            An instance of furure will be passed to this callback
+            An instance of furure will be passed to this callback. Exceptions raised \
+            by coroutines, :exc:`TimeoutError` and :exc:`CancelledError` are placed in \
+            the results in place of their return value
 
         Args:
             future (Future): An instance of :mod:`asyncio`.:class:`Future`
@@ -265,33 +593,70 @@ class HybridThread(threading.Thread):
             self.__notify_on_coroutine_done(future, self.__owner)
         if self.__coroutine_completed_percentage_callback is not None:
             self.__coroutine_completed_percentage_callback((self.__coroutine_counter/len(self._coroutines_q))*100)
-        if len(self._coroutines_q) == self.__coroutine_counter and self.__notify_on_all_done is not None:
-            self._coro_results = [future.result() for future in self.__coro_futures]
-            self.__notify_on_all_done(self._coro_results, self.__owner, HybridThread.COROUTINES)
+        if len(self._coroutines_q) == self.__coroutine_counter:
+            self._coro_results = [HybridThread.__get_outcome(future) for future in self.__coro_futures]
+            if self.__notify_on_all_done is not None:
+                self.__notify_on_all_done(self._coro_results, self.__owner, HybridThread.COROUTINES)
+            self.__all_coros_done_event.set()
+
+    @staticmethod
+    def __get_outcome(future):
+        """Returns the result of a done future or the exception it ended with
+        """
+        if future.cancelled():
+            return concurrent.futures.CancelledError()
+        if future.exception() is not None:
+            return future.exception()
+        return future.result()
 
-    def wait_for_all_coroutines(self):
+    def wait_for_all_coroutines(self, timeout=None):
         """Blocks the call until all the coroutines are finished.Once coroutines are done,
             it clears the coroutines queue so that new can be added for another run
+
+        Args:
+            timeout (float): Seconds to wait for the whole batch, coroutines still running \
+                    afterwards are cancelled (optional)
+
+        Returns:
+            results (list): Results of the coroutines in queue order, cancelled ones have \
+                    :exc:`CancelledError` as result, i.e., partial results on timeout
         """
         if not self.__all_coros_done_event.isSet():
-            self.__all_coros_done_event.wait()
+            if not self.__all_coros_done_event.wait(timeout):
+                logger.warning('Coroutines not done in {0} second(s), cancelling {1} of them'\
+                               .format(timeout, self.cancel_coroutines()))
+                self.__all_coros_done_event.wait()
             self._coroutines_q.clear()
+        return self._coro_results
+
+    def cancel_coroutines(self):
+        """Cancels the queued coroutines which are not done yet. Cancellation is cooperative, \
+                :exc:`CancelledError` is raised in the coroutine at its current await
+
+        Returns:
+            count (int): Number of coroutines cancelled
+        """
+        return len([future for future in list(self.__coro_futures) if future.cancel()])
 
     def __function_done_cb(self, future):
         """Function done callback will be called once for each function in queue.
-            An instance of furure will be passed to this callback
+            An instance of furure will be passed to this callback. Exceptions raised \
+            by functions are placed in the results in place of their return value
 
         Args:
-            future (Future): An instance of :mod:`asyncio`.:class:`Future`
+            future (Future): An instance of :mod:`concurrent.futures`.:class:`Future`
         """
         self.__function_counter += 1
         if self.__notify_on_function_done is not None:
-            self.__notify_on_functon_done(future, self.__owner)
+            self.__notify_on_function_done(future, self.__owner)
         if self.__function_completed_percentage_callback is not None:
-            self.__function_completed_percentage_callback((self.__function_counter/len(self._function_q))*100)
-        if len(self._functions_q) == self.__function_counter and self.__notify_on_all_done is not None:
-            self._function_results = [future.result() for future in self.__function_futures]
-            self.__notify_on_all_done(self._function_results, self.__owner, HybridThread.FUNCTIONS)
+            self.__function_completed_percentage_callback((self.__function_counter/len(self._functions_q))*100)
+        if len(self._functions_q) == self.__function_counter:
+            self._function_results = [future.exception() if future.exception() is not None else future.result() \
+                                      for future in self.__function_futures]
+            if self.__notify_on_all_done is not None:
+                self.__notify_on_all_done(self._function_results, self.__owner, HybridThread.FUNCTIONS)
+            self.__all_funcs_done_event.set()
 
     def wait_for_all_functions(self):
         """Blocks the call until all the functions are finished. Once all the functions are done,
@@ -339,21 +704,55 @@ class HybridThread(threading.Thread):
             self._coro_results.clear()
             self.__coroutine_counter = 0
             self.__all_coros_done_event.clear()
-            #run all coroutines
+            #run all coroutines, timeouts count from now
             for coro in self._coroutines_q:
-                future = asyncio.run_coroutine_threadsafe(coro[0](*coro[1], **coro[2]), self.loop)
-                future.add_done_callback(self.__coroutine_done_cb)
+                coro = coro[:5] + (_get_deadline(coro[5]),)
+                future = self.__track(asyncio.run_coroutine_threadsafe(self.__run_coroutine(coro), self.loop))
                 self.__coro_futures.append(future)
+                future.add_done_callback(self.__coroutine_done_cb)
         if len(self._functions_q) > 0:
             self.__function_futures.clear()
             self._function_results.clear()
             self.__function_counter = 0
             self.__all_funcs_done_event.clear()
-            #run all functions
+            #run all functions in the executor
             for func in self._functions_q:
-                future = self.loop.call_soon_threadsafe(func[0](*func[1], **func[2]))
-                future.add_done_callback(self.__function_done_cb)
+                future = self.__track(asyncio.run_coroutine_threadsafe(self.__run_function(func), self.loop))
                 self.__function_futures.append(future)
+                future.add_done_callback(self.__function_done_cb)
+
+    def __track(self, future):
+        """Counts the future in the :attr:`load` of the thread until it is done
+        """
+        with self.__load_lock:
+            self.__load += 1
+        future.add_done_callback(self.__untrack)
+        return future
+
+    def __untrack(self, future):
+        with self.__load_lock:
+            self.__load -= 1
+
+    async def __run_coroutine(self, coro):
+        """Runs a coroutine (coroutine, args, kwargs, priority, key, deadline) once the \
+                :attr:`scheduler` grants it a slot and returns its result. The coroutine \
+                is cancelled and :exc:`TimeoutError` raised if the deadline passes
+        """
+        if coro[5] is None:
+            return await self.__run_in_slot(coro)
+        #each coroutine runs in a task of its own, so the deadline is seen by it only
+        _current_deadline.set(coro[5])
+        return await asyncio.wait_for(self.__run_in_slot(coro), max(0.0, coro[5] - time.monotonic()))
+
+    async def __run_in_slot(self, coro):
+        async with self._scheduler.slot(coro[3], coro[4]):
+            return await coro[0](*coro[1], **coro[2])
+
+    async def __run_function(self, func):
+        """Runs a queued function (function, args, kwargs) in the :attr:`executor` \
+                and returns its result
+        """
+        return await self.loop.run_in_executor(self.executor, functools.partial(func[0], *func[1], **func[2]))
 
     def reschedule(self):
         """Rerun the event loop if its stopped and schedule all callables again to run
@@ -362,23 +761,27 @@ class HybridThread(threading.Thread):
             self.__resume_thread.set()
         self.__schedule()
 
-    async def _fake_call(self):
-        logger.debug("Called fake call")
-        await asyncio.sleep(0.5)
+    async def __shutdown(self):
+        """Awaits the shutdown hooks and stops the event loop from within the loop
+        """
+        for hook in self.__shutdown_hooks:
+            try:
+                await hook()
+            except Exception as msg:
+                logger.warning('Shutdown hook {0} failed...{1}'.format(hook, msg))
+        self.loop.stop()
 
     def stop_event_loop(self):
-        """Stop the event loop if it is running
+        """Stop the event loop if it is running. Shutdown hooks registered with \
+                :meth:`add_shutdown_hook` are awaited before the loop stops
         """
         if self.loop.is_running():
-            self.loop.stop()
-            # Hack to force event loop to complete its last loop by calling an
-            # empty coroutine
-            asyncio.run_coroutine_threadsafe(self._fake_call(), self.loop)
+            asyncio.run_coroutine_threadsafe(self.__shutdown(), self.loop)
 
     def stop(self):
         """Stop the main thread loop
         """
-        if self.isAlive:
+        if self.is_alive():
             self.stop_event_loop()
             self.__stop_thread.set() #<-- it will break the thread's while loop
             self.__resume_thread.set() #<-- make sure the thread loop don''t go into wait
@@ -386,11 +789,119 @@ class HybridThread(threading.Thread):
 
 class ThreadManager(object):
 
-    """Docstring for ThreadManager. """
+    """Pool of long-lived :class:`HybridThread` instances shared by the services. \
+            Threads are started on first use and their event loops are reused across \
+            index refreshes and installs instead of creating a loop per run, so loop \
+            bound resources (e.g., web sessions) are kept too.
+        The pool has `thread_pool_size` threads of section `Tasks` (default one per \
+            core). Threads are handed out by name, a name is always served by the \
+            same thread, or by least load.
+
+    Note:
+        This is an singleton class and will be shared between objects. Coroutines \
+                on a pooled thread must be run with :meth:`HybridThread.submit_coroutine`, \
+                the coroutine queue of a thread is shared by all its users
+    """
+
+    __single_thread_manager = None
+    _threads = None
+
+    def __new__(cls, *args, **kwargs):
+        """Class instance creator
+        """
+        if cls != type(cls.__single_thread_manager):
+            cls.__single_thread_manager = object.__new__(cls)
+        return cls.__single_thread_manager
+
+    def __init__(self, pool_size=None):
+        """Init the pool, the first call only
+
+        Args:
+            pool_size (int): Number of threads in the pool, default is `thread_pool_size` \
+                    of section `Tasks`
+        """
+        if self._threads is None:
+            self.name = 'ThreadManager'
+            self.id = id_mgr.get_id(self.name)
+            self._pool_size = max(1, pool_size if pool_size is not None else constants.THREAD_POOL_SIZE)
+            self._threads = []
+            self._threads_by_name = {}
+            self._lock = threading.Lock()
+            atexit.register(self.shutdown)
+
+    def pool_size():
+        doc = "Maximum number of threads in the pool. This is a readonly property"
+        def fget(self):
+            return self._pool_size
+        return locals()
+    pool_size = property(**pool_size())
+
+    def threads():
+        doc = "Threads of the pool started so far. This is a readonly property"
+        def fget(self):
+            with self._lock:
+                return list(self._threads)
+        return locals()
+    threads = property(**threads())
 
-    def __init__(self):
-        """TODO: to be defined1. """
-        self.name = 'ThreadManager'
-        self.id = id_mgr.get_id(self.name)
+    def __start_thread(self):
+        """Starts a new thread of the pool, it runs until :meth:`shutdown`
+        """
+        _thread = HybridThread(name='PooledThread-{0}'.format(len(self._threads)), owner=self.name)
+        _thread.daemon = True
+        _thread.start_forever()
+        self._threads.append(_thread)
+        logger.debug('Thread %s added to the pool', _thread.name)
+        return _thread
+
+    def __least_loaded(self):
+        """Returns a new thread while the pool is not full, else the thread having the \
+                lowest load and the fewest names assigned
+        """
+        if len(self._threads) < self._pool_size:
+            return self.__start_thread()
+        _names = collections.Counter(self._threads_by_name.values())
+        return min(self._threads, key=lambda thread: (thread.load, _names[thread]))
+
+    def get_thread(self, name=None):
+        """Returns a running thread of the pool
 
+        Args:
+            name (str): Name of the user, e.g., 'PackageIndexCoroThread'. The same thread \
+                    is returned for the same name, a new name is assigned to the least \
+                    loaded thread. Without name the least loaded thread is returned
 
+        Returns:
+            thread (HybridThread): Running thread of the pool
+
+        Examples:
+            >>> _thread = ThreadManager().get_thread('PackageIndexCoroThread')
+            >>> _thread.submit_coroutine(my_coro, (10, 20)).result()
+        """
+        with self._lock:
+            if name is None:
+                return self.__least_loaded()
+            _thread = self._threads_by_name.get(name)
+            if _thread is None:
+                _thread = self._threads_by_name[name] = self.__least_loaded()
+                logger.debug('Name [%s] assigned to thread %s', name, _thread.name)
+            return _thread
+
+    def shutdown(self, timeout=None):
+        """Stops all threads of the pool and waits for them to end. Shutdown hooks of \
+                the threads are awaited before their loops stop. Threads are started \
+                again by the next :meth:`get_thread`
+
+        Args:
+            timeout (float): Seconds to wait for each thread (optional)
+        """
+        with self._lock:
+            _threads = list(self._threads)
+            self._threads.clear()
+            self._threads_by_name.clear()
+        for _thread in _threads:
+            _thread.stop()
+        for _thread in _threads:
+            _thread.join(timeout)
+            if _thread.is_alive():
+                logger.warning('Thread %s not stopped in %s second(s)', _thread.name, timeout)
@@ -5,8 +5,8 @@
 
 .. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
 """
+import copy
 import logging
-from tinydb import Query
 from ui_builder.core import init_log
 
 #init logs---------------------------------
@@ -38,14 +38,15 @@ class ComponentManager(object):
             db_connection (str): Database connection to metadata
         """
         self.__db_connection = db_connection
-        _mgr_table = db_connection.tables('system_managers')
-        _comp_mgr_record = _mgr_table.get(Query['name'] == 'ComponentManager')
+        _mgr_table = db_connection.table('system_managers')
+        _comp_mgr_record = _mgr_table.find_one('name', 'ComponentManager')
         if _comp_mgr_record is not None:
             self.component_id = _comp_mgr_record['Id']
             self.__registry_name = _comp_mgr_record['RegistryName']
             if self.__registry_name is not None:
-                self.__registry_table = db_connection.tables(self.__registry_name)
-                self.__registry_map = self.__registry_table.all()
+                self.__registry_table = db_connection.table(self.__registry_name)
+                #copies, documents of the table cache must not be modified in place
+                self.__registry_map = [copy.deepcopy(record) for record in self.__registry_table.all()]
             else:
                 raise Exception('CRITICAL: Unable to initiate component manager. \
                                 System load can''t continue further', \
@@ -68,28 +69,22 @@ class ComponentManager(object):
         Returns:
             status (bool): Returns True if registered successfully else False
         """
-        comp_details = component_obj.__dict__.copy()
-        #config_file and template_env can be repopulate from the base_path, \
-                #so no need to save it in database, this saves the effort \
-                #required to serialize and saveing all sub-attributes under \
-                #these attributes
-        comp_details['config_file'] = None
-        comp_details['template_env'] = None
+        #config_file is not part of the record, it can be repopulated from \
+                #the base_path
+        comp_details = component_obj.to_record()
         comp_table = self.__db_connection.table('Components')
-        comp_q = Query()
         comp_table\
                 .upsert({'Location':component_obj.base_path, \
                          'Details':comp_details}, \
-                        comp_q['Details']['id'] == component_id.id)
+                        'Details.id', component_id)
         LOGGER.debug('Component with name [{0}] and id [{1}] has been \
                      registered under package [{2}]'\
                      .format(component_obj.name, component_obj.id, \
                              parent_pkg.name))
         comp_idx_table = self.__db_connection.table('Components_Index')
-        comp_idx_q = Query()
         comp_idx_table.upsert({'Id':component_obj.id, \
                                           'Name':component_obj.name, \
                                           'Package_Id':parent_pkg.id, \
                                           'Package_Name':parent_pkg.name}, \
-                                         comp_idx_q['Id'] == component_obj.id)
+                                         'Id', component_obj.id)
         return True
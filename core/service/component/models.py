@@ -7,7 +7,6 @@
 """
 import os
 import logging
-from tinydb import Query
 from ui_builder.core import utils, init_log
 
 
@@ -20,7 +19,17 @@ class BaseComponentInfo(object):
     """Represents an component in package management system. \
             A component is an object which can contain logic (in form of code),
         resources (image, configuration, etc) and other similar objects.
+
+    Note:
+        Attributes are kept in slots as many components are held in memory, \
+                :meth:`to_record` and :meth:`from_record` convert them to and \
+                from the `Details` of a database record
     """
+    __slots__ = ('component_id', 'name', 'description', 'kind', 'author', 'version', \
+                 'is_enabled', 'is_installed', 'base_path', 'security_id', \
+                 'package_dependencies', 'component_dependencies', 'meta_data')
+    #attributes which are not saved in the database
+    _TRANSIENT = ()
 
     def __init__(self, name, path):
         """An :class:`BaseComponentInfo` constructor requires two params -
@@ -44,6 +53,64 @@ class BaseComponentInfo(object):
         self.component_dependencies = {}
         self.meta_data = {}
 
+    @property
+    def id(self):
+        """The unique id of component
+        """
+        return self.component_id
+
+    @classmethod
+    def _all_slots(cls):
+        """Returns the names of the attributes of the class and its bases
+        """
+        _slots = []
+        for klass in reversed(cls.__mro__):
+            for slot in klass.__dict__.get('__slots__', ()):
+                if slot not in _slots:
+                    _slots.append(slot)
+        return _slots
+
+    @classmethod
+    def _record_slots(cls):
+        """Returns the names of the attributes saved in a record
+        """
+        return [slot for slot in cls._all_slots() if slot not in cls._TRANSIENT]
+
+    def to_record(self):
+        """Returns the details of component which are saved in the database
+
+        Returns:
+            record (dict): Attribute name to value mapping, the id is saved as `id`
+        """
+        _record = {slot: getattr(self, slot, None) for slot in self._record_slots()}
+        _record['id'] = _record.pop('component_id')
+        return _record
+
+    @classmethod
+    def from_record(cls, record):
+        """Creates an instance from the details saved by :meth:`to_record`
+
+        Args:
+            record (dict): Details of component
+
+        Returns:
+            component (BaseComponentInfo): An instance of the class
+        """
+        _component = cls.__new__(cls)
+        _component.apply_record(record)
+        return _component
+
+    def apply_record(self, record):
+        """Sets the attributes from the details saved by :meth:`to_record`, \
+                attributes missing in the record are set to None
+        """
+        for slot in self._all_slots():
+            setattr(self, slot, None)
+        for slot in self._record_slots():
+            if slot in record:
+                setattr(self, slot, record[slot])
+        self.component_id = record.get('id', record.get('component_id'))
+
     def load_install_config(self):
         """Loads installation details of a component.
             This function will be used by the :class:`PackageInstaller` class only
@@ -67,6 +134,9 @@ class ComponentInfo(BaseComponentInfo):
             component like, source code, compiled code, templates, version, \
             dependency on other components, etc
     """
+    __slots__ = ('parent_id', 'base_parent_id', 'template_path', 'config_path', 'config_file')
+    #config file is read again from the config path when needed
+    _TRANSIENT = ('config_file',)
 
     def __init__(self, name, path):
         super(ComponentInfo, self).__init__(name, path)
@@ -84,6 +154,7 @@ class ComponentInfo(BaseComponentInfo):
         self.version = None
         self.is_enabled = True
         self.is_installed = False
+        self.parent_id = None
         self.base_parent_id = None
         self.base_path = path
         self.template_path = os.path.join(path, '{0}.html'.format(name))
@@ -131,10 +202,9 @@ class ComponentInfo(BaseComponentInfo):
         LOGGER.debug('Loading details for component [%s] from db', comp_id)
         if db_conn is not None:
             comp_table = db_conn.table('Components')
-            query = Query()
-            comp_record = comp_table.get(query['Details']['id'] == comp_id)
+            comp_record = comp_table.find_one('Details.id', comp_id)
             if comp_record is not None:
-                self.__dict__ = comp_record['Details']
+                self.apply_record(comp_record['Details'])
             else:
                 LOGGER.warn('Unable load details for comp [%s] from db', comp_id)
             LOGGER.debug('Details loaded succeasfully for component...%s', self.name)
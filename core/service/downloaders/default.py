@@ -7,6 +7,10 @@
 """
 
 #imports ---------------------------------
+import os
+import json
+import asyncio
+import hashlib
 import logging
 import pathlib
 import aiohttp
@@ -19,40 +23,192 @@ from ui_builder.core.service import sessions
 init_log.config_logs()
 logger = logging.getLogger(__name__)
 
+CHECKSUM_HEADER = 'X-Checksum-Sha256'
+PART_FILE_SUFFIX = '.part'
+#validators (ETag, Last-Modified) of the source file a part file was started from
+VALIDATOR_FILE_SUFFIX = '.validator'
+
 
 class Downloader(iplugins.IDownloader):
-    """Docstring for PackageDownloader. """
+    """Downloads packages from a source. Downloads are streamed to a `.part` \
+            file which is resumed with HTTP `Range` requests if the transfer \
+            is interrupted. `If-Range` carries the validator of the source file \
+            the part was started from, so a changed file is downloaded again \
+            instead of being appended to a stale part. The SHA-256 of the \
+            package is computed while streaming and the finished file is moved \
+            in place atomically. Disk reads and fsync run in the default executor \
+            so they don't block the event loop shared by all downloads
+    """
 
     __single_downloader = None
 
     def __new__(cls, *args, **kwargs):
         """Class instance creator
         """
-        if cls != type(cls.__single__downloader):
+        if cls != type(cls.__single_downloader):
             cls.__single_downloader = object.__new__(cls, *args, **kwargs)
         return cls.__single_downloader
 
     def __init__(self):
-        pass
+        self.__download_location = os.path.abspath(constants.SAVE_DOWNLOADS_TO_PATH)
+        self.__chunk_size = constants.DOWNLOAD_CHUNK_SIZE
+
+    def __hash_part_file(self, part_path):
+        """Returns the digest state and size of an already downloaded part file. \
+                This is the only time bytes of a download are read back from disk
 
-    async def download(self, source, resource_name):
-        """Downloads the package from source and returns the content to \
-                caller of this coroutine
         Args:
+            part_path (str): Path to the `.part` file
+
+        Returns:
+            result (tuple): SHA-256 hash object and number of bytes hashed
+        """
+        _hash = hashlib.sha256()
+        _size = 0
+        with open(part_path, 'rb') as fd:
+            while True:
+                chunk = fd.read(self.__chunk_size)
+                if not chunk:
+                    break
+                _hash.update(chunk)
+                _size += len(chunk)
+        return (_hash, _size)
+
+    @staticmethod
+    def __read_validators(validator_path):
+        """Returns the saved validators (ETag and Last-Modified) of a part file or \
+                None if it has none
+        """
+        try:
+            with open(validator_path, 'r') as fd:
+                _validators = json.load(fd)
+        except (OSError, ValueError):
+            return None
+        if _validators.get('ETag') is None and _validators.get('Last-Modified') is None:
+            return None
+        return _validators
+
+    @staticmethod
+    def __is_same_file(validators, headers):
+        """Returns False if the validators of the response show a file other than the \
+                one the part file was started from, i.e., the source ignored `If-Range`
+        """
+        for _name in ('ETag', 'Last-Modified'):
+            if validators.get(_name) is not None and headers.get(_name) is not None:
+                return validators[_name] == headers[_name]
+        return True
+
+    @staticmethod
+    def __is_complete_part(headers, part_size):
+        """Returns True if the `Content-Range: bytes */<size>` of a 416 response shows \
+                the part file is as large as the whole file on the source
+        """
+        _content_range = headers.get('Content-Range', '')
+        if not _content_range.startswith('bytes */'):
+            return False
+        try:
+            return int(_content_range[len('bytes */'):]) == part_size
+        except ValueError:
+            return False
+
+    @staticmethod
+    def __write_validator(validator_path, headers):
+        """Saves the validators of the source file a part file is started from
+        """
+        _validators = {_name: headers.get(_name) for _name in ('ETag', 'Last-Modified')}
+        with open(validator_path, 'w') as fd:
+            json.dump(_validators, fd)
+
+    @staticmethod
+    def __discard(*paths):
+        """Removes the files which exist
+        """
+        for _path in paths:
+            if os.path.exists(_path):
+                os.remove(_path)
+
+    @staticmethod
+    def __sync_file(fd):
+        """Writes the file to disk, blocks until done
+        """
+        fd.flush()
+        os.fsync(fd.fileno())
+
+    async def download(self, source, resource_name, checksum=None):
+        """Downloads the package from source and returns the path of \
+                downloaded package to caller of this coroutine
+        Args:
+            source (ISource): Source from where package needs to be downloaded
             resource_name (str): Name of the package that needs to be downloaded
+            checksum (str): Expected SHA-256 hex digest of the package, if not \
+                    provided the digest announced by the source is used (optional)
+
+        Returns:
+            downloaded_file (Path): Path to the downloaded package or None if \
+                    download failed or checksum didn't match
         """
-        async with sessions.Web()\
-                .SESSION.get(source.details['Uri'], \
-                             params={'resource_name' : resource_name, \
-                                     'action':'download'}) as _response:
-            with open('{0}/{1}.pkg'\
-                      .format(self.__download_location, resource_name), \
-                      'wb') as fd:
+        _target_path = os.path.join(self.__download_location, '{0}.pkg'.format(resource_name))
+        _part_path = _target_path + PART_FILE_SUFFIX
+        _validator_path = _part_path + VALIDATOR_FILE_SUFFIX
+        _loop = asyncio.get_event_loop()
+        _hash, _offset = (hashlib.sha256(), 0)
+        _validators = None
+        if os.path.exists(_part_path):
+            _validators = Downloader.__read_validators(_validator_path)
+            if _validators is None:
+                #source file of the part is unknown, it can't be resumed safely
+                Downloader.__discard(_part_path, _validator_path)
+            else:
+                _hash, _offset = await _loop.run_in_executor(None, self.__hash_part_file, _part_path)
+                logger.debug('Resuming download of [%s] from byte %d', resource_name, _offset)
+        _headers = {}
+        if _offset > 0:
+            _headers['Range'] = 'bytes={0}-'.format(_offset)
+            #full file is sent instead of the range if it changed since
+            _headers['If-Range'] = _validators.get('ETag') or _validators.get('Last-Modified')
+        async with sessions.WebSessionPool()\
+                .get_session().get(source.details['Uri'], \
+                             params={'package_name' : resource_name, \
+                                     'action':'download'}, \
+                             headers=_headers) as _response:
+            if checksum is None:
+                checksum = _response.headers.get(CHECKSUM_HEADER)
+            if _response.status == 416 and Downloader.__is_complete_part(_response.headers, _offset) \
+                    and (checksum is None or _hash.hexdigest() == checksum.lower()):
+                #part file already holds the whole package, e.g. interrupted before the rename
+                logger.debug('Partial download of [%s] is already complete', resource_name)
+                os.replace(_part_path, _target_path)
+                Downloader.__discard(_validator_path)
+                return pathlib.Path(_target_path)
+            if _response.status == 416 or (_response.status == 206 \
+                    and not Downloader.__is_same_file(_validators, _response.headers)):
+                #part file doesn't match the package on source anymore
+                logger.warn('Discarding stale partial download of [%s]', resource_name)
+                Downloader.__discard(_part_path, _validator_path)
+                return await self.download(source, resource_name, checksum)
+            if _response.status == 200 and _offset > 0:
+                #source file changed or range ignored, start from scratch
+                logger.debug('Restarting download of [%s] from byte 0', resource_name)
+                _hash, _offset = (hashlib.sha256(), 0)
+            elif _response.status not in (200, 206):
+                logger.error('Unable to download [%s], source returned status %d', \
+                             resource_name, _response.status)
+                return None
+            if _offset == 0:
+                Downloader.__write_validator(_validator_path, _response.headers)
+            with open(_part_path, 'ab' if _offset > 0 else 'wb') as fd:
                 while True:
-                    chunk = _response.content.read(self.__chunk_size)
+                    chunk = await _response.content.read(self.__chunk_size)
                     if not chunk:
                         break
                     fd.write(chunk)
-            return pathlib.Path('{0}/{1}.pkg'.format(self.__download_location, \
-                                                     resource_name))
-        return None
+                    _hash.update(chunk)
+                await _loop.run_in_executor(None, Downloader.__sync_file, fd)
+        if checksum is not None and _hash.hexdigest() != checksum.lower():
+            logger.error('Checksum mismatch for downloaded package [%s], discarding it', \
+                         resource_name)
+            Downloader.__discard(_part_path, _validator_path)
+            return None
+        os.replace(_part_path, _target_path)
+        Downloader.__discard(_validator_path)
+        return pathlib.Path(_target_path)
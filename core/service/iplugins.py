@@ -9,7 +9,6 @@ import abc
 from typing import Type, Any
 from pathlib import Path
 #import yapsy
-from tinydb import Query
 import six
 
 
@@ -46,18 +45,20 @@ class ISource(object):
             db_connection (object): An open connection to database
         """
         self.__source_table = self.__db_connection.table('Source')
-        self.__details = self.__source_table\
-                .get(Query()['name'] == self.__name)
+        _records = self.__source_table.find('name', self.__name)
         self.__is_new = False
-        if len(self.__details) <= 0:
+        if len(_records) <= 0:
             self.__is_new = True
-        elif len(self.__details) > 1:
+            self.__details = {'name': self.__name}
+        elif len(_records) > 1:
             raise LookupError(\
                               'Inconsistent source table. \
                               There should be only one record \
                               for a given source. Number of \
                               records found: %s' \
-                              % len(self.__details))
+                              % len(_records))
+        else:
+            self.__details = dict(_records[0])
 
     @abc.abstractmethod
     def update_details(self, uri:str=None, username:str=None, password:str=None, source_type:str=None, modified_on:str=None, modified_by:str=None, security_id:str=None) -> (bool, str):
@@ -90,7 +91,7 @@ class ISource(object):
             self.__details['Security_Id'] = security_id
         record_count = 0
         if not self.__is_new:
-            record_count = self.__source_table.update(self.__details, Query()['name'] == self.name)
+            record_count = len(self.__source_table.update(self.__details, 'name', self.name))
         if record_count > 0:
             return (True, '%d record(s) updated' % record_count)
         return (False, 'Unable to update details in db. \
@@ -100,12 +101,13 @@ class ISource(object):
     def save(self) -> (bool, str):
         """Creates a new source record and saves it in database
         """
-        src_count = self.__source_table.count(Query()['Name'] == self.name)
+        src_count = self.__source_table.count('name', self.name)
         if src_count <= 0:
             _result = self.__source_table.insert(self.__details)
+            self.__is_new = False
         else:
             return (False, 'A source with same name already exists - %s' % self.name)
-        if len(_result) > 0:
+        if _result is not None:
             return (True, _result)
         else:
             return (False, 'Unable to create new source record')
@@ -0,0 +1,157 @@
+"""
+.. module:: archive_cache
+   :platform: Unix, Windows
+   :synopsis: Size and age bounded eviction of the package archive cache
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+
+#imports ---------------------------------
+import time
+import logging
+import threading
+from ui_builder.core import init_log, constants
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+
+class ArchiveCacheManager(object):
+    """Keeps an :class:`ArchiveStore` within configured limits by evicting the least \
+            recently used archives. Limits are the max number of bytes, the max \
+            number of entries and the max age (time since last access) of an \
+            entry, a limit of 0 disables it.
+
+    Eviction runs in a background thread, it is requested after every addition to \
+            the cache and repeated periodically so entries also expire by age \
+            when the cache is idle. Hit, miss and eviction counters are \
+            available through :meth:`statistics`
+    """
+
+    def __init__(self, archive_store, max_bytes=None, max_entries=None, max_age=None, \
+                 eviction_interval=None):
+        """Init the cache manager for the store passed as argument
+
+        Args:
+            archive_store (ArchiveStore): Store to be kept within limits
+            max_bytes (int): Max size of the cache in bytes (optional)
+            max_entries (int): Max number of packages in the cache (optional)
+            max_age (float): Max seconds since last access of a package (optional)
+            eviction_interval (float): Seconds between periodic evictions (optional)
+        """
+        self.archive_store = archive_store
+        self.max_bytes = max_bytes if max_bytes is not None else constants.ARCHIVE_CACHE_MAX_BYTES
+        self.max_entries = max_entries if max_entries is not None \
+                else constants.ARCHIVE_CACHE_MAX_ENTRIES
+        self.max_age = max_age if max_age is not None else constants.ARCHIVE_CACHE_MAX_AGE
+        self.eviction_interval = eviction_interval if eviction_interval is not None \
+                else constants.ARCHIVE_CACHE_EVICTION_INTERVAL
+        self.__counter_lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__evicted_bytes = 0
+        self.__eviction_requested = threading.Event()
+        self.__stop_eviction = threading.Event()
+        self.__eviction_thread = None
+
+    def record_hit(self, package_name):
+        """Counts a cache hit and marks the package as most recently used
+        """
+        with self.__counter_lock:
+            self.__hits += 1
+        self.archive_store.touch(package_name)
+
+    def record_miss(self, package_name):
+        """Counts a cache miss
+        """
+        with self.__counter_lock:
+            self.__misses += 1
+        logger.debug('Archive cache miss for package [%s]', package_name)
+
+    def statistics(self):
+        """Returns the counters and the current usage of the cache
+
+        Returns:
+            statistics (dict): Having the keys hits, misses, evictions, evicted_bytes, \
+                    entries and size
+        """
+        with self.__counter_lock:
+            return {'hits': self.__hits, 'misses': self.__misses, \
+                    'evictions': self.__evictions, 'evicted_bytes': self.__evicted_bytes, \
+                    'entries': len(self.archive_store), 'size': self.archive_store.total_size}
+
+    def is_over_limit(self):
+        """Returns True if the cache exceeds the size or entry limit
+        """
+        return (self.max_bytes > 0 and self.archive_store.total_size > self.max_bytes) \
+                or (self.max_entries > 0 and len(self.archive_store) > self.max_entries)
+
+    def evict(self):
+        """Removes expired entries and then least recently used entries until the \
+                cache is within its limits
+
+        Returns:
+            evicted (list): Names of the evicted packages
+        """
+        _evicted = []
+        _expire_before = time.time() - self.max_age if self.max_age > 0 else None
+        for _entry in self.archive_store.least_recently_used():
+            _is_expired = _expire_before is not None and _entry['accessed'] < _expire_before
+            if not _is_expired and not self.is_over_limit():
+                #entries are in LRU order, nothing after this one needs eviction
+                break
+            _size = self.archive_store.total_size
+            #not removed if used again since the snapshot was taken
+            if self.archive_store.remove(_entry['name'], _entry['accessed']):
+                _evicted.append(_entry['name'])
+                with self.__counter_lock:
+                    self.__evictions += 1
+                    self.__evicted_bytes += _size - self.archive_store.total_size
+        self.archive_store.flush()
+        if len(_evicted) > 0:
+            logger.info('Evicted %d package(s) from archive cache...%s', len(_evicted), _evicted)
+        return _evicted
+
+    def request_eviction(self):
+        """Wakes up the eviction thread, eviction is done inline if the thread is \
+                not running
+        """
+        if self.__eviction_thread is not None and self.__eviction_thread.is_alive():
+            self.__eviction_requested.set()
+        else:
+            self.evict()
+
+    def start(self):
+        """Starts the background eviction thread
+        """
+        if self.__eviction_thread is not None and self.__eviction_thread.is_alive():
+            return
+        self.__stop_eviction.clear()
+        self.__eviction_thread = threading.Thread(target=self.__run, \
+                                                  name='ArchiveCacheEvictionThread', daemon=True)
+        self.__eviction_thread.start()
+
+    def stop(self):
+        """Stops the background eviction thread and writes pending access times
+        """
+        self.__stop_eviction.set()
+        self.__eviction_requested.set()
+        if self.__eviction_thread is not None:
+            self.__eviction_thread.join()
+            self.__eviction_thread = None
+        self.archive_store.flush()
+
+    def __run(self):
+        """Body of the eviction thread
+        """
+        while not self.__stop_eviction.is_set():
+            self.__eviction_requested.wait(self.eviction_interval)
+            self.__eviction_requested.clear()
+            if self.__stop_eviction.is_set():
+                break
+            try:
+                self.evict()
+            except Exception as msg:
+                logger.error('Eviction of archive cache failed...%s', msg)
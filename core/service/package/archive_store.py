@@ -0,0 +1,320 @@
+"""
+.. module:: archive_store
+   :platform: Unix, Windows
+   :synopsis: Content addressed storage of package archives
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+
+#imports ---------------------------------
+import os
+import json
+import errno
+import shutil
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from ui_builder.core import init_log
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+#ioctl request to clone (reflink) a file on Linux filesystems supporting it
+FICLONE = 0x40049409
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path):
+    """Returns the SHA-256 hex digest of a file
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        digest (str): Hex digest of the file content
+    """
+    _hash = hashlib.sha256()
+    with open(file_path, 'rb') as fd:
+        while True:
+            chunk = fd.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            _hash.update(chunk)
+    return _hash.hexdigest()
+
+
+def link_or_copy(source_path, target_path):
+    """Makes the content of source available at target without copying bytes where \
+            possible. Tries a hard link first, then a reflink and falls back to a \
+            plain copy (e.g., across file systems)
+
+    Args:
+        source_path (str): Existing file
+        target_path (str): Path to be created, must not exist
+    """
+    try:
+        os.link(source_path, target_path)
+        return
+    except OSError as msg:
+        logger.debug('Hard link failed for [%s]...%s', target_path, msg)
+    try:
+        import fcntl
+        with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return
+    except (ImportError, OSError) as msg:
+        logger.debug('Reflink failed for [%s]...%s', target_path, msg)
+    shutil.copyfile(source_path, target_path)
+
+
+class ArchiveStore(object):
+    """Content addressed store of package archives. Archives are stored once as \
+            blobs named by their SHA-256 digest (`objects/<ab>/<digest>`) and a \
+            small name to digest index (`index.json`) maps package names to blobs. \
+            Identical archives shared between versions or sources occupy disk \
+            space only once and lookups by name are dictionary hits.
+
+    Note:
+        Package names are case-folded before lookup. The index is kept in least \
+                recently used order, see :meth:`touch` and :meth:`least_recently_used`
+    """
+
+    INDEX_FILE_NAME = 'index.json'
+    OBJECTS_DIR_NAME = 'objects'
+
+    def __init__(self, store_location):
+        """Opens (or creates) the store at the location passed as argument
+
+        Args:
+            store_location (str): Directory where blobs and index are kept
+        """
+        self.store_location = os.path.abspath(store_location)
+        self._objects_location = os.path.join(self.store_location, ArchiveStore.OBJECTS_DIR_NAME)
+        self._index_path = os.path.join(self.store_location, ArchiveStore.INDEX_FILE_NAME)
+        self._lock = threading.RLock()
+        self._index = OrderedDict()
+        self._references = {}
+        self._total_size = 0
+        self._is_dirty = False
+        os.makedirs(self._objects_location, exist_ok=True)
+        self.__load_index()
+
+    @staticmethod
+    def _key(package_name):
+        return package_name.casefold()
+
+    def __load_index(self):
+        """Loads the name to digest index and counts the references of each blob
+        """
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r') as fd:
+                _entries = json.load(fd)
+            _now = time.time()
+            for entry in _entries.values():
+                entry.setdefault('accessed', _now)
+            self._index = OrderedDict(sorted(_entries.items(), key=lambda item: item[1]['accessed']))
+        for entry in self._index.values():
+            self.__acquire(entry['digest'], entry['size'])
+        logger.debug('Archive store loaded with %d package(s) and %d blob(s)', \
+                     len(self._index), len(self._references))
+
+    def _save_index(self):
+        """Writes the index atomically (temp file + rename)
+        """
+        _temp_path = self._index_path + '.tmp'
+        with open(_temp_path, 'w') as fd:
+            json.dump(self._index, fd)
+        os.replace(_temp_path, self._index_path)
+        self._is_dirty = False
+
+    def flush(self):
+        """Writes pending access time updates (see :meth:`touch`) to the index file
+        """
+        with self._lock:
+            if self._is_dirty:
+                self._save_index()
+
+    def blob_path(self, digest):
+        """Returns the path of the blob for a digest
+
+        Args:
+            digest (str): SHA-256 hex digest
+
+        Returns:
+            path (str): Path to the blob (might not exist)
+        """
+        return os.path.join(self._objects_location, digest[:2], digest)
+
+    def __contains__(self, package_name):
+        return ArchiveStore._key(package_name) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def total_size(self):
+        """Size in bytes of all blobs in the store, shared blobs are counted once
+        """
+        return self._total_size
+
+    def names(self):
+        """Returns the names of all packages in the store
+        """
+        return [entry['name'] for entry in self._index.values()]
+
+    def get_entry(self, package_name):
+        """Returns the index entry (name, digest, size, accessed) of a package or None
+        """
+        return self._index.get(ArchiveStore._key(package_name))
+
+    def get_path(self, package_name):
+        """Returns the blob path of a package or None if not in store
+        """
+        _entry = self.get_entry(package_name)
+        if _entry is None:
+            return None
+        return self.blob_path(_entry['digest'])
+
+    def touch(self, package_name):
+        """Marks a package as most recently used. The access time is kept in memory \
+                and written with the next change or :meth:`flush`
+
+        Args:
+            package_name (str): Name of the package
+
+        Returns:
+            status (bool): True if package is in store
+        """
+        with self._lock:
+            _key = ArchiveStore._key(package_name)
+            _entry = self._index.get(_key)
+            if _entry is None:
+                return False
+            _entry['accessed'] = time.time()
+            self._index.move_to_end(_key)
+            self._is_dirty = True
+            return True
+
+    def least_recently_used(self):
+        """Returns copies of the index entries ordered from least to most recently used, \
+                i.e., a snapshot which isn't changed by later accesses
+        """
+        with self._lock:
+            return [dict(entry) for entry in self._index.values()]
+
+    def add(self, package_name, file_path, digest=None, move=False):
+        """Adds an archive to the store under the package name. If a blob with the \
+                same content exists, the archive is deduplicated against it. With \
+                `move` the source file is removed afterwards; on the same file \
+                system this is a link + unlink, i.e., no bytes are copied
+
+        Args:
+            package_name (str): Name of the package
+            file_path (str): Path to the archive
+            digest (str): SHA-256 of the archive if already known (optional)
+            move (bool): Remove the source file once stored
+
+        Returns:
+            digest (str): Digest of the stored archive
+        """
+        with self._lock:
+            _key = ArchiveStore._key(package_name)
+            _entry = self.get_entry(package_name)
+            if digest is None and _entry is not None \
+                    and os.path.exists(self.blob_path(_entry['digest'])) \
+                    and os.path.samefile(file_path, self.blob_path(_entry['digest'])):
+                #file is a link of the blob already, nothing to hash or store
+                digest = _entry['digest']
+            if digest is None:
+                digest = file_digest(file_path)
+            _blob_path = self.blob_path(digest)
+            if not os.path.exists(_blob_path):
+                os.makedirs(os.path.dirname(_blob_path), exist_ok=True)
+                _temp_path = _blob_path + '.tmp'
+                if os.path.exists(_temp_path):
+                    os.remove(_temp_path)
+                link_or_copy(file_path, _temp_path)
+                os.replace(_temp_path, _blob_path)
+                logger.debug('New blob [%s] stored for package [%s]', digest, package_name)
+            else:
+                logger.debug('Package [%s] deduplicated against blob [%s]', package_name, digest)
+            _size = os.path.getsize(_blob_path)
+            if _entry is None or _entry['digest'] != digest:
+                if _entry is not None:
+                    self.__release(_entry['digest'], _entry['size'])
+                self.__acquire(digest, _size)
+            self._index[_key] = {'name': package_name, 'digest': digest, \
+                                 'size': _size, 'accessed': time.time()}
+            self._index.move_to_end(_key)
+            self._save_index()
+            if move:
+                os.remove(file_path)
+            return digest
+
+    def link_to(self, package_name, target_path):
+        """Makes the archive of a package available at target path using a hard \
+                link (or reflink/copy if linking is not possible)
+
+        Args:
+            package_name (str): Name of the package
+            target_path (str): Path of the file to be created
+
+        Returns:
+            target_path (str): Path of the file or None if package is not in store
+        """
+        with self._lock:
+            _blob_path = self.get_path(package_name)
+            if _blob_path is None:
+                return None
+            if os.path.exists(target_path):
+                if os.path.samefile(_blob_path, target_path):
+                    return target_path
+                os.remove(target_path)
+            link_or_copy(_blob_path, target_path)
+            return target_path
+
+    def remove(self, package_name, accessed=None):
+        """Removes a package from the store, the blob is deleted once no package \
+                refers to it anymore
+
+        Args:
+            package_name (str): Name of the package
+            accessed (float): Access time of the package as seen by the caller, the \
+                    package is kept if it was accessed since (optional)
+
+        Returns:
+            status (bool): True if package was removed
+        """
+        with self._lock:
+            _key = ArchiveStore._key(package_name)
+            _entry = self._index.get(_key)
+            if _entry is None or (accessed is not None and _entry['accessed'] != accessed):
+                return False
+            del self._index[_key]
+            self.__release(_entry['digest'], _entry['size'])
+            self._save_index()
+            return True
+
+    def __acquire(self, digest, size):
+        """Adds one reference to a blob
+        """
+        self._references[digest] = self._references.get(digest, 0) + 1
+        if self._references[digest] == 1:
+            self._total_size += size
+
+    def __release(self, digest, size):
+        """Drops one reference of a blob and deletes it when unreferenced
+        """
+        self._references[digest] = self._references.get(digest, 1) - 1
+        if self._references[digest] <= 0:
+            del self._references[digest]
+            self._total_size -= size
+            try:
+                os.remove(self.blob_path(digest))
+                logger.debug('Unreferenced blob [%s] deleted', digest)
+            except OSError as msg:
+                if msg.errno != errno.ENOENT:
+                    raise
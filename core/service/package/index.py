@@ -0,0 +1,233 @@
+"""
+.. module:: index
+   :platform: Unix, Windows
+   :synopsis: In-memory lookup structures for the package index
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+
+#imports ---------------------------------
+import logging
+from ui_builder.core import init_log
+
+#init logs ----------------------------
+init_log.config_logs()
+LOGGER = logging.getLogger(__name__)
+
+
+class _TrieNode(object):
+    """Single node of :class:`PrefixTrie`
+    """
+
+    __slots__ = ('children', 'is_word')
+
+    def __init__(self):
+        self.children = {}
+        self.is_word = False
+
+
+class PrefixTrie(object):
+    """Character trie over package names. Lookups cost time proportional to \
+            the length of the prefix plus the size of the matching sub-tree, \
+            independent of the total number of names stored
+    """
+
+    def __init__(self):
+        """Creates an empty trie
+        """
+        self._root = _TrieNode()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, word):
+        node = self.__find_node(word)
+        return node is not None and node.is_word
+
+    def __find_node(self, prefix):
+        """Walks the trie along the prefix and returns the last node or None
+        """
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def insert(self, word):
+        """Adds a word to the trie
+
+        Args:
+            word (str): The word to be added
+
+        Returns:
+            status (bool): True if the word was not present before
+        """
+        node = self._root
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+        if node.is_word:
+            return False
+        node.is_word = True
+        self._count += 1
+        return True
+
+    def remove(self, word):
+        """Removes a word from the trie and prunes the nodes left without children
+
+        Args:
+            word (str): The word to be removed
+
+        Returns:
+            status (bool): True if the word was found and removed
+        """
+        path = [self._root]
+        for char in word:
+            node = path[-1].children.get(char)
+            if node is None:
+                return False
+            path.append(node)
+        if not path[-1].is_word:
+            return False
+        path[-1].is_word = False
+        self._count -= 1
+        #prune the branch bottom-up while nodes are empty
+        for index in range(len(word), 0, -1):
+            node = path[index]
+            if node.is_word or len(node.children) > 0:
+                break
+            del path[index - 1].children[word[index - 1]]
+        return True
+
+    def starts_with(self, prefix):
+        """Yields all words starting with the prefix passed as argument
+
+        Args:
+            prefix (str): Prefix to look for
+
+        Returns:
+            words (generator): Generator of matching words
+        """
+        node = self.__find_node(prefix)
+        if node is None:
+            return
+        stack = [(node, prefix)]
+        while len(stack) > 0:
+            node, word = stack.pop()
+            if node.is_word:
+                yield word
+            for char, child in node.children.items():
+                stack.append((child, word + char))
+
+
+class PackageNameIndex(object):
+    """Merged index of packages across all package sources. Maps each package \
+            name to the entries (source name, index entry) providing it and \
+            keeps a :class:`PrefixTrie` of names for prefix queries
+    """
+
+    def __init__(self):
+        """Creates an empty index
+        """
+        self._entries = {}
+        self._source_packages = {}
+        self._trie = PrefixTrie()
+        self._revision = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def revision(self):
+        """Counter increased every time an update adds, changes or removes an entry. \
+                Can be used as cache key for results derived from the index
+        """
+        return self._revision
+
+    def __contains__(self, package_name):
+        return package_name in self._entries
+
+    def update_source(self, source_name, source_index):
+        """Merges the index of one source into this index. Only the names which \
+                were added, changed or removed since the last update of the \
+                same source are touched
+
+        Args:
+            source_name (str): Name of the source owning the index
+            source_index (dict): Package name to index entry mapping of the source
+        """
+        if source_index is None:
+            source_index = {}
+        old_names = self._source_packages.get(source_name, set())
+        new_names = set(source_index.keys())
+        is_changed = len(old_names - new_names) > 0
+        for package_name in old_names - new_names:
+            self.__remove_entry(source_name, package_name)
+        for package_name in new_names:
+            _sources = self._entries.get(package_name)
+            if _sources is None:
+                _sources = self._entries[package_name] = {}
+                self._trie.insert(package_name)
+            if source_name not in _sources or _sources[source_name] != source_index[package_name]:
+                _sources[source_name] = source_index[package_name]
+                is_changed = True
+        self._source_packages[source_name] = new_names
+        if is_changed:
+            self._revision += 1
+        LOGGER.debug('Index merged for source [%s]; %d package(s), %d removed', \
+                     source_name, len(new_names), len(old_names - new_names))
+
+    def remove_source(self, source_name):
+        """Removes all entries contributed by a source
+
+        Args:
+            source_name (str): Name of the source to be removed
+        """
+        _package_names = self._source_packages.pop(source_name, set())
+        for package_name in _package_names:
+            self.__remove_entry(source_name, package_name)
+        if len(_package_names) > 0:
+            self._revision += 1
+
+    def __remove_entry(self, source_name, package_name):
+        """Removes one (source, package) entry and drops the name once no source \
+                provides it anymore
+        """
+        _sources = self._entries.get(package_name)
+        if _sources is None:
+            return
+        _sources.pop(source_name, None)
+        if len(_sources) <= 0:
+            del self._entries[package_name]
+            self._trie.remove(package_name)
+
+    def find(self, package_name):
+        """Returns all entries for the exact package name
+
+        Args:
+            package_name (str): Name of the package
+
+        Returns:
+            entries (list): List of (source name, index entry) tuples, empty if \
+                    not found
+        """
+        _sources = self._entries.get(package_name)
+        if _sources is None:
+            return []
+        return list(_sources.items())
+
+    def find_by_prefix(self, prefix):
+        """Returns entries for all packages whose name starts with the prefix
+
+        Args:
+            prefix (str): Prefix of the package names
+
+        Returns:
+            entries (dict): Package name to list of (source name, index entry) tuples
+        """
+        return {package_name: list(self._entries[package_name].items()) \
+                for package_name in self._trie.starts_with(prefix)}
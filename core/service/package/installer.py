@@ -8,11 +8,16 @@
 import configparser
 import os
 import glob
-from ui_builder.core import constants
-from tinydb import TinyDB, Query
+import shutil
+import logging
+from ui_builder.core import constants, init_log
 from ui_builder.core.service.package.models import PackageInfo
 from ui_builder.core.service.component import manager
 
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
 
 class PackageInstaller(object):
     """Installs the package on local system. This class interacts with :class:`PackageDownloader`
@@ -61,33 +66,27 @@ class PackageInstaller(object):
         Returns:
             None
         """
-        db = TinyDB(constants.UI_BUILDER_DB_PATH)
-        q = Query()
+        db = self.package_manager.db_connection
         pkg_idx = db.table('Package_Index')
-        pkg = pkg_idx.get(q['name'] == package_name)
-        if len(pkg) > 0:
-            if len(pkg) == 1:
-                pkg_tbl = db.table('Package')
-                pkg_record = pkg_tbl.get(Query()['Details']['id'] == pkg.id)
-                if len(pkg_record) > 0:
-                    if len(pkg_record) == 1:
-                        location = pkg_record['Location']
+        pkgs = pkg_idx.find('Name', package_name)
+        if len(pkgs) > 0:
+            if len(pkgs) == 1:
+                pkg = pkgs[0]
+                pkg_tbl = db.table('Packages')
+                pkg_records = pkg_tbl.find('Details.id', pkg['Id'])
+                if len(pkg_records) > 0:
+                    if len(pkg_records) == 1:
+                        location = pkg_records[0]['Location']
                         #WARNING-This section physically removes the package and its components from file system and unregisters it from index and registry. PackageManager should take care of unregistering the components once this ops gets completed successfully
                         if location is not None and os.path.exists(location):
                             shutil.rmtree(location, ignore_errors=True)
-                            pkg_tbl.remove(Query['Details']['id'] == pkg.id)
-                            pkg_idx.remove(Query['id'] == pkg.id)
-                            del pkg
                         elif location is not None and os.path.exists(location) == False:
                             logger.warn('No folder exists at location [{0}], deleting entry for pkg from index'.format(location))
-                            pkg_tbl.remove(Query['Details']['id'] == pkg.id)
-                            pkg_idx.remove(Query['id'] == pkg.id)
-                            del pkg
                         else:
-                            logger.warn('Package is in inconsistent state, removing package details from system...{0}'.format(pkg.name))
-                            pkg_tbl.remove(Query['Details']['id'] == pkg.id)
-                            pkg_idx.remove(Query['id'] == pkg.id)
-                            del pkg
+                            logger.warn('Package is in inconsistent state, removing package details from system...{0}'.format(pkg['Name']))
+                        with db.transaction():
+                            pkg_tbl.remove('Details.id', pkg['Id'])
+                            pkg_idx.remove('Id', pkg['Id'])
                     else:
                         logger.warn('More than 1 package found with same name, package uninstall is skipped...{0}'.format(package_name))
                 else:
@@ -103,16 +102,72 @@ class PackageInstaller(object):
             package_name (str): Name of the package that needs to be installed
             package_file (PackageFile): An instance of :mod:`ui_builder.core.io.filesystem`.:class:`PackageFile`
         """
-        package_overwrite_mode = True if self._config.get(PACKAGE_INSTALLER, PKG_OVERWRITE_MODE).upper() == 'ON' else False
-        package_path = package_file.extract_to(self.pkg_install_location, overwrite=package_overwrite_mode)
-        package_info = self.__validate_package(package_path)
-        registered = self.__register_package(package_info)
-        if registered == False:
-            logger.warn('Unable to register package, check logs for more info...{0}'.format(package_name))
+        package_info = self.extract_package(package_name, package_file)
+        if package_info is None:
+            logger.warn('Unable to extract package, check logs for more info...{0}'.format(package_name))
             return False
+        return self.register_packages({package_name: package_info})[package_name]
+
+    def extract_package(self, package_name, package_file):
+        """Extracts the package on the local file system and loads its install config.
+            This is the file system bound part of :meth:`install_package` and is \
+                safe to run in a worker thread
+
+        Args:
+            package_name (str): Name of the package that needs to be extracted
+            package_file (PackageFile): An instance of :mod:`ui_builder.core.io.filesystem`.:class:`PackageFile`
+
+        Returns:
+            package (PackageInfo): Returns an instance of :class:`PackageInfo` or None if \
+                    package is not valid
+        """
+        package_overwrite_mode = True if self._config.get(constants.PACKAGE_INSTALLER, constants.PKG_OVERWRITE_MODE).upper() == 'ON' else False
+        if package_overwrite_mode and constants.PKG_DIFFERENTIAL_UPGRADE:
+            package_path, changed, removed = package_file.upgrade_to(self.pkg_install_location, \
+                    workers=constants.PACKAGE_EXTRACT_WORKERS)
+            logger.debug('Package upgraded, {0} file(s) extracted and {1} removed...{2}'\
+                         .format(len(changed), len(removed), package_name))
         else:
-            logger.info('Package has been installed successfully...{0}'.format(package_name))
-            return True
+            package_path = package_file.extract_to(self.pkg_install_location, overwrite=package_overwrite_mode, \
+                                                   workers=constants.PACKAGE_EXTRACT_WORKERS)
+        package_info = self.__validate_package(package_path)
+        if package_info is not None:
+            logger.debug('Loading package details stored at...{0}'.format(package_info.location))
+            package_info.load_install_config()
+            logger.debug('Package has been extracted...{0}'.format(package_name))
+        return package_info
+
+    def register_packages(self, packages):
+        """Registers a batch of extracted packages in one transaction of the metadata \
+                database, i.e., the whole batch is written to the database once. \
+                Every package is registered in a nested transaction, so a package \
+                failing to register is rolled back without being left half \
+                registered and without affecting the others
+
+        Args:
+            packages (dict): Package name to :class:`PackageInfo` mapping of packages \
+                    returned by :meth:`extract_package`
+
+        Returns:
+            results (dict): Package name to registration status (True or False)
+        """
+        db = self.package_manager.db_connection
+        _results = {}
+        with db.transaction():
+            for package_name, package_info in packages.items():
+                try:
+                    #package, its index entry and its components are committed together
+                    with db.transaction():
+                        registered = self.__register_package(db, package_info)
+                except Exception as msg:
+                    logger.error('Registration failed for package [{0}]...{1}'.format(package_name, msg))
+                    registered = False
+                if registered == False:
+                    logger.warn('Unable to register package, check logs for more info...{0}'.format(package_name))
+                else:
+                    logger.info('Package has been installed successfully...{0}'.format(package_name))
+                _results[package_name] = registered
+        return _results
 
     def __validate_package(self, package_path):
         """Validates the content of extracted package on file system and returns an instance :class:`PackageInfo` if validated successfully
@@ -127,7 +182,7 @@ class PackageInstaller(object):
         #find .pkg files
         package_config_file = glob.glob(os.path.join(package_path, '*.pkg'))
         if len(package_config_file) == 1:
-            package_info = PackageInfo(package_config_file)
+            package_info = PackageInfo(package_config_file[0])
             logger.debug('Package definition found...{0}'.format(package_config_file[0]))
             return package_info
         elif len(package_config_file) > 1:
@@ -137,30 +192,23 @@ class PackageInstaller(object):
             logger.warn('No .pkg file found. A package should have exactly one .pkg file')
         return None
 
-    def __register_package(self, package_info):
+    def __register_package(self, db, package_info):
         """Registers the package with :class:`PackageManager` and its components with :class:`ComponentManager`
 
         Args:
+            db (Storage): An open connection to the metadata database
             package_info (PackageInfo): An instance of :class:`PackageInfo`that needs to be registered
         """
-        logger.debug('Loading package details stored at...{0}'.format(package_info.location))
-        package_info._load_install_config()
-        logger.debug('Open connection to database: {0}'.format(UI_BUILDER_DB_PATH))
-        #global UI_BUILDER_DB_PATH
-        db = TinyDB(UI_BUILDER_DB_PATH)
-        q = Query()
         package_table = db.table('Packages')
         package_info.is_enabled = True
         package_info.is_installed = True
-        package_details = package_info.__dict__.copy()
-        #we will not save config and component objects
-        package_details['_config_file'] = None
-        package_details['_components'] = None
-        package_entry = package_table.upsert({'Location':package_info.location, 'Details':package_details}, q['Details']['id'] == package_info.id)
+        #config and component objects are not part of the record
+        package_details = package_info.to_record()
+        package_entry = package_table.upsert({'Location':package_info.location, 'Details':package_details}, 'Details.id', package_info.id)
         logger.debug('Package with name [{0}] and id [{1}] has been registered'.format(package_info.name, package_info.id))
         package_index_table = db.table('Package_Index')
-        index_q = Query()
-        package_index = package_index_table.upsert({'Id':package_info.id, 'Name':package_info.name}, index_q['Id'] == package_info.id)
+        package_index = package_index_table.upsert({'Id':package_info.id, 'Name':package_info.name, \
+                                                     'Version':package_info.version}, 'Id', package_info.id)
         logger.debug('Processing child components now...')
         for name, component in package_info.components.items():
             self.component_manager.register(component.id, component, package_info)
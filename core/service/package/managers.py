@@ -9,20 +9,43 @@
 #imports ---------------------------------
 import configparser
 import os
+import atexit
+import time
+import asyncio
+import concurrent.futures
+import uuid
 import logging
 import warnings
+from goldfinch import validFileName
 from yapsy.PluginManager import PluginManager
-from tinydb import TinyDB, Query, where
 from ui_builder.core.service import package_commands, components
-from ui_builder.core.service.package.models import PackageInfo, DefaultPackageSource
+from ui_builder.core.service.package.models import PackageInfoCache, PackageHandle, \
+        DefaultPackageSource
+from ui_builder.core.service.package.installer import PackageInstaller
+from ui_builder.core.service.package.index import PackageNameIndex
+from ui_builder.core.service.package.archive_store import ArchiveStore
+from ui_builder.core.service.package.archive_cache import ArchiveCacheManager
+from ui_builder.core.service.package.pipeline import PackageInstallPipeline
+from ui_builder.core.service.package.resolver import DependencyResolver
 from ui_builder.core.provider import tasks
+from ui_builder.core.provider.storage import get_storage
 from ui_builder.core import utils, init_log, constants
+from ui_builder.core.io import filesystem
+from ui_builder.core.io.watcher import DirectoryIndex, ZipValidityCache
 
 #init logs ----------------------------
 init_log.config_logs()
 logger = logging.getLogger(__name__)
 
 
+def _package_file_name(package_name):
+    """Returns the file name of a package in drop-in location (sanitized, as str)
+    """
+    _file_name = validFileName('{0}.{1}'.format(package_name, constants.PACKAGE_FILE_EXTENSION), \
+                               initCap=False)
+    return _file_name.decode() if isinstance(_file_name, bytes) else _file_name
+
+
 class PackageIndexManager(object):
     """Provides indexing functionality of packages in all of the package sources.
 
@@ -55,48 +78,50 @@ class PackageIndexManager(object):
         self._sources_table = db_connection.table('PackageSource')
         self.__package_sources = self.get_all_sources()
         self.__package_index_registry = {}
+        self.__package_name_index = PackageNameIndex()
         self.__source_validity_status = {}
+        self.__stale_sources = set()
         self.__download_location = download_location
-        self.__get_index_thread = tasks.HybridThread(name='PackageIndexCoroThread',\
-                                                     notify_on_all_done=self.__common_callback)
         if len(self.__package_sources) <= 0:
             warnings.warn('No package source are configured. :class:`PackageManager`\
                           will not be able to download any packages')
         else:
             self.__update_package_list()
 
-    def __common_callback(self, results, owner, _type):
-        """The common coroutine callback, which will be called on completion \
-                of all coroutines with owner as one of the parameters
+    @property
+    def stale_sources(self):
+        """Names of the sources whose index could not be refreshed in time during the \
+                last refresh, their last cached index is used
         """
-        if owner == 'ValidityStatusCheck':
-            self.__validity_status_callback(results, _type)
-        elif owner == 'FetchIndex':
-            self.__update_index_callback(results, _type)
+        return set(self.__stale_sources)
+
+    @property
+    def index_revision(self):
+        """Revision of the merged package index, changes whenever any source index \
+                changes
+        """
+        return self.__package_name_index.revision
 
     async def __get_index(self, source):
         """Coroutine to get the index from source using async request
 
         Args:
             source (str): Name of the package source from where index needs to be fetched
+
+        Returns:
+            result (tuple): A 2 element tuple (source-name, source-index)
         """
-        return await source.get_package_index()
+        return (source.name, await source.get_package_index())
 
-    def __update_index_callback(self, results, _type):
-        """This function will be called once all coroutines :func:`__get_index` are done.
-            This callback will receive a list of results in random order as a \
-                    tuple of two elements (source-name, source-index-list)
+    def __register_source_index(self, source_name, source_index):
+        """Keeps the per source registry and the merged name index in sync
 
         Args:
-            results (list): A 2 element tuple list
-            _type (int): function or coroutine
+            source_name (str): Name of the source
+            source_index (dict): Package index of the source
         """
-        for result in results:
-            _name = result[0]
-            _source_index = result[1]
-            self.__package_index_registry[_name] = _source_index
-        if self.__get_index_thread is not None:
-            self.__get_index_thread = None
+        self.__package_index_registry[source_name] = source_index
+        self.__package_name_index.update_source(source_name, source_index)
 
     def get_all_sources(self):
         """Returns an list of :class:`PackageSource` configured in current system
@@ -106,7 +131,7 @@ class PackageIndexManager(object):
         """
         _sources = {}
         if self._sources_table is not None:
-            if self._sources_table.count() > 0:
+            if len(self._sources_table) > 0:
                 for source in self._sources_table.all():
                     source_object = object()
                     if source.name is not None:
@@ -179,30 +204,23 @@ class PackageIndexManager(object):
             message (str): Reason for failurer
         """
         if source_name is not None:
-            result = self._sources_table.remove(Query()['Name'] == source_name)
+            result = self._sources_table.remove('Name', source_name)
         if result is None or len(result) <= 0:
             return (False, 'Can''t delete source from the system')
-            
+        self.__package_index_registry.pop(source_name, None)
+        self.__package_name_index.remove_source(source_name)
         return (True, 'Source has been deleted - {0}'.format(result))
 
     async def __get_validity_status(self, source):
-        """docstring for get_validity_status"""
-        return await source.get_validity_status()
-
-    def __validity_status_callback(self, results, _type):
-        """Will be called once all :func:`__get_validity_status` coroutines are done
+        """Coroutine to check whether the cached index of source is still valid
 
         Args:
-            results (list): A list of two elements tuple
-                                -[0] (str): source name
-                                -[1] (bool): valid or not valid
+            source (PackageSource): The package source to be checked
+
+        Returns:
+            result (tuple): A 2 element tuple (source-name, is-valid)
         """
-        for result in results:
-            _src_name = result[0]
-            _is_src_valid = result[1]
-            self.__source_validity_status[_src_name] = _is_src_valid
-        if self.__get_index_thread is not None:
-            self.__get_index_thread = None
+        return (source.name, await source.get_validity_status())
 
     def refresh_index(self, percentage_completed_callback=None):
         """Refresh the local index from the backend index source
@@ -212,45 +230,105 @@ class PackageIndexManager(object):
                     back to percentage completed status (optional)
         """
         self.__update_package_list(percentage_completed_callback)
-        self.__get_index_thread.wait_for_all_coroutines()
 
     def __update_package_list(self, percentage_completed_callback=None):
-        """This function will fetch a list of all packages under an source
+        """This function will fetch a list of all packages under an source. Validity \
+                checks of all sources run concurrently and the index of a source is \
+                fetched as soon as its check reports it invalid, i.e., while the \
+                other sources are still being checked. Returns once all sources are done.
+            Each source has `index_source_timeout` seconds for its check and fetch and \
+                the refresh ends after `index_refresh_timeout` seconds; sources not done \
+                by then are cancelled and reported as stale (see :attr:`stale_sources`)
 
         Args:
             percentage_completed_callback (func): Callback will be called on updation \
                     of each package and percentage completion will be passed to callback
         """
         if len(self.__package_sources) > 0:
-            #Step1 - Get validity status of all current sources configured
-            self.__get_index_thread.set_owner('ValidityStatusCheck')
-            for source_name, source in self.__package_sources.items():
-                self.__get_index_thread.add_coroutine(self.__get_validity_status, source)
-                if percentage_completed_callback is not None:
-                    #return the percentage completion
-                    self.__get_index_thread.register_coroutine_completed_percentage\
-                            (percentage_completed_callback)
-            self.__get_index_thread.start_forever()
-            #Will wait for coroutines to finish as we need it for next step
-            self.__get_index_thread.wait_for_all_coroutines()
-            #Step2 - Get cached package index for sources having valid indexes
-            for source_name, is_valid in self.__source_validity_status.items():
-                if is_valid:
-                    self.__package_index_registry[source_name] = \
-                            self.__package_sources[source_name].get_cached_package_index()
-            #Step3 - Refresh cached index from source for those which are not valid
-            self.__get_index_thread.set_owner('FetchIndex')
-            for source_name, is_valid in self.__source_validity_status.items():
-                if not is_valid:
-                    self.__get_index_thread\
-                            .add_coroutine(self.__get_index, \
-                                           self.__package_sources[source_name])
+            _thread = tasks.ThreadManager().get_thread('PackageIndexCoroThread')
+            _total = len(self.__package_sources)
+            _completed = 0
+            self.__stale_sources.clear()
+            _refresh_deadline = time.monotonic() + constants.INDEX_REFRESH_TIMEOUT \
+                    if constants.INDEX_REFRESH_TIMEOUT > 0 else None
+            _source_deadlines = {source_name: time.monotonic() + constants.INDEX_SOURCE_TIMEOUT \
+                                 if constants.INDEX_SOURCE_TIMEOUT > 0 else None \
+                                 for source_name in self.__package_sources}
+            #Step1 - Check validity status of all current sources configured
+            _checks = {_thread.submit_coroutine(self.__get_validity_status, (source,), key=source_name, \
+                                                deadline=self.__get_deadline(_source_deadlines[source_name], \
+                                                                             _refresh_deadline)): source_name \
+                       for source_name, source in self.__package_sources.items()}
+            _fetches = {}
+            while len(_checks) > 0 or len(_fetches) > 0:
+                _timeout = max(0.0, _refresh_deadline - time.monotonic()) if _refresh_deadline is not None else None
+                _done, _ = concurrent.futures.wait(list(_checks) + list(_fetches), timeout=_timeout, \
+                                                   return_when=concurrent.futures.FIRST_COMPLETED)
+                if len(_done) <= 0:
+                    #refresh deadline passed, coroutines are cancelled by their deadline too
+                    for _future, _source_name in list(_checks.items()) + list(_fetches.items()):
+                        _future.cancel()
+                        self.__mark_stale(_source_name)
+                    logger.warning('Index refresh timed out, stale sources...%s', sorted(self.__stale_sources))
+                    break
+                for _future in _done:
+                    if _future in _checks:
+                        _source_name = _checks.pop(_future)
+                        _status = self.__get_result(_future, _source_name)
+                        if _status is not None and _status[1]:
+                            #Step2 - Use the cached index of a valid source
+                            self.__source_validity_status[_source_name] = True
+                            self.__register_source_index(_source_name, \
+                                    self.__package_sources[_source_name].get_cached_package_index())
+                        elif _status is not None:
+                            #Step3 - Fetch the index of an invalid source right away
+                            self.__source_validity_status[_source_name] = False
+                            _fetches[_thread.submit_coroutine(self.__get_index, \
+                                    (self.__package_sources[_source_name],), key=_source_name, \
+                                    deadline=self.__get_deadline(_source_deadlines[_source_name], \
+                                                                 _refresh_deadline))] = _source_name
+                            continue
+                    else:
+                        _source_name = _fetches.pop(_future)
+                        _index = self.__get_result(_future, _source_name)
+                        if _index is not None:
+                            self.__register_source_index(_source_name, _index[1])
+                    _completed += 1
                     if percentage_completed_callback is not None:
-                        #return the percentage completion
-                        self.__get_index_thread\
-                                .register_coroutine_completed_percentage(percentage_completed_callback)
-                self.__get_index_thread.reschedule()
-                #No need to wait here as calling thread will handle it
+                        percentage_completed_callback((_completed / _total) * 100)
+
+    @staticmethod
+    def __get_deadline(*deadlines):
+        """Returns the earliest of the deadlines which are set
+        """
+        _deadlines = [_deadline for _deadline in deadlines if _deadline is not None]
+        return min(_deadlines) if len(_deadlines) > 0 else None
+
+    def __get_result(self, future, source_name):
+        """Returns the result of a completed future or None if it failed. Sources \
+                failed, timed out or cancelled are marked stale
+        """
+        try:
+            return future.result()
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError, \
+                concurrent.futures.CancelledError):
+            logger.warning('Index of source [%s] not refreshed in time, marked as stale', source_name)
+            self.__mark_stale(source_name)
+        except Exception as msg:
+            logger.error('Unable to refresh index of source [%s], marked as stale...%s', source_name, msg)
+            self.__mark_stale(source_name)
+        return None
+
+    def __mark_stale(self, source_name):
+        """Marks the source stale and keeps serving its last cached index
+        """
+        self.__stale_sources.add(source_name)
+        if source_name not in self.__package_index_registry:
+            try:
+                self.__register_source_index(source_name, \
+                        self.__package_sources[source_name].get_cached_package_index())
+            except Exception as msg:
+                logger.error('No cached index available for source [%s]...%s', source_name, msg)
 
     def get_package_list(self, refresh=False, percentage_completed_callback=None):
         """Returns an list of all packages either from cache or downloading it from source
@@ -263,15 +341,13 @@ class PackageIndexManager(object):
             percentage_completed_callback(0)
         if refresh:
             self.__update_package_list(percentage_completed_callback)
-            if self.__get_index_thread is not None:
-                #wait for coroutines to finish
-                self.__get_index_thread.wait_for_all_coroutines()
         if percentage_completed_callback is not None and callable(percentage_completed_callback):
             percentage_completed_callback(100)
         return self.__package_index_registry
 
     def find_package(self, package_name):
-        """Finds an package in the index repository
+        """Finds an package in the index repository. The lookup is served by the \
+                merged name index and does not depend on the number of sources
 
         Args:
             package_name (str): Name of the package that needs to be searched
@@ -284,13 +360,31 @@ class PackageIndexManager(object):
                 - message (str): Error message if not able to find the package
         """
         if package_name is not None:
-            for source_name, source in self.__package_sources.items():
-                if self.__package_index_registry[source_name].__contains__(package_name):
-                    return (True, source, \
-                            self.__package_index_registry[source.name][package_name], '')
+            for source_name, entry in self.__package_name_index.find(package_name):
+                if self.__package_sources.__contains__(source_name):
+                    return (True, self.__package_sources[source_name], entry, '')
             return (False, None, None, 'No such package found...{0}'.format(package_name))
         return (False, None, None, 'Can''t accept blank value for package name')
 
+    def find_packages_by_prefix(self, prefix):
+        """Finds all packages in the index repository whose name starts with prefix
+
+        Args:
+            prefix (str): Starting characters of the package names
+
+        Returns:
+            result (tuple of 3 elements): Returns an tuple having below mentioned 3 elements
+                - status (bool): True if at least one package found else False
+                - packages (dict): package name to list of (source name, index entry)
+                - message (str): Error message if not able to find any package
+        """
+        if prefix is not None:
+            _packages = self.__package_name_index.find_by_prefix(prefix)
+            if len(_packages) > 0:
+                return (True, _packages, '')
+            return (False, {}, 'No package found starting with...{0}'.format(prefix))
+        return (False, {}, 'Can''t accept blank value for package prefix')
+
 class PackageManager(object):
     """This class is core in package management system. This manages all other services of 
         package management system. All sub-components should coordinate with help of this
@@ -343,14 +437,23 @@ class PackageManager(object):
                                            constants.PKG_INSTALL_LOC))
         ###Setup commands
         self.__key_to_command_mapping = {}
-        self.__db_connection = TinyDB(UI_BUILDER_DB_PATH)
-        self.installer = PackageInstaller(conf_path)
+        self.__db_connection = get_storage()
+        self.installer = PackageInstaller(self, conf_path)
         self.commands = package_commands.PackageCommands(self)
         self.commands.register_commands()
         self.downloader = PackageDownloader(conf_path)
         self.archive_manager = ArchiveManager(conf_path)
         self.component_manager = components.ComponentManager(self.__db_connection)
         self.package_index_manager = PackageIndexManager(self.__db_connection)
+        self._package_info_cache = PackageInfoCache(self.__db_connection, constants.PACKAGE_INFO_CACHE_SIZE)
+        self.dependency_resolver = DependencyResolver(self.package_index_manager)
+
+    @property
+    def db_connection(self):
+        """Connection (:class:`Storage` or :class:`SQLiteStorage`) to the metadata database shared by the \
+                package management services
+        """
+        return self.__db_connection
 
     @property
     def packages_name_id_map(self):
@@ -360,11 +463,26 @@ class PackageManager(object):
 
     @property
     def packages_map(self):
-        """Provides the mapping of package id and its in memory instance for \
-                faster loading of packages
+        """Provides the mapping of package id and its :class:`PackageHandle`, the \
+                package details are loaded on first access of the handle
         """
         return self._packages_map
 
+    @property
+    def package_info_cache(self):
+        """LRU cache (:class:`PackageInfoCache`) of the fully loaded packages
+        """
+        return self._package_info_cache
+
+    def __add_package_handle(self, pkg_record):
+        """Adds a handle for the record of `Package_Index` to the package maps
+        """
+        pkg = PackageHandle(pkg_record['Id'], pkg_record['Name'], pkg_record.get('Version'), \
+                            self._package_info_cache)
+        self.packages_name_id_map[pkg_record['Name']] = pkg_record['Id']
+        self.packages_map[pkg_record['Id']] = pkg
+        return pkg
+
     def __load_key_command_bindings(self):
         """Loads the binding details between package manager's commands and associated keys
             These binding details will be used by the :class:`CommandManager`
@@ -373,37 +491,33 @@ class PackageManager(object):
             self.__key_to_command_mapping[key] = value
 
     def load_package(self, pkg_name):
-        """Load package details from the database, create instance of :class:`PackageInfo`
-            and returns the imstance back. It also maintains the instance in in-memory
-            mapping property :attr:`packages_map` for faster lookup
+        """Creates a :class:`PackageHandle` for the package and maintains it in the \
+            in-memory mapping property :attr:`packages_map` for faster lookup. \
+            Details of the package are (re)loaded on first access of the handle
 
         Args:
             pkg_name (str): Name of the package to be loaded
 
         Returns:
-            Instance of :class:`PackageInfo` class or None if not found
+            Instance of :class:`PackageHandle` class or None if not found
         """
         _pkg_table = self.__db_connection.table('Package_Index')
-        _pkg = _pkg_table.get(Query()['name'] == pkg_name)
+        _pkg = _pkg_table.find_one('Name', pkg_name)
         if _pkg is not None:
-            pkg = PackageInfo('')
-            pkg.load_details(_pkg.id, self.__db_connection)
-            self.packages_name_id_map[_pkg.name] = _pkg.id
-            self.packages_map[_pkg.id] = pkg
-            return pkg
+            #details may have changed, e.g., package has been re-installed
+            self._package_info_cache.discard(_pkg['Id'])
+            return self.__add_package_handle(_pkg)
         
         return None
 
     def load_packages(self):
-        """Load all packages in the in-memory mapping property :attr:`packages_map`
+        """Load handles of all packages in the in-memory mapping property \
+                :attr:`packages_map`, only the package index is read
         """
         _package_table = self.__db_connection.table('Package_Index')
         _all_packages = _package_table.all()
         for  pkg_record in _all_packages:
-            pkg = PackageInfo('')
-            pkg.load_details(pkg_record.id, self.__db_connection)
-            self.packages_name_id_map[pkg_record.name] = pkg_record.id
-            self.packages_map[pkg_record.id] = pkg
+            self.__add_package_handle(pkg_record)
         logger.debug('Packages map has been initialized successfully!')
 
     def __get_package_file(self, package_name):
@@ -440,8 +554,8 @@ class PackageManager(object):
         _package_file = None
         if self.archive_manager.is_package_available(package_name):
             _package_file = self.archive_manager.get_package(package_name)
-        elif self.archive_manager.is_package_available_in_cache(package_name):
-            #Step 1.1
+        else:
+            #Step 1.1 - lookup counted as cache hit or miss
             _package_file = self.archive_manager.get_package_from_cache(package_name)
             #Step 2 - Get source of package from :class:`PackageIndexManager`. \
                     #The result will have following format (Status:[True/False], \
@@ -500,18 +614,67 @@ class PackageManager(object):
             return (False, 'Package not found...{0}'.format(file_name))
 
     def install_packages(self, package_list=[], percentage_completed_callback=None):
-        """Install packages provided as list
+        """Install packages provided as list along with their dependencies. \
+                :class:`DependencyResolver` orders the packages in waves, each wave \
+                only depends on earlier waves and is installed in parallel through \
+                :class:`PackageInstallPipeline`, i.e., downloads, extraction and \
+                registration of different packages overlap each other. Concurrency \
+                of each stage can be configured in section `PackageManager` with \
+                `install_download_concurrency`, `install_extract_workers` and \
+                `install_register_batch_size`. The package index is refreshed once \
+                per call if any package is missing in it
+
         Args:
             package_list (list): Name of packages to be installed
         Returns:
-            results (list): Returns a list of results for all packages passed to this function
+            results (dict): Returns a dict of results for all packages passed to this \
+                    function and the dependencies installed for them
         """
+        _pipeline = PackageInstallPipeline(self)
+        _waves, _graph, _failed = self.dependency_resolver\
+                .plan(package_list, self.packages_name_id_map.keys(), \
+                      self.__is_package_available_locally)
+        if len(_failed) > 0:
+            #packages missing in the index might be found after refreshing it, same as install_package
+            _pipeline.refresh_index()
+            _waves, _graph, _failed = self.dependency_resolver\
+                    .plan(package_list, self.packages_name_id_map.keys(), \
+                          self.__is_package_available_locally)
         _results = {}
-        for package in package_list:
-            _status = self.install_package(package, percentage_completed_callback)
-            _results[package] = _status
+        for package_name, reason in _failed.items():
+            _results[package_name] = (False, reason)
+        #progress is reported across all waves
+        _pipeline.track_progress(sum([len(_wave) for _wave in _waves]), percentage_completed_callback)
+        for _wave in _waves:
+            _ready = []
+            for package_name in _wave:
+                _broken = [dependency for dependency in _graph.get(package_name, ()) \
+                           if dependency in _results and _results[dependency] is not True]
+                if len(_broken) > 0:
+                    _results[package_name] = (False, 'Unable to install dependencies {0} of package...{1}'\
+                                              .format(_broken, package_name))
+                    _pipeline.skip(package_name)
+                else:
+                    _ready.append(package_name)
+            _results.update(_pipeline.run(_ready))
         return _results
 
+    def __is_package_available_locally(self, package_name):
+        """Checks whether package file is available in drop-in location or archive cache
+        """
+        return self.archive_manager.is_package_available(package_name) == True \
+                or self.archive_manager.is_package_available_in_cache(package_name) == True
+
+    def install_all_packages(self, percentage_completed_callback=None):
+        """Install all packages available in the package drop-in location
+
+        Returns:
+            results (dict): Returns a dict of results for all packages installed
+        """
+        _package_names = [os.path.splitext(os.path.basename(package_path))[0] \
+                          for package_path in self.archive_manager.get_validated_package_path_list()]
+        return self.install_packages(_package_names, percentage_completed_callback)
+
     def uninstall_package(self, package_name):
         """Uninstall the package from system. This call will be forwarded to installer for performing the operation
 
@@ -540,13 +703,12 @@ class PackageManager(object):
             if self.packages_name_id_map.__contains__(package_name):
                 _package_id = self.packages_name_id_map[package_name]
                 if self.packages_map.__contains__(_package_id):
-                    _package = self.packages_map[_package_id]
-                    _package.is_enabled = status
-                    self.packages_map[_package_id] = _package
                     _package_table = self.__db_connection.table('Packages')
-                    _package_record = _package_table.get(Query['Details']['id'] == _package_id)
-                    _package_record['Details']['is_enabled'] = status
-                    _package_table.update({'Details': _package_record}, Query()['Details']['id'] == _package_id)
+                    def _set_enabled(record):
+                        record['Details']['is_enabled'] = status
+                    _package_table.update(_set_enabled, 'Details.id', _package_id)
+                    #loaded again with the new status on next access
+                    self._package_info_cache.discard(_package_id)
                     _status = (True, '')
                     _results[package_name] = _status
                 else:
@@ -658,6 +820,14 @@ class PackageManager(object):
         else:
             raise Exception('No such package found...{0}'.format(package_name))
 
+    def find_packages_by_prefix(self, prefix):
+        """Finds all packages whose name starts with prefix in all available sources
+        """
+        if prefix is not None:
+            return self.package_index_manager.find_packages_by_prefix(prefix)
+        else:
+            raise Exception('Can''t accept blank value for package prefix')
+
 class ArchiveManager(object):
     """ArchiveManager maintains all the packages which are available on local system in compressed/zip state
 
@@ -678,8 +848,23 @@ class ArchiveManager(object):
         self._config = configparser.ConfigParser()
         self._config.read(os.path.join(conf_path, 'ui_builder.cfg'))
         self.archive_drop_location = os.path.abspath(self._config.get(constants.PACKAGE_INSTALLER, constants.PKG_DROP_IN_LOC))
-        self.archive_cache_location = os.path.abspath(self._config.get(constants.PACKAGE_INSTALLER, constants.PKG_DROP_IN_LOC))
+        self.archive_cache_location = os.path.abspath(self._config.get(constants.PACKAGE_INSTALLER, \
+                constants.PKG_CACHE_LOC, fallback=os.path.join(self.archive_drop_location, '.cache')))
+        self.archive_store = ArchiveStore(self.archive_cache_location)
+        self.validity_cache = ZipValidityCache()
+        self.archive_drop_index = DirectoryIndex(self.archive_drop_location, self.validity_cache, \
+                                                 poll_interval=constants.DIRECTORY_POLL_INTERVAL)
+        self.archive_cache = ArchiveCacheManager(self.archive_store)
+        self.archive_cache.start()
         self.archive_file_list  = None
+        atexit.register(self.close)
+
+    def close(self):
+        """Stops the archive cache eviction and the drop-in location watcher, pending \
+                access times of the cache are written. Called at exit
+        """
+        self.archive_cache.stop()
+        self.archive_drop_index.stop()
 
     def archive_drop_location():
         doc = "The archive_drop_location property."
@@ -714,8 +899,51 @@ class ArchiveManager(object):
         return locals()
     archive_cache_location = property(**archive_cache_location())
 
+    def archive_store():
+        doc = "The archive_store keeps cached packages content addressed, see :class:`ArchiveStore`"
+        def fget(self):
+            return self._archive_store
+        def fset(self, value):
+            self._archive_store = value
+        def fdel(self):
+            del self._archive_store
+        return locals()
+    archive_store = property(**archive_store())
+
+    def archive_cache():
+        doc = "The archive_cache evicts cached packages beyond the limits, see :class:`ArchiveCacheManager`"
+        def fget(self):
+            return self._archive_cache
+        def fset(self, value):
+            self._archive_cache = value
+        def fdel(self):
+            del self._archive_cache
+        return locals()
+    archive_cache = property(**archive_cache())
+
+    def archive_drop_index():
+        doc = "The archive_drop_index is an in-memory listing of the drop-in location, see :class:`DirectoryIndex`"
+        def fget(self):
+            return self._archive_drop_index
+        def fset(self, value):
+            self._archive_drop_index = value
+        def fdel(self):
+            del self._archive_drop_index
+        return locals()
+    archive_drop_index = property(**archive_drop_index())
+
+    def get_cache_statistics(self):
+        """Returns hit, miss and eviction counters and usage of the archive cache
+
+        Returns:
+            statistics (dict): See :meth:`ArchiveCacheManager.statistics`
+        """
+        return self.archive_cache.statistics()
+
     def move_package_to_cache(self, package_name):
-        """Moves the processed package to cache location for future references
+        """Moves the processed package to cache location for future references. The \
+                archive is added to the :class:`ArchiveStore`, identical archives \
+                are stored only once and on the same file system no bytes are copied
 
         Args:
             package_name (str): Name of the package that needs to be moved
@@ -726,14 +954,17 @@ class ArchiveManager(object):
         if package_name is not None:
             package_path = self.get_validated_package_path(package_name)
             if package_path is not None:
-                package_file = filesystem.PackageFile(package_path)
-                status = package_file.move(self.archive_cache_location)
-                if status is not None:
+                try:
+                    self.archive_store.add(package_name, package_path, move=True)
+                    self.archive_cache.request_eviction()
                     return True
+                except OSError as msg:
+                    logger.error('Unable to move package [%s] to cache...%s', package_name, msg)
         return False
 
     def restore_package_from_cache(self, package_name):
-        """Restore package from cache back to drop-in location for installation
+        """Restore package from cache back to drop-in location for installation. The \
+                package is hard linked from the store (copied only if linking fails)
 
         Args:
             package_name (str): Name of the package that needs to be restored
@@ -741,13 +972,16 @@ class ArchiveManager(object):
         Returns:
             status (bool): Returns true or false
         """
+        if package_name is not None and self.get_validated_package_cache_path(package_name) is not None:
+            _target_path = os.path.join(self.archive_drop_location, _package_file_name(package_name))
+            try:
+                if self.archive_store.link_to(package_name, _target_path) is not None:
+                    self.archive_cache.record_hit(package_name)
+                    return True
+            except OSError as msg:
+                logger.error('Unable to restore package [%s] from cache...%s', package_name, msg)
         if package_name is not None:
-            package_path = self.get_validated_package_cache_path(package_name)
-            if package_path is not None:
-                package_file = filesystem.PackageFile(package_path)
-                package = package_file.move(self.archive_drop_location)
-                if package is not None:
-                    return None
+            self.archive_cache.record_miss(package_name)
         return False
 
     def get_validated_package_path(self, package_name):
@@ -760,19 +994,7 @@ class ArchiveManager(object):
         Returns:
             file_path (str): Absolute path to package file on file system
         """
-        for file_name in os.listdir(self.archive_drop_location):
-            package_name = validFileName('{0}.{1}'.format(package_name, constants.PACKAGE_FILE_EXTENSION))
-            if file_name.upper() == package_name.upper():
-                file_path = os.path.join(self.archive_drop_location, file_name)
-                if os.path.isfile(file_path):
-                    try:
-                        utils.validate_file(file_path)
-                        if zipfile.is_zipfile(file_path):
-                            return file_path
-                        else:
-                            return None
-                    except Exception as msg:
-                        return None
+        return self.archive_drop_index.find_valid_zip(_package_file_name(package_name))
 
     def get_validated_package_path_list(self):
         """Same as :meth:`get_validated_package_path` but returns a list of packages available in :attr:`package_drop_in_location`
@@ -780,20 +1002,7 @@ class ArchiveManager(object):
         None:
             file_paths (list): Returns a list of valid package paths from drop in location
         """
-        self.archive_file_list = []
-        for file_name in os.listdir(self.archive_drop_location):
-            file_path = os.path.join(self.archive_drop_location, file)
-            if os.path.isfile(file_path):
-                try:
-                    utils.validate_file(file_path)
-                    if zipfile.is_zipfile(file_path):
-                        self.archive_file_list.append(file_path)
-                    else:
-                        logger.debug('File is not zipped and is skipped...{0}'.format(file))
-                except Exception as msg:
-                    logger.warn('Invalid file and is skipped...{0}'.format(file))
-            else:
-                logger.debug('Not a file and is skipped...{0}'.format(file))
+        self.archive_file_list = self.archive_drop_index.list_valid_zips()
         return self.archive_file_list
 
 
@@ -801,8 +1010,7 @@ class ArchiveManager(object):
         """Checks whether package exists in package drop location or not
         """
         if package_name is not None:
-            package_name = '{0}.pkg'.format(validFileName(package_name))
-            package_file = os.path.join(self.archive_drop_location, package_name)
+            package_file = os.path.join(self.archive_drop_location, _package_file_name(package_name))
             if os.path.exists(package_file):
                 return True
         else:
@@ -823,15 +1031,13 @@ class ArchiveManager(object):
             return zipped_file
 
     def is_package_available_in_cache(self, package_name):
-        """Checks whether package exists in the archive cache or not
+        """Checks whether package exists in the archive cache or not. This is a probe \
+                and isn't counted as cache hit or miss, :meth:`get_package_from_cache` is
         """
         if package_name is not None:
-            package_name = '{0}.pkg'.format(validFileName(package_name))
-            package_file = os.path.join(self.archive_cache_location, package_name)
-            if os.path.exists(package_file):
+            if package_name in self.archive_store:
                 return True
-        else:
-            return False
+        return False
 
     def get_validated_package_cache_path(self, package_name):
         """Looks for a package file on local archive cache, check if it is a valid zip file
@@ -843,30 +1049,24 @@ class ArchiveManager(object):
         Returns:
             file_path (str): Absolute path to package file on file system or None
         """
-        for file_name in os.listdir(self.archive_cache_location):
-            package_name = validFileName('{0}.{1}'.format(package_name, constants.PACKAGE_FILE_EXTENSION), initCap=False)
-            if file_name.upper() == package_name.upper():
-                file_path = os.path.join(self.archive_cache_location, file_name)
-                if os.path.isfile(file_path):
-                    try:
-                        utils.validate_file(file_path)
-                        if zipfile.is_zipfile(file_path):
-                            return file_path
-                        else:
-                            return None
-                    except Exception as msg:
-                        return None
+        file_path = self.archive_store.get_path(package_name)
+        if file_path is not None:
+            if self.validity_cache.is_valid(file_path):
+                return file_path
+            logger.warn('Invalid package in archive cache...{0}'.format(package_name))
+        return None
 
     def get_package_from_cache(self, package_name):
-        """Find a package in local archive location and return back file object
+        """Find a package in local archive location and return back file object. The \
+                package is restored to the drop-in location first, so the returned \
+                file is named after the package and not after its digest
 
         Args:
             package_name (str): Package name that needs to be returned from cache
 
         Returns:
-            zipped_file (ZipFile): An instance of :class:`ZipFile` available in module :mod:`ui_builder.core.io.filesystem`
+            zipped_file (ZipFile): An instance of :class:`ZipFile` available in module :mod:`ui_builder.core.io.filesystem` \
+                    or None if not in cache
         """
-        if self.is_package_available_in_cache(package_name):
-            file_path = self.get_validated_package_cache_path(package_name)
-            zipped_file = filesystem.PackageFile(file_path)
-            return zipped_file
+        if self.restore_package_from_cache(package_name):
+            return self.get_package(package_name)
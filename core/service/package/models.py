@@ -8,10 +8,12 @@
 
 #imports ---------------------------------
 import abc
+import copy
 import os
 import logging
 import pathlib
-from tinydb import TinyDB, Query, where
+import threading
+import collections
 from ui_builder.core import utils, init_log, constants
 from ui_builder.core.service import iplugins
 from ui_builder.core.service.component import models
@@ -27,7 +29,24 @@ class PackageInfo(object):
             Package Managment System. A package consist of one or more components \
             grouped logically together. If there is an dependency between components \
             and other packages, same will be defined in this class
+
+    Note:
+        Attributes are kept in slots, :meth:`to_record` and :meth:`from_record` \
+                convert them to and from the `Details` of a database record
     """
+    __slots__ = ('package_id', '_location', '_config_file', 'name', 'description', 'type', \
+                 'author', 'url', 'company', 'version', '_is_enabled', '_is_installed', \
+                 '__comp_name_list', '__comp_name_id_map', '__components', \
+                 'package_dependencies', '__db_connection')
+    #keys used by records saved before :meth:`to_record` existed
+    _LEGACY_RECORD_KEYS = {
+        'package_id': 'id',
+        '_location': 'location',
+        '_is_enabled': 'is_enabled',
+        '_is_installed': 'is_installed',
+        '_PackageInfo__comp_name_list': 'components',
+        '_PackageInfo__comp_name_id_map': 'component_ids',
+    }
 
     def __init__(self, config_file_path=None):
         """:class:`PackageInfo` class have one required parameter
@@ -60,6 +79,18 @@ class PackageInfo(object):
         self.package_dependencies = {}
         self.__db_connection = None
 
+    @property
+    def id(self):
+        """The unique id of package
+        """
+        return self.package_id
+
+    @property
+    def components(self):
+        """Component name to instance mapping of the components in this package
+        """
+        return self.__components
+
     @property
     def config_file(self):
         """Location and name of config file which will be used during installation \
@@ -157,6 +188,72 @@ class PackageInfo(object):
             LOGGER.error(err)
             raise Exception(err)
 
+    def to_record(self):
+        """Returns the details of package which are saved in the database, \
+                components are saved in records of their own
+
+        Returns:
+            record (dict): Details of package
+        """
+        return {
+            'id': self.package_id,
+            'name': self.name,
+            'description': self.description,
+            'type': self.type,
+            'author': self.author,
+            'url': self.url,
+            'company': self.company,
+            'version': self.version,
+            'location': str(self._location) if self._location is not None else None,
+            'is_enabled': self._is_enabled,
+            'is_installed': self._is_installed,
+            'components': list(self.__comp_name_list) if self.__comp_name_list is not None else None,
+            'component_ids': {str(comp_id): comp_name for comp_id, comp_name \
+                              in self.__comp_name_id_map.items()},
+            'package_dependencies': self.package_dependencies,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        """Creates an instance from the details saved by :meth:`to_record`, \
+                components are not loaded
+
+        Args:
+            record (dict): Details of package
+
+        Returns:
+            package (PackageInfo): An instance of the class
+        """
+        _package = cls.__new__(cls)
+        _package.apply_record(record)
+        return _package
+
+    def apply_record(self, record):
+        """Sets the attributes from the details saved by :meth:`to_record`
+
+        Args:
+            record (dict): Details of package
+        """
+        record = {PackageInfo._LEGACY_RECORD_KEYS.get(key, key): value for key, value in record.items()}
+        self.package_id = record.get('id')
+        self.name = record.get('name')
+        self.description = record.get('description')
+        self.type = record.get('type')
+        self.author = record.get('author')
+        self.url = record.get('url')
+        self.company = record.get('company')
+        self.version = record.get('version')
+        self._location = pathlib.Path(record['location']) if record.get('location') is not None else None
+        self._config_file = None
+        self._is_enabled = record.get('is_enabled', True)
+        self._is_installed = record.get('is_installed', False)
+        #records may be shared with the table cache, mutable values are copied
+        self.__comp_name_list = list(record['components']) if record.get('components') is not None else None
+        self.__comp_name_id_map = dict(record.get('component_ids') or {})
+        self.__components = {}
+        self.package_dependencies = copy.deepcopy(record.get('package_dependencies') or {})
+        self.__db_connection = None
+
     def load_details(self, pkg_id, db_conn):
         """Load details of package from database after the package has been installed in the system
         Args:
@@ -167,12 +264,12 @@ class PackageInfo(object):
         self.package_id = pkg_id
         LOGGER.debug('Loading details for package...[%s] from db', pkg_id)
         if db_conn is not None:
-            pkg_table = db_conn.table('Package')
-            pkg = Query()
-            pkg_record = pkg_table.get(pkg['Details']['id'] == pkg_id)
+            pkg_table = db_conn.table('Packages')
+            pkg_record = pkg_table.find_one('Details.id', pkg_id)
             if pkg_record is not None:
-                self.__dict__ = pkg_record['Details']
-                for comp_id, comp_name in self.__comp_name_id_map:
+                self.apply_record(pkg_record['Details'])
+                self.__db_connection = db_conn
+                for comp_id, comp_name in self.__comp_name_id_map.items():
                     comp = models.ComponentInfo(comp_name, '')
                     comp.load_details(comp_id, db_conn)
                     self.__components[comp_name] = comp
@@ -228,6 +325,117 @@ class PackageInfo(object):
         else:
             return None
 
+class PackageInfoCache(object):
+    """Bounded LRU cache of fully loaded :class:`PackageInfo` instances, i.e., \
+            with their details and components loaded from the database. The least \
+            recently used package is dropped once the cache is full
+    """
+
+    def __init__(self, db_conn, max_size):
+        """Creates an empty cache
+
+        Args:
+            db_conn (object): An open connection to the metadata database
+            max_size (int): Maximum number of packages kept loaded, 0 disables the limit
+        """
+        self.__db_connection = db_conn
+        self.max_size = max_size
+        self.__packages = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __contains__(self, pkg_id):
+        with self.__lock:
+            return pkg_id in self.__packages
+
+    def __len__(self):
+        return len(self.__packages)
+
+    def get(self, pkg_id):
+        """Returns the loaded package, it is loaded from the database on a miss
+
+        Args:
+            pkg_id (uuid): A unique id assigned to package
+
+        Returns:
+            package (PackageInfo): Loaded instance of package
+        """
+        with self.__lock:
+            _package = self.__packages.get(pkg_id)
+            if _package is not None:
+                self.__packages.move_to_end(pkg_id)
+                return _package
+        _package = PackageInfo('')
+        _package.load_details(pkg_id, self.__db_connection)
+        with self.__lock:
+            self.__packages[pkg_id] = _package
+            self.__packages.move_to_end(pkg_id)
+            while self.max_size > 0 and len(self.__packages) > self.max_size:
+                _evicted_id, _ = self.__packages.popitem(last=False)
+                LOGGER.debug('Package [%s] dropped from the package cache', _evicted_id)
+        return _package
+
+    def discard(self, pkg_id):
+        """Drops the package, it is loaded again on next access
+        """
+        with self.__lock:
+            self.__packages.pop(pkg_id, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__packages.clear()
+
+
+class PackageHandle(object):
+    """Lightweight reference to an installed package, it holds only the id, name and \
+            version found in the package index. Any other attribute is read from \
+            the fully loaded :class:`PackageInfo` which is served by a \
+            :class:`PackageInfoCache`, so details and components are loaded from \
+            the database on first access only
+    """
+    __slots__ = ('package_id', 'name', '_version', '_package_cache')
+
+    def __init__(self, package_id, name, version, package_cache):
+        """Creates the handle without loading the package
+
+        Args:
+            package_id (uuid): A unique id assigned to package
+            name (str): Name of the package
+            version (str): Version of the package, loaded on access if None
+            package_cache (PackageInfoCache): Cache loading the package on demand
+        """
+        self.package_id = package_id
+        self.name = name
+        self._version = version
+        self._package_cache = package_cache
+
+    @property
+    def version(self):
+        if self._version is None:
+            return self.package.version
+        return self._version
+
+    @property
+    def is_loaded(self):
+        """True if the package is loaded in the package cache
+        """
+        return self.package_id in self._package_cache
+
+    @property
+    def package(self):
+        """Fully loaded instance of :class:`PackageInfo`
+        """
+        return self._package_cache.get(self.package_id)
+
+    def __getattr__(self, name):
+        #only called for attributes not defined by the handle
+        if name in PackageHandle.__slots__:
+            raise AttributeError(name)
+        return getattr(self.package, name)
+
+    def __repr__(self):
+        return '<PackageHandle name={0} id={1}>'.format(self.name, self.package_id)
+
+
 @six.add_metaclass(abc.ABCMeta)
 class PackageSource(iplugins.ISource):
     """Base class for package source"""
@@ -237,7 +445,9 @@ class PackageSource(iplugins.ISource):
 
     @abc.abstractmethod
     async def get_package_index(self):
-        """Downloads package index from configured source uri
+        """Downloads package index from configured source uri. Implementations \
+                may transfer only the changes since the last fetched revision \
+                and patch the cached index with them
         Returns:
             package_index (json): Package index dict
         """
@@ -245,11 +455,11 @@ class PackageSource(iplugins.ISource):
 
     @abc.abstractmethod
     async def get_validity_status(self):
-        """Returns the validity of package index such that if count of \
-                package index in source and :attr:`__index_list` matches, \
+        """Returns the validity of package index such that if revision of \
+                package index in source and the cached index matches, \
                 it returns True else False
         Returns:
-            validity_status (bool): Returns True if count match else False
+            validity_status (bool): Returns True if revision match else False
         """
         pass
 
@@ -50,7 +50,7 @@ class PackageCommands(object):
         self.register_command(PackageCommands.SHOW, 'Show details about the package passed as argument', self.show_package_command)
         self.register_command(PackageCommands.DOWNLOAD, 'Download package from the configured sources(or a source provided as option with --source) and make it ready for installation', self.download_package_command, '--source')
         self.register_command(PackageCommands.LIST, 'Show list of all packages in all configured sources. List will be displayed as grouped by source', self.list_packages_command)
-        self.register_command(PackageCommands.FIND, 'Search the specified package in all configured sources', self.find_package_command)
+        self.register_command(PackageCommands.FIND, 'Search the specified package in all configured sources. A name ending with "*" searches all packages starting with it', self.find_package_command)
 
     def register_command(self, name, desc, action, *args, **kwargs):
         """Register command with the :class:`CommandManager` and :class:`CommandParser`
@@ -123,7 +123,7 @@ class PackageCommands(object):
         #Case1: when --all option passed to the cmd
         if len(cmd.parsed_options) > 0:
             if cmd.parsed_options.__contains__('--all'):
-                self.package_manager.install_packages()
+                self.package_manager.install_all_packages()
                 return 'SUCCESS'
             else:
                 return cmd.parsed_cmd.error_invalid_options()
@@ -131,8 +131,7 @@ class PackageCommands(object):
             cmd.parsed_cmd.error_missing_options()
         #Case2: when no opt passed,only pkg-names passed
         if len(cmd.parsed_values) > 0:
-            for pkg in cmd.parsed_values:
-                self.package_manager.install_package(pkg)
+            self.package_manager.install_packages(cmd.parsed_values)
             return 'SUCCESS'
         else:
             return cmd.parsed_cmd.error_missing_arguments()
@@ -319,7 +318,10 @@ class PackageCommands(object):
             return cmd.help_message
         if len(cmd.parsed_values) > 0:
             for pkg in cmd.parsed_values:
-                result = self.package_manager.find_package(pkg)
+                if pkg.endswith('*'):
+                    result = self.package_manager.find_packages_by_prefix(pkg[:-1])
+                else:
+                    result = self.package_manager.find_package(pkg)
                 if result is not None:
                     return result
             return 'NOT_FOUND'
@@ -0,0 +1,239 @@
+"""
+.. module:: pipeline
+   :platform: Unix, Windows
+   :synopsis: Pipelined installation of multiple packages
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+
+#imports ---------------------------------
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ui_builder.core import init_log, constants
+from ui_builder.core.provider import tasks
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+
+class PackageInstallPipeline(object):
+    """Installs a list of packages through three overlapping stages:
+
+        * fetch - packages are taken from drop-in location or archive cache or \
+                downloaded from their source. Downloads run concurrently on the \
+                event loop of a pooled :class:`HybridThread` (see :class:`ThreadManager`)
+        * extract - packages are extracted in a pool of worker threads
+        * register - extracted packages are registered in the database in batches
+
+    Each stage has its own concurrency limit, so the time to install many packages \
+            is bound by the slowest stage instead of the sum of all steps
+    """
+
+    def __init__(self, package_manager, download_concurrency=None, extract_workers=None, \
+                 register_batch_size=None):
+        """Init the pipeline with the :class:`PackageManager` owning the stages
+
+        Args:
+            package_manager (PackageManager): Provides the archive manager, index \
+                    manager, downloader and installer used by the stages
+            download_concurrency (int): Max number of concurrent fetches/downloads
+            extract_workers (int): Number of worker threads extracting packages
+            register_batch_size (int): Max number of packages registered in one batch
+        """
+        self.package_manager = package_manager
+        self.download_concurrency = download_concurrency \
+                if download_concurrency is not None else constants.INSTALL_DOWNLOAD_CONCURRENCY
+        self.extract_workers = extract_workers \
+                if extract_workers is not None else constants.INSTALL_EXTRACT_WORKERS
+        self.register_batch_size = register_batch_size \
+                if register_batch_size is not None else constants.INSTALL_REGISTER_BATCH_SIZE
+        self.__percentage_completed_callback = None
+        self.__completed = 0
+        self.__total = 0
+        self.__is_progress_tracked = False
+        self.__is_index_refreshed = False
+        self.__index_refresh = None
+
+    def track_progress(self, total, percentage_completed_callback=None):
+        """Reports the progress across all following runs, e.g., the dependency waves \
+                of one plan, instead of per run
+
+        Args:
+            total (int): Number of packages of the whole plan
+            percentage_completed_callback (callable): Called with the percentage of \
+                    packages of the plan processed (optional)
+        """
+        self.__is_progress_tracked = True
+        self.__percentage_completed_callback = percentage_completed_callback
+        self.__completed = 0
+        self.__total = total
+
+    def skip(self, package_name):
+        """Counts a package of the plan which won't be installed, e.g., because its \
+                dependencies failed, as processed
+        """
+        logger.debug('Package [%s] skipped', package_name)
+        self.__report_progress()
+
+    def run(self, package_list, percentage_completed_callback=None):
+        """Installs all packages in the list and blocks until the pipeline is drained. \
+                Must not be called from the thread running the pipeline (see \
+                :class:`ThreadManager`), it would wait for itself
+
+        Args:
+            package_list (list): Name of packages to be installed
+            percentage_completed_callback (callable): Called with the percentage of \
+                    packages processed, ignored if progress is reported by \
+                    :meth:`track_progress` (optional)
+
+        Returns:
+            results (dict): Package name to install status, same as \
+                    :meth:`PackageManager.install_package` returns for a single package
+        """
+        if len(package_list) <= 0:
+            return {}
+        _thread = tasks.ThreadManager().get_thread('PackageInstallPipelineThread')
+        if threading.current_thread() is _thread:
+            raise RuntimeError('Package install pipeline can\'t be run from its own thread...{0}'\
+                               .format(_thread.name))
+        if not self.__is_progress_tracked:
+            self.__percentage_completed_callback = percentage_completed_callback
+            self.__completed = 0
+            self.__total = len(package_list)
+        self.__index_refresh = None
+        return _thread.submit_coroutine(self.__run, (list(package_list),)).result()
+
+    def __package_done(self, results, package_name, status):
+        """Stores the final status of a package and reports the progress
+        """
+        results[package_name] = status
+        self.__report_progress()
+
+    def __report_progress(self):
+        """Counts one more package as processed and reports the progress
+        """
+        self.__completed += 1
+        if self.__percentage_completed_callback is not None and self.__total > 0:
+            self.__percentage_completed_callback((self.__completed/self.__total)*100)
+
+    async def __run(self, package_list):
+        """Coroutine wiring the three stages together
+        """
+        _loop = asyncio.get_event_loop()
+        _results = {}
+        _download_semaphore = asyncio.Semaphore(self.download_concurrency)
+        _register_queue = asyncio.Queue()
+        _extract_executor = ThreadPoolExecutor(max_workers=self.extract_workers)
+        #single worker keeps database writes serialized and off the event loop
+        _register_executor = ThreadPoolExecutor(max_workers=1)
+
+        async def _process(package_name):
+            try:
+                async with _download_semaphore:
+                    _package_file = await self.__fetch(package_name)
+                if _package_file is None:
+                    self.__package_done(_results, package_name, \
+                                        (False, 'Package not found...{0}'.format(package_name)))
+                    return
+                _package_info = await _loop.run_in_executor(_extract_executor, \
+                        self.package_manager.installer.extract_package, \
+                        package_name, _package_file)
+                if _package_info is None:
+                    self.__package_done(_results, package_name, False)
+                    return
+                await _register_queue.put((package_name, _package_info))
+            except Exception as msg:
+                logger.error('Unable to install package [%s]...%s', package_name, msg)
+                self.__package_done(_results, package_name, (False, str(msg)))
+
+        async def _register():
+            _done = False
+            while not _done:
+                _batch = {}
+                _item = await _register_queue.get()
+                while _item is not None:
+                    _batch[_item[0]] = _item[1]
+                    if len(_batch) >= self.register_batch_size or _register_queue.empty():
+                        break
+                    _item = _register_queue.get_nowait()
+                _done = _item is None
+                if len(_batch) > 0:
+                    _statuses = await _loop.run_in_executor(_register_executor, \
+                                                            self.__register, _batch)
+                    for package_name, status in _statuses.items():
+                        self.__package_done(_results, package_name, status)
+
+        _registrar = _loop.create_task(_register())
+        try:
+            await asyncio.gather(*[_process(package_name) for package_name in package_list])
+            await _register_queue.put(None)
+            await _registrar
+        finally:
+            _extract_executor.shutdown(wait=False)
+            _register_executor.shutdown(wait=False)
+        return {package_name: _results[package_name] for package_name in package_list}
+
+    def refresh_index(self):
+        """Refreshes the package index, once per pipeline, i.e., for the whole batch \
+                of packages installed through it
+        """
+        if not self.__is_index_refreshed:
+            self.__is_index_refreshed = True
+            self.package_manager.package_index_manager.refresh_index()
+
+    async def __refresh_index(self):
+        """Same as :meth:`refresh_index`, all packages missing in the index wait for \
+                the same refresh. The refresh blocks, so it runs in a worker thread
+        """
+        if self.__index_refresh is None:
+            self.__index_refresh = asyncio.get_event_loop().run_in_executor(None, self.refresh_index)
+        await asyncio.shield(self.__index_refresh)
+
+    async def __fetch(self, package_name):
+        """Gets the package file from drop-in location, archive cache or downloads it
+            from the source found in the package index. The index is refreshed (once \
+            per batch) if the package is missing in it, same as \
+            :meth:`PackageManager.install_package` does
+
+        Args:
+            package_name (str): Name of the package
+
+        Returns:
+            package_file (PackageFile): Package file or None if not found anywhere
+        """
+        _archive_manager = self.package_manager.archive_manager
+        if _archive_manager.is_package_available(package_name):
+            return _archive_manager.get_package(package_name)
+        _package_file = _archive_manager.get_package_from_cache(package_name)
+        if _package_file is not None:
+            return _package_file
+        _package_source = self.package_manager.package_index_manager.find_package(package_name)
+        if not _package_source[0]:
+            await self.__refresh_index()
+            _package_source = self.package_manager.package_index_manager.find_package(package_name)
+        if _package_source[0]:
+            _entry = _package_source[2]
+            _checksum = _entry.get('sha256') if isinstance(_entry, dict) else None
+            await self.package_manager.downloader\
+                    .download(_package_source[1], package_name, _checksum)
+            if _archive_manager.is_package_available(package_name):
+                return _archive_manager.get_package(package_name)
+        return None
+
+    def __register(self, packages):
+        """Registers a batch of packages and updates the archive cache and package maps
+        """
+        _statuses = {}
+        try:
+            _statuses = self.package_manager.installer.register_packages(packages)
+        except Exception as msg:
+            logger.error('Unable to register batch of packages %s...%s', list(packages), msg)
+            return {package_name: (False, str(msg)) for package_name in packages}
+        for package_name, status in _statuses.items():
+            if status == True:
+                self.package_manager.archive_manager.move_package_to_cache(package_name)
+                self.package_manager.load_package(package_name)
+        return _statuses
@@ -0,0 +1,196 @@
+"""
+.. module:: resolver
+   :platform: Unix, Windows
+   :synopsis: Dependency resolution of packages
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+
+#imports ---------------------------------
+import logging
+from ui_builder.core import init_log
+
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+
+def get_entry_dependencies(index_entry):
+    """Returns the names of packages an index entry depends on. An index entry is \
+            either a plain version string (no dependencies) or a dict having the \
+            keys `version` and `dependencies`. Dependencies can be provided as a \
+            list of names or as a name to version mapping, same as the \
+            `PackageDependencies` section of a package config
+
+    Args:
+        index_entry (object): Entry of a package in the source index
+
+    Returns:
+        dependencies (list): Names of the packages the entry depends on
+    """
+    if isinstance(index_entry, dict):
+        _dependencies = index_entry.get('dependencies')
+        if _dependencies is None:
+            return []
+        if isinstance(_dependencies, dict):
+            return list(_dependencies.keys())
+        return [_dependency if isinstance(_dependency, str) else _dependency[0] \
+                for _dependency in _dependencies]
+    return []
+
+
+class DependencyResolver(object):
+    """Builds the dependency graph (DAG) of packages from the metadata in package \
+            index and orders the packages in installation "waves". All packages \
+            of a wave only depend on packages of earlier waves (or on packages \
+            already installed) and can be installed in parallel.
+
+    Note:
+        Resolutions are cached and the cache is keyed on the revision of the \
+                package index, so the graph is walked again only after the \
+                index has changed
+    """
+
+    def __init__(self, package_index_manager):
+        """Init the resolver with the index manager providing package metadata
+
+        Args:
+            package_index_manager (PackageIndexManager): Index used to look up the \
+                    dependencies of the packages
+        """
+        self.package_index_manager = package_index_manager
+        self.__cache = {}
+        self.__cache_revision = None
+
+    def dependencies_of(self, package_name):
+        """Returns the names of packages which the package depends on as per index
+
+        Args:
+            package_name (str): Name of the package
+
+        Returns:
+            dependencies (list): Package names or None if package is not in index
+        """
+        _result = self.package_index_manager.find_package(package_name)
+        if not _result[0]:
+            return None
+        return get_entry_dependencies(_result[2])
+
+    def resolve(self, package_list):
+        """Resolves the dependency graph of all packages in the list
+
+        Args:
+            package_list (list): Name of packages to be installed
+
+        Returns:
+            result (tuple of 3 elements): Returns an tuple having below mentioned 3 elements
+                - waves (list): List of package name lists in installation order
+                - graph (dict): Package name to list of its dependencies, for all \
+                        packages reachable from package_list
+                - unresolved (dict): Package name to reason for packages which are \
+                        either missing in the index or part of a dependency cycle
+        """
+        _revision = self.package_index_manager.index_revision
+        if _revision != self.__cache_revision:
+            self.__cache.clear()
+            self.__cache_revision = _revision
+        _key = frozenset(package_list)
+        if _key not in self.__cache:
+            self.__cache[_key] = self.__resolve(package_list)
+        else:
+            logger.debug('Dependency resolution served from cache for %s', package_list)
+        return self.__cache[_key]
+
+    def __resolve(self, package_list):
+        """Walks the graph and builds the waves using Kahn's algorithm
+        """
+        _graph = {}
+        _unresolved = {}
+        _pending = list(package_list)
+        while len(_pending) > 0:
+            _name = _pending.pop()
+            if _name in _graph or _name in _unresolved:
+                continue
+            _dependencies = self.dependencies_of(_name)
+            if _dependencies is None:
+                _unresolved[_name] = 'Package not found in index...{0}'.format(_name)
+                continue
+            _graph[_name] = _dependencies
+            _pending.extend(_dependencies)
+        #missing packages are kept as dependencies, they might already be installed
+        _in_degree = {_name: 0 for _name in _graph}
+        _dependents = {_name: [] for _name in _graph}
+        for _name, _dependencies in _graph.items():
+            for _dependency in _dependencies:
+                if _dependency in _graph:
+                    _in_degree[_name] += 1
+                    _dependents[_dependency].append(_name)
+        _waves = []
+        _wave = sorted(_name for _name, _degree in _in_degree.items() if _degree == 0)
+        while len(_wave) > 0:
+            _waves.append(_wave)
+            _next_wave = []
+            for _name in _wave:
+                for _dependent in _dependents[_name]:
+                    _in_degree[_dependent] -= 1
+                    if _in_degree[_dependent] == 0:
+                        _next_wave.append(_dependent)
+            _wave = sorted(_next_wave)
+        for _name, _degree in _in_degree.items():
+            if _degree > 0:
+                _unresolved[_name] = 'Cyclic dependency detected for package or its dependencies...{0}'.format(_name)
+        if len(_unresolved) > 0:
+            logger.warning('Unable to resolve dependencies of packages...%s', list(_unresolved))
+        return (_waves, _graph, _unresolved)
+
+    def plan(self, package_list, installed_packages=(), is_available_locally=None):
+        """Same as :meth:`resolve` but skips the packages which are already installed. \
+                A package missing in the index is acceptable as long as it is \
+                installed or available locally (drop-in location or archive cache), \
+                such packages are placed in a wave ahead of all others
+
+        Args:
+            package_list (list): Name of packages to be installed
+            installed_packages (iterable): Names of packages already installed
+            is_available_locally (callable): Called with a package name, returns True \
+                    if the package file is available without the index (optional)
+
+        Returns:
+            result (tuple of 3 elements): Returns an tuple having below mentioned 3 elements
+                - waves (list): List of package name lists in installation order
+                - graph (dict): Package name to list of its dependencies, for all \
+                        planned packages. Packages installed from local files have none
+                - failed (dict): Package name to failure reason for packages which \
+                        can't be installed
+        """
+        _installed = set(installed_packages)
+        _waves, _graph, _unresolved = self.resolve(package_list)
+        #copy of the cached graph, local packages are added without dependencies
+        _graph = dict(_graph)
+        _local_wave = []
+        _failed = {}
+        for _name, _reason in _unresolved.items():
+            if _name in _installed:
+                continue
+            if _name not in _graph and is_available_locally is not None \
+                    and is_available_locally(_name):
+                _local_wave.append(_name)
+                _graph[_name] = []
+            else:
+                _failed[_name] = _reason
+        _planned_waves = [sorted(_local_wave)] if len(_local_wave) > 0 else []
+        for _wave in _waves:
+            _planned_wave = []
+            for _name in _wave:
+                if _name in _installed:
+                    continue
+                _broken = [_dependency for _dependency in _graph[_name] \
+                           if _dependency in _failed]
+                if len(_broken) > 0:
+                    _failed[_name] = 'Unable to install dependencies {0} of package...{1}'\
+                            .format(_broken, _name)
+                else:
+                    _planned_wave.append(_name)
+            if len(_planned_wave) > 0:
+                _planned_waves.append(_planned_wave)
+        return (_planned_waves, _graph, _failed)
@@ -9,7 +9,6 @@
 #imports ---------------------------------
 import logging
 from typing import Dict, Any
-from tinydb import Query
 from ui_builder.core import init_log
 from ui_builder.core.service import sessions
 from ui_builder.core.service.package import models
@@ -18,6 +17,9 @@ from ui_builder.core.service.package import models
 init_log.config_logs()
 LOGGER = logging.getLogger(__name__)
 
+INDEX_REVISION_HEADER = 'X-Index-Revision'
+INDEX_DELTA_HEADER = 'X-Index-Delta'
+
 class DefaultPackageSource(models.PackageSource):
     """Represents an package source in package management system
     """
@@ -26,45 +28,120 @@ class DefaultPackageSource(models.PackageSource):
         """DefaultPackageSource constructor
         """
         super(DefaultPackageSource, self).__init__()
+        self.__db_connection = None
         self.__index_table = None
         self.__index_list = None
+        self.__index_revision = 0
+        self.__index_etag = None
 
     def prepare(self, name: str, db_connection: Any) -> None:
         super(DefaultPackageSource, self).prepare(name, db_connection)
+        self.__db_connection = db_connection
         self.__index_table = self.__db_connection.table('PackageIndex')
         self.__index_list = {}
         if self.__index_table is not None:
-            self.__index_list = self.\
-                    __index_table.get(Query()['Name'] == name)
+            _index_record = self.__index_table.find_one('Name', name)
+            if _index_record is not None:
+                #the record is shared with the table cache, the index is patched in place
+                self.__index_list = dict(_index_record.get('Index', {}))
+                self.__index_revision = _index_record.get('Revision', 0)
+                self.__index_etag = _index_record.get('ETag')
+
+    @property
+    def index_revision(self):
+        """Revision of the source index which the cached index is in sync with
+        """
+        return self.__index_revision
 
-    async def get_package_index(self) -> Dict[str]:
-        """Downloads package index from configured source uri
+    async def get_package_index(self) -> Dict[str, Any]:
+        """Fetches the changes in package index since the last known revision \
+                from configured source uri and patches the cached index with them.
+            A full index is only transferred on first fetch or when the source \
+                can't answer with a delta anymore, the source serves it pre-compressed. \
+                The ETag of the cached index is sent along, so an unchanged index \
+                costs a single 304 response
         Returns:
             package_index (json): Package index dict
         """
-        async with sessions.Web()\
-                .SESSION.get(self.__details['Uri'], \
-                             params={'action': 'index'}) \
+        _headers = {}
+        if self.__index_etag is not None:
+            _headers['If-None-Match'] = self.__index_etag
+        _params = {'action': 'index'}
+        #without a revision there is nothing to patch, ask for the full index
+        if self.__index_revision > 0:
+            _params['since'] = self.__index_revision
+        async with sessions.WebSessionPool()\
+                .get_session().get(self.details['Uri'], params=_params, headers=_headers) \
                 as _response:
-            self.__index_list = await _response.json()
-            return self.__index_list
+            if _response.status == 304:
+                _revision = _response.headers.get(INDEX_REVISION_HEADER)
+                if _revision is not None and int(_revision) != self.__index_revision:
+                    self.__apply_index_delta({'revision': int(_revision), 'full': False, \
+                                              'added': {}, 'changed': {}, 'removed': []}, \
+                                             self.__index_etag)
+                LOGGER.debug('Index of source [%s] not modified', self.name)
+                return self.__index_list
+            _delta = await _response.json()
+            _etag = _response.headers.get('ETag')
+            if _response.headers.get(INDEX_DELTA_HEADER) is None:
+                #full index as plain name -> version mapping
+                _delta = {'revision': int(_response.headers.get(INDEX_REVISION_HEADER, 0)), \
+                          'full': True, 'packages': _delta}
+        self.__apply_index_delta(_delta, _etag)
+        return self.__index_list
+
+    def __apply_index_delta(self, delta, etag=None):
+        """Patches the cached index in memory and in the `PackageIndex` table
+        Args:
+            delta (dict): Delta as returned by the source having keys `revision`, \
+                    `full` and either `packages` or `added`, `changed` & `removed`
+            etag (str): ETag of the source index after applying the delta
+        """
+        if delta['full']:
+            self.__index_list = delta['packages']
+        else:
+            self.__index_list.update(delta['added'])
+            self.__index_list.update(delta['changed'])
+            for package_name in delta['removed']:
+                self.__index_list.pop(package_name, None)
+        self.__index_revision = delta['revision']
+        self.__index_etag = etag
+        if self.__index_table is not None:
+            def _patch(record):
+                if delta['full']:
+                    record['Index'] = delta['packages']
+                else:
+                    record['Index'].update(delta['added'])
+                    record['Index'].update(delta['changed'])
+                    for package_name in delta['removed']:
+                        record['Index'].pop(package_name, None)
+                record['Revision'] = delta['revision']
+                record['ETag'] = etag
+            if self.__index_table.contains('Name', self.name):
+                self.__index_table.update(_patch, 'Name', self.name)
+            else:
+                self.__index_table.insert({'Name': self.name, \
+                                           'Revision': self.__index_revision, \
+                                           'ETag': self.__index_etag, \
+                                           'Index': dict(self.__index_list)})
+        LOGGER.debug('Index of source [%s] patched to revision %s', \
+                     self.name, self.__index_revision)
 
     async def get_validity_status(self):
         """Returns the validity of package index such that \
-                if count of package index in source and \
-                :attr:`__index_list` matches, it returns \
+                if revision of index in source and \
+                :attr:`index_revision` matches, it returns \
                 True else False
         Returns:
-            validity_status (bool): Returns True if count \
+            validity_status (bool): Returns True if revision \
                     match else False
         """
-        async with sessions.Web().SESSION\
-                .get(self.__details['Uri'], \
-                     params={'action':'count', \
-                               'local_index':\
-                               len(self.__index_list)}) \
+        async with sessions.WebSessionPool().get_session()\
+                .get(self.details['Uri'], \
+                     params={'action':'revision'}) \
                 as _response:
-            return await _response.json()
+            _result = await _response.json()
+            return _result['revision'] == self.__index_revision
 
     def get_cached_package_index(self):
         """Returns the current package index which was \
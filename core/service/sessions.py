@@ -1,33 +1,110 @@
 """
-.. module:: package
+.. module:: sessions
    :platform: Unix, Windows
-   :synopsis: Package management functionality
+   :synopsis: Shared, connection pooled web sessions
 
 .. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
 """
+import asyncio
+import logging
+import threading
 import aiohttp
+from ui_builder.core import init_log, constants
+from ui_builder.core.provider import tasks
 
-class Web(object):
-    """Provides session for accessing web resources
+#init logs ----------------------------
+init_log.config_logs()
+logger = logging.getLogger(__name__)
+
+
+class WebSessionPool(object):
+    """Provides shared web sessions for accessing web resources. An \
+            :class:`aiohttp.ClientSession` is bound to the event loop it was \
+            created in, so the pool keeps one session per event loop (i.e., \
+            per :class:`HybridThread`). Every coroutine running on the same \
+            loop reuses the connections of the same session instead of paying \
+            a TCP/TLS handshake per request.
+
+    Connector limits, keep-alive, DNS cache and timeouts are read from the \
+            section `WebSession` of configuration
+
+    Note:
+        This is an singleton class and will be shared between objects
     """
 
-    __single_web_session = None
+    __single_web_session_pool = None
+    _sessions = None
 
     def __new__(cls, *args, **kwargs):
         """Class instance creator
         """
-        if cls != type(cls.__single_web_session):
-            cls.__single_web_session = object.__new__(cls, *args, **kwargs)
-        return cls.__single_web_session
+        if cls != type(cls.__single_web_session_pool):
+            cls.__single_web_session_pool = object.__new__(cls, *args, **kwargs)
+        return cls.__single_web_session_pool
 
     def __init__(self):
-        """Web session instance creator
+        """Web session pool creator
+        """
+        if self._sessions is None:
+            self._sessions = {}
+            self._lock = threading.Lock()
+
+    def __create_session(self):
+        """Creates a new session with a tuned connector for the running loop
+        """
+        _connector = aiohttp.TCPConnector(limit=constants.WEB_CONNECTION_LIMIT, \
+                                          limit_per_host=constants.WEB_CONNECTION_LIMIT_PER_HOST, \
+                                          keepalive_timeout=constants.WEB_KEEPALIVE_TIMEOUT, \
+                                          use_dns_cache=True, \
+                                          ttl_dns_cache=constants.WEB_DNS_CACHE_TTL)
+        _timeout = aiohttp.ClientTimeout(total=constants.WEB_TOTAL_TIMEOUT or None, \
+                                         connect=constants.WEB_CONNECT_TIMEOUT, \
+                                         sock_read=constants.WEB_READ_TIMEOUT)
+        return aiohttp.ClientSession(connector=_connector, timeout=_timeout)
+
+    def get_session(self):
+        """Returns the session of the running event loop, creating it on first use. \
+                When the loop belongs to an :class:`HybridThread`, the session is \
+                closed by the thread before its loop stops
+
+        Note:
+            Must be called from a coroutine (or callback) running on the loop
+
+        Returns:
+            session (ClientSession): Shared session of the running loop
+        """
+        _loop = asyncio.get_event_loop()
+        with self._lock:
+            _session = self._sessions.get(_loop)
+            if _session is None or _session.closed:
+                _session = self._sessions[_loop] = self.__create_session()
+                _thread = threading.current_thread()
+                if isinstance(_thread, tasks.HybridThread):
+                    _thread.add_shutdown_hook(self.close)
+                logger.debug('New web session created for loop %s', _loop)
+        return _session
+
+    async def close(self):
+        """Closes the session of the running event loop, if any
         """
-        if self._SESSION is None:
-            self._SESSION = aiohttp.ClientSession()
+        _loop = asyncio.get_event_loop()
+        with self._lock:
+            _session = self._sessions.pop(_loop, None)
+        if _session is not None and not _session.closed:
+            await _session.close()
+            logger.debug('Web session closed for loop %s', _loop)
 
-    @property
-    def SESSION(self):
-        """A single instance web session property
+    def close_all(self):
+        """Closes the sessions of all loops. Sessions of running loops are closed \
+                on their own loop, sessions of stopped loops are closed directly
         """
-        return self._SESSION
+        with self._lock:
+            _sessions = list(self._sessions.items())
+            self._sessions.clear()
+        for _loop, _session in _sessions:
+            if _session.closed:
+                continue
+            if _loop.is_running():
+                asyncio.run_coroutine_threadsafe(_session.close(), _loop)
+            elif not _loop.is_closed():
+                _loop.run_until_complete(_session.close())
@@ -0,0 +1,84 @@
+"""
+.. module:: bench_extract
+   :platform: Unix, Windows
+   :synopsis: Benchmark of sequential vs parallel package extraction
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+
+Builds a scaled up copy of `MyTestPackage.zip` (its members repeated in many \
+        component folders plus a few larger binary assets) and extracts it with \
+        :meth:`PackageFile.extract_to` sequentially and with a thread pool::
+
+    python -m ui_builder.core.tests.bench_extract --copies 500 --workers 4
+"""
+import os
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+from ui_builder.core.io import filesystem
+
+FIXTURE_PACKAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MyTestPackage.zip')
+
+
+def build_package(target_dir, copies, assets, asset_size):
+    """Creates the scaled up package and returns its path
+    """
+    package_path = os.path.join(target_dir, 'BenchPackage.pkg')
+    with zipfile.ZipFile(FIXTURE_PACKAGE) as source, \
+            zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as target:
+        members = [(member, source.read(member)) for member in source.infolist() \
+                   if not member.is_dir()]
+        for copy in range(copies):
+            for member, data in members:
+                target.writestr('BenchPackage/copy{0}/{1}'.format(copy, member.filename), data)
+        for asset in range(assets):
+            #half random, half repetitive so deflate has real work to do
+            data = os.urandom(asset_size // 2) + bytes(asset_size // 2)
+            target.writestr('BenchPackage/assets/image{0}.bin'.format(asset), data)
+    return package_path
+
+
+def time_extraction(package_path, target_dir, workers, repeat):
+    """Returns the best time out of repeat extractions
+    """
+    timings = []
+    for _ in range(repeat):
+        shutil.rmtree(target_dir, ignore_errors=True)
+        os.makedirs(target_dir)
+        package_file = filesystem.PackageFile(package_path)
+        started = time.perf_counter()
+        package_file.extract_to(target_dir, workers=workers)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of sequential vs parallel package extraction')
+    parser.add_argument('--copies', type=int, default=300, help='copies of the fixture members')
+    parser.add_argument('--assets', type=int, default=16, help='number of large binary assets')
+    parser.add_argument('--asset-size', type=int, default=4 * 1024 * 1024, help='bytes per asset')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='parallel workers')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per mode, best is reported')
+    args = parser.parse_args()
+    work_dir = tempfile.mkdtemp(prefix='bench_extract_')
+    try:
+        package_path = build_package(work_dir, args.copies, args.assets, args.asset_size)
+        with zipfile.ZipFile(package_path) as package:
+            members = package.infolist()
+        print('Package: {0} members, {1:.1f} MB compressed, {2:.1f} MB uncompressed'.format(\
+                len(members), os.path.getsize(package_path) / 1e6, \
+                sum(member.file_size for member in members) / 1e6))
+        target_dir = os.path.join(work_dir, 'out')
+        sequential = time_extraction(package_path, target_dir, 1, args.repeat)
+        print('sequential (extractall): {0:.3f}s'.format(sequential))
+        parallel = time_extraction(package_path, target_dir, args.workers, args.repeat)
+        print('parallel ({0} workers):  {1:.3f}s  speed-up {2:.2f}x'.format(\
+                args.workers, parallel, sequential / parallel))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
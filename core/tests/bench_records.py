@@ -0,0 +1,83 @@
+"""
+.. module:: bench_records
+   :platform: Unix, Windows
+   :synopsis: Memory benchmark of dict based vs slotted field and component records
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+
+Creates many :class:`CharField` and :class:`ComponentInfo` instances, and the same \
+        number of dict based equivalents (eager field key, attributes in \
+        `__dict__`), and reports the memory allocated for each::
+
+    python -m ui_builder.core.tests.bench_records --fields 200000 --components 20000
+"""
+import gc
+import uuid
+import argparse
+import tracemalloc
+from ui_builder.core import fields
+from ui_builder.core.service.component.models import ComponentInfo
+
+
+class LegacyField(object):
+    """Field as it was before slots, key generated in the constructor
+    """
+
+    def __init__(self, name, max_length=100, required=True, default=''):
+        self._key = uuid.uuid4()
+        self._field_name = name
+        self._field_value = default
+        self._security_key = ''
+        self.field_type = 'str'
+        self._required = required
+        self._max_length = max_length
+
+
+class LegacyComponent(object):
+    """Component as it was before slots, details assigned to `__dict__`
+    """
+
+    def __init__(self, record):
+        self.__dict__ = record
+
+
+def measure(factory, count):
+    """Returns the bytes allocated by count objects created by factory
+    """
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(index) for index in range(count)]
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return allocated
+
+
+def component_record(index):
+    component = ComponentInfo('Component{0}'.format(index), '/packages/Bench/Component{0}'.format(index))
+    component.component_id = str(uuid.uuid4())
+    return component.to_record()
+
+
+def report(title, legacy, slotted, count):
+    print('{0}: dict {1:.1f} MB ({2:.0f} B each), slots {3:.1f} MB ({4:.0f} B each), saved {5:.0%}'\
+          .format(title, legacy / 1e6, legacy / count, slotted / 1e6, slotted / count, \
+                  1 - slotted / legacy))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory benchmark of dict based vs slotted records')
+    parser.add_argument('--fields', type=int, default=200000, help='number of field instances')
+    parser.add_argument('--components', type=int, default=20000, help='number of component records')
+    args = parser.parse_args()
+    legacy = measure(lambda index: LegacyField('field{0}'.format(index)), args.fields)
+    slotted = measure(lambda index: fields.CharField('field{0}'.format(index)), args.fields)
+    report('CharField', legacy, slotted, args.fields)
+    records = [component_record(index) for index in range(args.components)]
+    legacy = measure(lambda index: LegacyComponent(dict(records[index])), args.components)
+    slotted = measure(lambda index: ComponentInfo.from_record(records[index]), args.components)
+    report('ComponentInfo', legacy, slotted, args.components)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+.. module:: test_resolver
+   :platform: Unix, Windows
+   :synopsis: Tests of the package dependency resolver
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+from ui_builder.core.service.package.resolver import DependencyResolver
+
+
+class FakeIndexManager(object):
+    """Package index having a fixed set of entries
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.index_revision = 1
+
+    def find_package(self, package_name):
+        if package_name in self.entries:
+            return (True, 'FakeSource', self.entries[package_name])
+        return (False, None, None)
+
+
+def test_plan_adds_drop_in_only_package_to_graph():
+    resolver = DependencyResolver(FakeIndexManager({}))
+    waves, graph, failed = resolver.plan(['DropIn'], (), lambda name: name == 'DropIn')
+    assert waves == [['DropIn']]
+    assert graph['DropIn'] == []
+    assert failed == {}
+    #every planned package can be looked up like install_packages does
+    assert all(package_name in graph for wave in waves for package_name in wave)
+
+
+def test_plan_installs_dependents_of_drop_in_package_after_it():
+    resolver = DependencyResolver(FakeIndexManager({'App': {'version': '1.0', 'dependencies': ['DropIn']}}))
+    waves, graph, failed = resolver.plan(['App'], (), lambda name: name == 'DropIn')
+    assert waves == [['DropIn'], ['App']]
+    assert graph == {'App': ['DropIn'], 'DropIn': []}
+    assert failed == {}
+
+
+def test_plan_does_not_change_cached_resolution():
+    resolver = DependencyResolver(FakeIndexManager({}))
+    resolver.plan(['DropIn'], (), lambda name: True)
+    waves, graph, failed = resolver.plan(['DropIn'], (), lambda name: False)
+    assert waves == []
+    assert 'DropIn' not in graph
+    assert 'DropIn' in failed
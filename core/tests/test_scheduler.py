@@ -0,0 +1,72 @@
+"""
+.. module:: test_scheduler
+   :platform: Unix, Windows
+   :synopsis: Tests of the coroutine scheduler of HybridThread
+
+.. moduleauthor:: Ajeet Singh <singajeet@gmail.com>
+"""
+import time
+import asyncio
+from ui_builder.core.provider.tasks import CoroutineScheduler
+
+
+def run_all(scheduler, jobs):
+    """Runs the (key, duration) jobs in slots of the scheduler, returns (key, start time) \
+            of each job in start order
+    """
+    _started = []
+
+    async def _job(key, duration, start):
+        async with scheduler.slot(key=key):
+            _started.append((key, round(time.monotonic() - start, 1)))
+            await asyncio.sleep(duration)
+
+    async def _main():
+        start = time.monotonic()
+        await asyncio.gather(*[_job(key, duration, start) for key, duration in jobs])
+
+    asyncio.run(_main())
+    return _started
+
+
+def test_idle_key_not_blocked_by_busy_key():
+    scheduler = CoroutineScheduler(max_concurrency=4, max_per_key=1)
+    started = run_all(scheduler, [('x', 0.5), ('x', 0.5), ('y', 0.1)])
+    assert started == [('x', 0.0), ('y', 0.0), ('x', 0.5)]
+
+
+def test_max_concurrency_is_kept():
+    scheduler = CoroutineScheduler(max_concurrency=2)
+    started = run_all(scheduler, [('x', 0.3), ('y', 0.3), ('z', 0.3)])
+    assert [start for _, start in started] == [0.0, 0.0, 0.3]
+    assert scheduler.running == 0 and scheduler.waiting == 0
+
+
+def test_waiting_keys_are_served_round_robin():
+    scheduler = CoroutineScheduler(max_concurrency=1)
+    started = run_all(scheduler, [('x', 0.1), ('x', 0.1), ('x', 0.1), ('y', 0.1)])
+    assert [key for key, _ in started] == ['x', 'x', 'y', 'x']
+
+
+def test_cancelled_waiter_does_not_block_next_waiter():
+    scheduler = CoroutineScheduler(max_concurrency=1)
+    _started = []
+
+    async def _job(name):
+        async with scheduler.slot(key='x'):
+            _started.append(name)
+            await asyncio.sleep(0.1)
+
+    async def _main():
+        await scheduler.acquire(key='a')
+        b = asyncio.ensure_future(_job('b'))
+        c = asyncio.ensure_future(_job('c'))
+        await asyncio.sleep(0)
+        b.cancel()
+        scheduler.release('a')
+        await asyncio.wait_for(c, 1.0)
+        assert b.cancelled()
+
+    asyncio.run(_main())
+    assert _started == ['c']
+    assert scheduler.running == 0 and scheduler.waiting == 0
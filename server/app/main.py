@@ -4,6 +4,7 @@ import aiohttp_jinja2
 import jinja2
 from aiohttp import web
 
+from .package_index import PackageIndexStore
 from .settings import Settings
 from .views import index, message_data, messages, package_handler
 
@@ -11,6 +12,14 @@ from .views import index, message_data, messages, package_handler
 THIS_DIR = Path(__file__).parent
 BASE_DIR = THIS_DIR.parent
 
+# index entries are either a plain version or a dict with "version" and "dependencies"
+DEMO_PACKAGES = {
+    'package1': '1.0.0',
+    'package2': '1.5.0',
+    'package3': {'version': '2.0.0', 'dependencies': ['package1']},
+    'package4': {'version': '2.5.0', 'dependencies': ['package2', 'package3']},
+}
+
 
 def setup_routes(app):
     app.router.add_get('/', index, name='index')
@@ -25,7 +34,9 @@ def create_app():
     settings = Settings()
     app.update(
         name='TestServer',
-        settings=settings
+        settings=settings,
+        package_index=PackageIndexStore(DEMO_PACKAGES),
+        package_checksums={},
     )
 
     jinja2_loader = jinja2.FileSystemLoader(str(THIS_DIR / 'templates'))
@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import json
+from collections import deque
+
+
+class PackageIndexStore:
+    """
+    In-memory package index with a revision counter and a bounded change log.
+
+    Every mutation bumps the revision and records the change so clients can ask for
+    everything that changed after the revision they already have, see :meth:`delta`.
+    """
+
+    def __init__(self, packages=None, history_limit=1000):
+        """
+        :param packages: initial package name -> index entry mapping.
+        :param history_limit: number of changes kept for answering delta requests, older
+            clients receive a full snapshot instead.
+        """
+        self._packages = dict(packages or {})
+        self._revision = 1 if self._packages else 0
+        self._oldest_revision = self._revision
+        self._changes = deque(maxlen=history_limit)
+        self._blob = None
+
+    def __len__(self):
+        return len(self._packages)
+
+    @property
+    def revision(self):
+        return self._revision
+
+    def _record(self, name, existed, entry):
+        if len(self._changes) == self._changes.maxlen:
+            # the oldest change falls off the log, deltas from before it are no longer possible
+            self._oldest_revision = self._changes[0][0]
+        self._revision += 1
+        self._changes.append((self._revision, name, existed, entry))
+        self._blob = None
+
+    def set_package(self, name, entry):
+        """
+        Add or replace a package entry, no-op if the entry did not change.
+        """
+        existed = name in self._packages
+        if existed and self._packages[name] == entry:
+            return
+        self._packages[name] = entry
+        self._record(name, existed, entry)
+
+    def remove_package(self, name):
+        if name in self._packages:
+            del self._packages[name]
+            self._record(name, True, None)
+
+    def snapshot(self):
+        return dict(self._packages)
+
+    def blob(self):
+        """
+        Serialized full index, built once per revision and reused until the next change.
+
+        :return: tuple of (etag, json body, gzip compressed json body). The etag is a strong
+            validator of the json body, the gzip representation uses the same etag with a "-gzip" suffix.
+        """
+        if self._blob is None:
+            body = json.dumps(self._packages, sort_keys=True).encode()
+            etag = '"{}"'.format(hashlib.sha256(body).hexdigest())
+            self._blob = (etag, body, gzip.compress(body))
+        return self._blob
+
+    def etag_matches(self, if_none_match):
+        """
+        Check an If-None-Match header value against the etags of the current index.
+        """
+        if not if_none_match:
+            return False
+        etag = self.blob()[0]
+        accepted = {etag, gzip_etag(etag)}
+        return any(tag.strip() in accepted for tag in if_none_match.split(','))
+
+    def has_delta(self, since):
+        """
+        Check whether the change log can answer a delta request for revision `since`, i.e. the
+        client has a revision and no change after it fell off the log.
+        """
+        return self._oldest_revision <= since <= self._revision and since > 0
+
+    def delta(self, since):
+        """
+        Build the changes between revision `since` and the current revision.
+
+        :param since: revision the client already has.
+        :return: dict with "revision" and either "full": True plus "packages" (when the change log
+            can't answer, e.g. a new client or a server restart) or "added", "changed" and "removed".
+        """
+        if not self.has_delta(since):
+            return {'revision': self._revision, 'full': True, 'packages': self.snapshot()}
+        first_seen, last_entry = {}, {}
+        for revision, name, existed, entry in self._changes:
+            if revision <= since:
+                continue
+            first_seen.setdefault(name, existed)
+            last_entry[name] = entry
+        added, changed, removed = {}, {}, []
+        for name, entry in last_entry.items():
+            if entry is None:
+                if first_seen[name]:
+                    removed.append(name)
+            elif first_seen[name]:
+                changed[name] = entry
+            else:
+                added[name] = entry
+        return {'revision': self._revision, 'full': False, 'added': added, 'changed': changed, 'removed': removed}
+
+
+def gzip_etag(etag):
+    return '{}-gzip"'.format(etag[:-1])
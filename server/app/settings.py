@@ -20,6 +20,7 @@ class Settings:
     """
     _ENV_PREFIX = 'APP_'
     MESSAGE_FILE = Path('./messages.txt')
+    PACKAGES_DIR = Path('./packages')
 
     def __init__(self, **custom_settings):
         """
@@ -1,12 +1,20 @@
-from datetime import datetime
 import asyncio
+import hashlib
+from datetime import datetime
+from pathlib import Path
 from aiohttp.hdrs import METH_POST
-from aiohttp import web
+from aiohttp import hdrs, web
 from aiohttp.web import json_response
 from aiohttp.web import StreamResponse, Response
 from aiohttp.web_exceptions import HTTPFound
 from aiohttp_jinja2 import template
 
+from .package_index import gzip_etag
+
+INDEX_REVISION_HEADER = 'X-Index-Revision'
+INDEX_DELTA_HEADER = 'X-Index-Delta'
+CHECKSUM_HEADER = 'X-Checksum-Sha256'
+
 
 @template('index.jinja')
 async def index(request):
@@ -71,25 +79,19 @@ async def package_handler(request):
         action = None
     if action is not None:
         if action == 'index':
-            return await _package_index()
+            return await _package_index(request)
+        elif action == 'revision':
+            return json_response({'revision': request.app['package_index'].revision})
         elif action == 'count':
             local_index_count = request.query['local_index']
             if local_index_count is not None:
-                server_index_count = '2'
+                server_index_count = str(len(request.app['package_index']))
                 if local_index_count == server_index_count:
                     return json_response({'result':'True'})
                 else:
                     return json_response({'result':'False'})
         elif action == 'download':
-            package_name = request.query['package_name']
-            _response_download = StreamResponse()
-            _body='<div>Download for package <a href=#>{0}</a> will start soon</div>'.format(package_name)
-            _response_download.content_length = len(_body)
-            _response_download.content_type = 'text/html'
-            binary = _body.encode('utf8')
-            await _response_download.prepare(request)
-            await _response_download.write(binary)
-            return _response_download
+            return await _package_download(request)
         else:
             return Response(body='Invalid value provided for parameter "action"')
     else:
@@ -97,9 +99,11 @@ async def package_handler(request):
         _ahref_index = '<li>Get package <a href="{0}">Index</a></li>'.format(_index_url.human_repr())
         _count_url = request.app.router['package-handler'].url_for().with_query({'action':'count', 'local_index': '2'}) 
         _ahref_count = '<li>Get package <a href="{0}">count</a></li>'.format(_count_url.human_repr())
+        _revision_url = request.app.router['package-handler'].url_for().with_query({'action': 'revision'})
+        _ahref_revision = '<li>Get package index <a href="{0}">revision</a></li>'.format(_revision_url.human_repr())
         _download_url = request.app.router['package-handler'].url_for().with_query({'action':'download', 'package_name': 'package1'})
         _ahref_download = '<li>Get <a href="{0}">{1}</a></li>'.format(_download_url.human_repr(),'Package1')
-        _list = '<div><ul>{0}{1}{2}</ul></div>'.format(_ahref_index, _ahref_count, _ahref_download)
+        _list = '<div><ul>{0}{1}{2}{3}</ul></div>'.format(_ahref_index, _ahref_count, _ahref_revision, _ahref_download)
         _message = '<center><div>Welcome to package index service. You have below options to work with this service:</div></center><div/><div/>{0}'.format(_list)
         h_body = '<html><head><title>PackageService</title></head><body>{0}</body></html>'.format(_message)
         _response.content_length = len(h_body)
@@ -109,16 +113,80 @@ async def package_handler(request):
         await _response.write(binary)
         return _response
 
-async def _package_index():
-    """docstring for _package_index"""
-    server_pkg_index={
-        'package1': '1.0.0',
-        'package2': '1.5.0',
-        'package3': '2.0.0',
-        'package4': '2.5.0',
-                     }
-    await asyncio.sleep(1)
-    return json_response(server_pkg_index)
+async def _package_index(request):
+    """
+    Package index handler. With "since=<revision>" only the entries added, changed or removed
+    after that revision are returned, flagged by "X-Index-Delta", see PackageIndexStore.delta
+    for the response format. Without "since", or when the change log can't answer it (e.g. a
+    server restart), the full index is returned as a plain name -> version mapping.
+
+    Both forms carry the ETag of the full index and the current revision in "X-Index-Revision",
+    a request with a matching If-None-Match gets a bodyless 304. The full index is served from
+    a pre-serialized, pre-compressed blob, gzipped if the client accepts it.
+    """
+    package_index = request.app['package_index']
+    etag, body, gzip_body = package_index.blob()
+    revision = str(package_index.revision)
+    if package_index.etag_matches(request.headers.get(hdrs.IF_NONE_MATCH)):
+        return Response(status=304, headers={hdrs.ETAG: etag, INDEX_REVISION_HEADER: revision})
+    since = request.query.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return Response(status=400, text='Invalid value provided for parameter "since"')
+        if package_index.has_delta(since):
+            response = json_response(package_index.delta(since))
+            response.headers[hdrs.ETAG] = etag
+            response.headers[INDEX_REVISION_HEADER] = revision
+            response.headers[INDEX_DELTA_HEADER] = '1'
+            return response
+    headers = {hdrs.ETAG: etag, hdrs.VARY: hdrs.ACCEPT_ENCODING, INDEX_REVISION_HEADER: revision}
+    if 'gzip' in request.headers.get(hdrs.ACCEPT_ENCODING, ''):
+        headers[hdrs.ETAG] = gzip_etag(etag)
+        headers[hdrs.CONTENT_ENCODING] = 'gzip'
+        body = gzip_body
+    return Response(body=body, content_type='application/json', headers=headers)
+
+async def _package_download(request):
+    """
+    Streams "<package_name>.pkg" from the PACKAGES_DIR setting. FileResponse honours "Range"
+    (and "If-Range") headers so interrupted downloads can be resumed, the SHA-256 of the whole
+    file is sent in "X-Checksum-Sha256" so clients can verify it while streaming.
+    """
+    package_name = request.query.get('package_name', request.query.get('resource_name'))
+    if not package_name or Path(package_name).name != package_name:
+        return Response(status=400, text='Invalid value provided for parameter "package_name"')
+    package_path = request.app['settings'].PACKAGES_DIR / '{}.pkg'.format(package_name)
+    if not package_path.is_file():
+        return Response(status=404, text='No such package: {}'.format(package_name))
+    response = web.FileResponse(package_path)
+    response.headers[hdrs.ACCEPT_RANGES] = 'bytes'
+    response.headers[CHECKSUM_HEADER] = await _file_checksum(request.app, package_path)
+    return response
+
+
+async def _file_checksum(app, path):
+    """
+    SHA-256 of a file, cached per (path, size, mtime) so each package is hashed once per change.
+    The file is hashed in the default executor so a large package doesn't block the server loop.
+    """
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    checksums = app['package_checksums']
+    if key not in checksums:
+        loop = asyncio.get_running_loop()
+        checksums[key] = await loop.run_in_executor(None, _hash_file, path)
+    return checksums[key]
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 async def message_data(request):
     """
@@ -0,0 +1,39 @@
+import asyncio
+import hashlib
+import os
+
+from aiohttp import hdrs
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.main import create_app
+from app.views import CHECKSUM_HEADER
+
+
+def test_interrupted_download_resumes_with_range(tmp_path):
+    content = os.urandom(256 * 1024)
+    (tmp_path / 'x.pkg').write_bytes(content)
+    app = create_app()
+    app['settings'].PACKAGES_DIR = tmp_path
+    params = {'action': 'download', 'package_name': 'x'}
+
+    async def _download():
+        async with TestClient(TestServer(app)) as client:
+            # interrupted download, only part of the body is read before the connection is dropped
+            response = await client.get('/package', params=params)
+            assert response.status == 200
+            checksum = response.headers[CHECKSUM_HEADER]
+            part = await response.content.readexactly(100 * 1024)
+            response.close()
+
+            response = await client.get('/package', params=params,
+                                        headers={hdrs.RANGE: 'bytes={}-'.format(len(part))})
+            assert response.status == 206
+            assert response.headers[hdrs.CONTENT_RANGE] == 'bytes {}-{}/{}'.format(
+                len(part), len(content) - 1, len(content))
+            assert response.headers[CHECKSUM_HEADER] == checksum
+            rest = await response.read()
+            return checksum, part + rest
+
+    checksum, downloaded = asyncio.run(_download())
+    assert downloaded == content
+    assert hashlib.sha256(downloaded).hexdigest() == checksum